@@ -0,0 +1,36 @@
+import importlib
+
+# Backends de tarjeta: nome -> "módulo:função". Cada função recebe (candidatos, output_dir, **opcoes)
+# e ignora as opções que não usa (fotos_dir e fotos, as fotos registradas na base, são sempre passadas). Os módulos só são importados quando o backend é usado.
+BACKENDS_TARJETA = {
+    'corel': 'geradortarget:gerar_tarjetas_corel',
+    'png': 'geradortarget:gerar_tarjetas_png',
+    'folha-pdf': 'folhas:gerar_folhas_pdf',
+    'folha-png': 'folhas:gerar_folhas_png'
+}
+
+# Pacotes externos podem registrar backends adicionais neste grupo de entry points
+GRUPO_ENTRY_POINTS = 'eleitosfoto.tarjetas'
+
+def _entry_points():
+    # importlib.metadata é relativamente caro; só é carregado se um backend externo for pedido
+    from importlib import metadata
+    try:
+        return {ep.name: ep for ep in metadata.entry_points(group=GRUPO_ENTRY_POINTS)}
+    except TypeError:
+        # Python < 3.10
+        return {ep.name: ep for ep in metadata.entry_points().get(GRUPO_ENTRY_POINTS, [])}
+
+def listar_backends():
+    """Nomes dos backends disponíveis, sem importá-los"""
+    return sorted(set(BACKENDS_TARJETA) | set(_entry_points()))
+
+def carregar_backend(nome):
+    """Importa e retorna a função do backend de tarjeta informado"""
+    if nome in BACKENDS_TARJETA:
+        modulo, funcao = BACKENDS_TARJETA[nome].split(':')
+        return getattr(importlib.import_module(modulo), funcao)
+    entry_point = _entry_points().get(nome)
+    if entry_point is None:
+        raise ValueError(f"Backend de tarjeta desconhecido: {nome} (disponíveis: {', '.join(listar_backends())})")
+    return entry_point.load()
@@ -0,0 +1,223 @@
+"""Micro-benchmarks dos trechos de renderização, layout e exportação
+
+Mede vazão (registros por segundo, mediana das repetições) e pico de memória
+alocada pelo Python (tracemalloc, em uma passada separada) de cada trecho com
+candidatos sintéticos, e compara com a baseline gravada em baseline.json:
+
+    python benchmarks/executar.py                      # compara com a baseline
+    python benchmarks/executar.py --salvar-baseline    # grava a baseline desta máquina
+    python benchmarks/executar.py --completo           # todos os tamanhos, até 50.000 registros
+
+A baseline depende da máquina: grave-a e compare sempre no mesmo ambiente. Sem
+baseline, a execução termina com erro (código 2) antes de medir, a menos que
+--salvar-baseline seja informado. Todos os arquivos são gravados em pastas
+temporárias; nada é escrito em DADOS/.
+"""
+import argparse
+import importlib.util
+import json
+import logging
+import math
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+from benchmarks.sinteticos import gerar_candidatos, gerar_fotos
+
+CAMINHO_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+TAMANHOS = (10, 100, 1000, 10000, 50000)
+
+# Cada repetição roda o trecho quantas vezes forem precisas para durar ao menos isto,
+# para que os tamanhos pequenos não fiquem dominados por ruído
+TEMPO_MINIMO = 0.2
+
+BENCHMARKS = {}
+
+def benchmark(nome, limite, requer=()):
+    """Registra um benchmark: a função recebe (candidatos, pasta) e retorna o trecho a medir
+
+    `limite` é o maior tamanho medido sem --completo; `requer` lista os módulos necessários.
+    """
+    def registrar(preparar):
+        BENCHMARKS[nome] = {'preparar': preparar, 'limite': limite, 'requer': requer}
+        return preparar
+    return registrar
+
+@benchmark('tarjeta_png', limite=1000, requer=('PIL', 'svgwrite', 'requests'))
+def _tarjeta_png(candidatos, pasta):
+    from geradortarget import TarjetaGenerator
+    fotos_dir = os.path.join(pasta, 'fotos')
+    gerar_fotos(candidatos, fotos_dir)
+    generator = TarjetaGenerator(os.path.join(pasta, 'tarjetas'), fotos_dir)
+
+    def executar():
+        for indice, candidato in enumerate(candidatos):
+            generator._gerar_tarjeta_png(candidato, os.path.join(generator.output_dir, f"{indice}.png"))
+    return executar
+
+@benchmark('tarjeta_svg', limite=1000, requer=('PIL', 'svgwrite', 'requests'))
+def _tarjeta_svg(candidatos, pasta):
+    from geradortarget import TarjetaGenerator
+    fotos_dir = os.path.join(pasta, 'fotos')
+    gerar_fotos(candidatos, fotos_dir)
+    generator = TarjetaGenerator(os.path.join(pasta, 'tarjetas'), fotos_dir)
+
+    def executar():
+        for indice, candidato in enumerate(candidatos):
+            generator._gerar_tarjeta_svg(candidato, os.path.join(generator.output_dir, f"{indice}.svg"))
+    return executar
+
+@benchmark('arquivo_corel', limite=1000, requer=('PIL', 'svgwrite', 'requests'))
+def _arquivo_corel(candidatos, pasta):
+    from geradortarget import TarjetaGenerator
+    fotos_dir = os.path.join(pasta, 'fotos')
+    gerar_fotos(candidatos, fotos_dir)
+    generator = TarjetaGenerator(os.path.join(pasta, 'tarjetas'), fotos_dir)
+    return lambda: generator.gerar_arquivo_corel(candidatos)
+
+@benchmark('exportacao_csv_json', limite=50000, requer=('requests',))
+def _exportacao_csv_json(candidatos, pasta):
+    from datastore import EleitosDatastore
+    from eleitos_download import exportar_para_csv_json
+    store = EleitosDatastore(os.path.join(pasta, 'eleitos.db'))
+    return lambda: exportar_para_csv_json(candidatos, 'SC', 'BENCHMARK', 'BENCHMARK', store,
+                                          pasta_dados=os.path.join(pasta, 'DADOS'))
+
+@benchmark('posicoes_corel', limite=50000)
+def _posicoes_corel(candidatos, pasta):
+    from corelmanager import CorelDrawManager
+
+    def executar():
+        # Sem limite de colunas, para medir a grade com todos os registros
+        for (col, row), _ in zip(CorelDrawManager.grade(len(candidatos), max_cols=0), candidatos):
+            CorelDrawManager.geometria_tarjeta(col, row)
+    return executar
+
+def _silenciar_console():
+    """Mantém os logs em arquivo (fazem parte do custo real) e tira os do console
+
+    Vale para os loggers já criados; os módulos criam os seus ao serem importados.
+    """
+    for logger in list(logging.Logger.manager.loggerDict.values()):
+        if isinstance(logger, logging.Logger):
+            for handler in list(logger.handlers):
+                if type(handler) is logging.StreamHandler:
+                    logger.removeHandler(handler)
+
+def medir(nome, quantidade, repeticoes):
+    """Executa o benchmark `nome` com `quantidade` registros e retorna o resultado"""
+    candidatos = gerar_candidatos(quantidade)
+    pasta = tempfile.mkdtemp(prefix=f"bench_{nome}_")
+    try:
+        _silenciar_console()
+        executar = BENCHMARKS[nome]['preparar'](candidatos, pasta)
+        # Loggers criados pela preparação também saem do console
+        _silenciar_console()
+        # A primeira execução aquece caches (pirâmide de miniaturas, fontes) e calibra as voltas
+        inicio = time.perf_counter()
+        executar()
+        duracao = time.perf_counter() - inicio
+        voltas = max(1, math.ceil(TEMPO_MINIMO / duracao)) if duracao else 1000
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            for _ in range(voltas):
+                executar()
+            tempos.append((time.perf_counter() - inicio) / voltas)
+        tracemalloc.start()
+        try:
+            executar()
+            pico = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+    mediana = statistics.median(tempos)
+    return {
+        'mediana_s': round(mediana, 6),
+        'por_segundo': round(quantidade / mediana, 1) if mediana else None,
+        'pico_memoria_bytes': pico
+    }
+
+def comparar(resultado, base, tolerancia):
+    """Retorna (texto, regrediu) comparando o resultado com a baseline"""
+    if not base:
+        return "sem baseline para este tamanho", False
+    vazao = resultado['por_segundo'] / base['por_segundo'] if base.get('por_segundo') else 1.0
+    memoria = resultado['pico_memoria_bytes'] / base['pico_memoria_bytes'] if base.get('pico_memoria_bytes') else 1.0
+    regrediu = vazao < 1 - tolerancia or memoria > 1 + tolerancia
+    texto = f"vazão {vazao:.2f}x, memória {memoria:.2f}x"
+    return (f"REGRESSÃO: {texto}" if regrediu else texto), regrediu
+
+def carregar_baseline(caminho=CAMINHO_BASELINE):
+    """Baseline gravada em `caminho`, ou None se o arquivo não existe"""
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks de renderização, layout e exportação")
+    parser.add_argument('--benchmarks', nargs='+', choices=sorted(BENCHMARKS), default=sorted(BENCHMARKS))
+    parser.add_argument('--tamanhos', nargs='+', type=int, help=f"Quantidades de registros (padrão: {TAMANHOS})")
+    parser.add_argument('--completo', action='store_true', help="Mede todos os tamanhos, ignorando o limite de cada benchmark")
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--tolerancia', type=float, default=0.25, help="Variação aceita em relação à baseline (padrão: 25%%)")
+    parser.add_argument('--salvar-baseline', action='store_true', help="Grava os resultados como nova baseline")
+    parser.add_argument('--baseline', default=CAMINHO_BASELINE)
+    args = parser.parse_args(argv)
+
+    baseline = carregar_baseline(args.baseline)
+    if baseline is None:
+        if not args.salvar_baseline:
+            print(f"Baseline não encontrada em {args.baseline}. Grave a baseline desta máquina com "
+                  f"--salvar-baseline antes de comparar.", file=sys.stderr)
+            return 2
+        baseline = {}
+    resultados = {}
+    regressoes = 0
+    print(f"{'Benchmark':<22}{'Registros':>10}{'Mediana':>12}{'Reg/s':>12}{'Pico (KiB)':>12}  Comparação")
+    for nome in args.benchmarks:
+        faltando = [modulo for modulo in BENCHMARKS[nome]['requer'] if importlib.util.find_spec(modulo) is None]
+        if faltando:
+            print(f"{nome:<22}ignorado: dependência ausente ({', '.join(faltando)})")
+            continue
+        for quantidade in args.tamanhos or TAMANHOS:
+            if not (args.completo or args.tamanhos) and quantidade > BENCHMARKS[nome]['limite']:
+                continue
+            resultado = medir(nome, quantidade, args.repeticoes)
+            resultados.setdefault(nome, {})[str(quantidade)] = resultado
+            texto, regrediu = comparar(resultado, baseline.get('resultados', {}).get(nome, {}).get(str(quantidade)),
+                                       args.tolerancia)
+            regressoes += regrediu
+            print(f"{nome:<22}{quantidade:>10}{resultado['mediana_s']:>11.3f}s{resultado['por_segundo']:>12.1f}"
+                  f"{resultado['pico_memoria_bytes'] / 1024:>12.0f}  {texto}")
+
+    if args.salvar_baseline:
+        # Mantém os tamanhos e benchmarks não medidos nesta execução
+        for nome, por_tamanho in resultados.items():
+            baseline.setdefault('resultados', {}).setdefault(nome, {}).update(por_tamanho)
+        baseline['ambiente'] = {'python': platform.python_version(), 'plataforma': platform.platform(),
+                                'gravada_em': datetime.now().isoformat(timespec='seconds')}
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2)
+        print(f"Baseline gravada em {args.baseline}")
+    elif regressoes:
+        print(f"{regressoes} regressão(ões) acima de {args.tolerancia:.0%}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""Candidatos e fotos sintéticos para os benchmarks
+
+Os dados imitam a listagem do TSE: nomes em maiúsculas com acentos e
+partículas, nomes de urna com apelidos e títulos, distribuição de partidos
+próxima à das eleições municipais e municípios com 1 prefeito, 1 vice e de 9
+a 55 vereadores. A geração é determinística para uma mesma semente.
+"""
+import os
+import random
+from io import BytesIO
+from candidato import Candidato
+
+ID_ELEICAO = '2045202024'
+
+PRENOMES = [
+    "JOÃO", "MARIA", "JOSÉ", "ANTÔNIO", "FRANCISCO", "ANA", "LUIZ", "PAULO", "CARLOS", "MÁRCIA",
+    "SEBASTIÃO", "CONCEIÇÃO", "LÚCIA", "ROGÉRIO", "FÁBIO", "ÂNGELA", "INÊS", "CÉSAR", "VALDIR", "JOCELI",
+    "GUSTAVO", "THAÍS", "CLÁUDIO", "EDUARDO", "RAIMUNDA", "WELLINGTON", "KELLY", "JOÃO VITOR",
+    "MARIA DE FÁTIMA", "ANA CAROLINA", "JOSÉ CARLOS", "LUÍS HENRIQUE", "ODAÍR", "GISLAINE", "NATÁLIA"
+]
+
+SOBRENOMES = [
+    "SILVA", "SANTOS", "OLIVEIRA", "SOUZA", "PEREIRA", "COSTA", "RODRIGUES", "ALMEIDA", "NASCIMENTO",
+    "LIMA", "ARAÚJO", "FERNANDES", "CARVALHO", "GOMES", "MARTINS", "ROCHA", "RIBEIRO", "ALVES", "MONTEIRO",
+    "MENDES", "BARROS", "FREITAS", "BARBOSA", "PINTO", "MOURA", "CAVALCANTI", "DIAS", "CASTRO", "CAMPOS",
+    "CARDOSO", "GONÇALVES", "D'ÁVILA", "DE SOUZA", "DOS SANTOS", "DA CONCEIÇÃO", "BRANDÃO", "FALCÃO",
+    "ASSUNÇÃO", "MAGALHÃES", "SCHMITT", "KLEIN", "ZANELLA", "BORTOLOTTO", "DE OLIVEIRA JÚNIOR", "NETO"
+]
+
+# Títulos e complementos comuns nos nomes de urna
+TITULOS = ["PROFESSOR", "PROFESSORA", "DR.", "DRA.", "IRMÃ", "PASTOR", "SARGENTO", "ENFERMEIRA", "TIO", "ZÉ"]
+COMPLEMENTOS = ["DO POSTO", "DA SAÚDE", "DO SINDICATO", "DA FARMÁCIA", "DO GÁS", "DA ESCOLA", "DO BAIRRO"]
+
+# Sigla: (número, peso aproximado entre os eleitos em 2024)
+PARTIDOS = {
+    "PSD": (55, 15), "MDB": (15, 14), "PP": (11, 12), "UNIÃO": (44, 10), "PL": (22, 9),
+    "REPUBLICANOS": (10, 8), "PSB": (40, 5), "PT": (13, 5), "PDT": (12, 4), "PODE": (20, 3),
+    "PSDB": (45, 3), "AVANTE": (70, 2), "SOLIDARIEDADE": (77, 2), "CIDADANIA": (23, 1), "PRD": (25, 1),
+    "AGIR": (36, 1), "MOBILIZA": (33, 1), "PV": (43, 1), "PC do B": (65, 1), "NOVO": (30, 1),
+    "REDE": (18, 0.5), "DC": (27, 0.5)
+}
+
+# Tamanhos de câmara municipal (de 9 a 55 vereadores), pesados pela frequência
+VEREADORES_POR_MUNICIPIO = [9, 9, 9, 9, 11, 11, 13, 15, 17, 19, 21, 23, 29, 41, 55]
+
+def _nome_completo(rng):
+    partes = [rng.choice(PRENOMES)] + rng.sample(SOBRENOMES, rng.choice([1, 2, 2, 3, 3, 4, 5]))
+    return " ".join(partes)
+
+def _nome_urna(rng, nome_completo):
+    partes = nome_completo.split(" ")
+    variante = rng.random()
+    if variante < 0.35:
+        nome = partes[0]
+    elif variante < 0.7:
+        nome = f"{partes[0]} {partes[-1]}"
+    elif variante < 0.85:
+        nome = f"{rng.choice(TITULOS)} {partes[0]}"
+    else:
+        nome = f"{partes[0]} {rng.choice(COMPLEMENTOS)}"
+    return nome[:30]
+
+def gerar_candidatos(quantidade, semente=42):
+    """Lista de `quantidade` candidatos eleitos distribuídos em municípios sintéticos"""
+    rng = random.Random(semente)
+    siglas = list(PARTIDOS)
+    pesos = [peso for _, peso in PARTIDOS.values()]
+    candidatos = []
+    id_candidato = 210000000000
+    while len(candidatos) < quantidade:
+        codigo_municipio = str(rng.randint(10000, 99999))
+        partido_prefeito = rng.choices(siglas, pesos)[0]
+        cargos = [(11, partido_prefeito), (12, partido_prefeito if rng.random() < 0.6 else rng.choices(siglas, pesos)[0])]
+        cargos += [(13, partido) for partido in rng.choices(siglas, pesos, k=rng.choice(VEREADORES_POR_MUNICIPIO))]
+        for codigo_cargo, partido in cargos:
+            if len(candidatos) >= quantidade:
+                break
+            numero_partido = PARTIDOS[partido][0]
+            numero = numero_partido if codigo_cargo != 13 else numero_partido * 1000 + rng.randint(0, 999)
+            nome_completo = _nome_completo(rng)
+            id_candidato += 1
+            candidatos.append(Candidato(
+                id_candidato=id_candidato,
+                id_eleicao=ID_ELEICAO,
+                nome_completo=nome_completo,
+                nome_urna=_nome_urna(rng, nome_completo),
+                numero=numero,
+                partido=partido,
+                codigo_cargo=codigo_cargo,
+                codigo_municipio=codigo_municipio,
+                reeleicao=rng.random() < 0.35
+            ))
+    return candidatos
+
+def gerar_foto(rng, largura=161, altura=225):
+    """JPEG sintético no tamanho das fotos do TSE (fundo, rosto e tronco com ruído)"""
+    from PIL import Image, ImageDraw, ImageFilter
+
+    def cor():
+        return tuple(rng.randint(40, 230) for _ in range(3))
+
+    imagem = Image.new("RGB", (largura, altura), cor())
+    draw = ImageDraw.Draw(imagem)
+    draw.ellipse((largura * 0.25, altura * 0.12, largura * 0.75, altura * 0.55), fill=cor())
+    draw.rectangle((largura * 0.1, altura * 0.6, largura * 0.9, altura), fill=cor())
+    ruido = Image.effect_noise((largura, altura), rng.randint(20, 60)).convert("RGB")
+    imagem = Image.blend(imagem, ruido, 0.15).filter(ImageFilter.SMOOTH)
+    buffer = BytesIO()
+    imagem.save(buffer, "JPEG", quality=85)
+    return buffer.getvalue()
+
+def gerar_fotos(candidatos, fotos_dir, semente=42, variacoes=16):
+    """Grava uma foto por candidato no caminho em que o download a deixaria
+
+    Apenas `variacoes` imagens diferentes são geradas e reaproveitadas entre os candidatos.
+    """
+    rng = random.Random(semente)
+    fotos = [gerar_foto(rng) for _ in range(variacoes)]
+    for indice, candidato in enumerate(candidatos):
+        caminho = candidato.caminho_original(fotos_dir)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        with open(caminho, 'wb') as f:
+            f.write(fotos[indice % variacoes])
@@ -0,0 +1,133 @@
+import os
+import sys
+
+# Códigos dos cargos
+CARGOS = {
+    11: "Prefeito",
+    12: "Vice-prefeito",
+    13: "Vereador"
+}
+
+URL_IMAGEM = "https://divulgacandcontas.tse.jus.br/divulga/rest/arquivo/img/{id_eleicao}/{id_candidato}/{codigo_municipio}"
+
+# Chaves usadas no CSV/JSON exportado e o atributo correspondente do Candidato
+CAMPOS = {
+    "ID do Candidato": "id",
+    "Nome Completo": "nome_completo",
+    "Nome de Urna": "nome_urna",
+    "Número na Urna": "numero",
+    "Partido": "partido",
+    "Cargo": "cargo",
+    "Código do Cargo": "codigo_cargo",
+    "Código do Município": "codigo_municipio",
+    "Reeleição": "reeleicao_texto",
+    "Imagem Oficial": "imagem_oficial"
+}
+
+
+class Candidato:
+    """Registro compacto de um candidato eleito
+
+    Usa __slots__ para não carregar um dict por instância; cargo e URL da imagem
+    são derivados dos códigos em vez de armazenados.
+    """
+    __slots__ = ('id', 'id_eleicao', 'nome_completo', 'nome_urna', 'numero',
+                 'partido', 'codigo_cargo', 'codigo_municipio', 'reeleicao')
+
+    def __init__(self, id_candidato, id_eleicao, nome_completo, nome_urna, numero, partido,
+                 codigo_cargo, codigo_municipio, reeleicao=False):
+        self.id = str(id_candidato)
+        self.id_eleicao = str(id_eleicao)
+        self.nome_completo = nome_completo
+        self.nome_urna = nome_urna
+        self.numero = numero
+        # Siglas e códigos se repetem em milhares de registros
+        self.partido = sys.intern(partido) if partido else partido
+        self.codigo_cargo = int(codigo_cargo)
+        self.codigo_municipio = sys.intern(str(codigo_municipio))
+        self.reeleicao = bool(reeleicao)
+
+    @classmethod
+    def from_tse(cls, dados, id_eleicao, codigo_municipio, codigo_cargo):
+        """Cria o candidato a partir de um item de candidatura/listar do TSE"""
+        return cls(
+            id_candidato=dados.get("id"),
+            id_eleicao=id_eleicao,
+            nome_completo=dados.get("nomeCompleto"),
+            nome_urna=dados.get("nomeUrna"),
+            numero=dados.get("numero"),
+            partido=(dados.get("partido") or {}).get("sigla"),
+            codigo_cargo=codigo_cargo,
+            codigo_municipio=codigo_municipio,
+            reeleicao=dados.get("st_REELEICAO")
+        )
+
+    @classmethod
+    def from_dict(cls, dados):
+        """Cria o candidato a partir de um registro do CSV/JSON exportado"""
+        # .../arquivo/img/{id_eleicao}/{id_candidato}/{codigo_municipio}
+        partes_url = dados.get("Imagem Oficial", "").rstrip("/").split("/")
+        return cls(
+            id_candidato=dados.get("ID do Candidato") or partes_url[-2],
+            id_eleicao=partes_url[-3],
+            nome_completo=dados.get("Nome Completo"),
+            nome_urna=dados.get("Nome de Urna"),
+            numero=dados.get("Número na Urna"),
+            partido=dados.get("Partido"),
+            codigo_cargo=dados.get("Código do Cargo"),
+            codigo_municipio=dados.get("Código do Município"),
+            reeleicao=dados.get("Reeleição") == "Sim"
+        )
+
+    @property
+    def cargo(self):
+        return CARGOS[self.codigo_cargo]
+
+    @property
+    def reeleicao_texto(self):
+        return "Sim" if self.reeleicao else "Não"
+
+    @property
+    def imagem_oficial(self):
+        return URL_IMAGEM.format(id_eleicao=self.id_eleicao, id_candidato=self.id,
+                                 codigo_municipio=self.codigo_municipio)
+
+    @property
+    def nome_arquivo(self):
+        """Nome de urna usado nos nomes de arquivo"""
+        return self.nome_urna.replace(' ', '_')
+
+    def caminho_original(self, base_dir):
+        """Caminho da foto original baixada do TSE dentro da pasta do município"""
+        return os.path.join(base_dir, 'imagens', self.cargo, f"{self.nome_arquivo}.jpg")
+
+    def to_dict(self):
+        """Registro com as chaves usadas no CSV/JSON exportado"""
+        return {chave: getattr(self, atributo) for chave, atributo in CAMPOS.items()}
+
+    def __getitem__(self, chave):
+        # Compatibilidade com código que ainda acessa as chaves do CSV/JSON
+        try:
+            return getattr(self, CAMPOS[chave])
+        except KeyError:
+            raise KeyError(chave) from None
+
+    def get(self, chave, default=None):
+        try:
+            return self[chave]
+        except KeyError:
+            return default
+
+    def _valores(self):
+        return tuple(getattr(self, atributo) for atributo in self.__slots__)
+
+    def __eq__(self, other):
+        if not isinstance(other, Candidato):
+            return NotImplemented
+        return self._valores() == other._valores()
+
+    def __hash__(self):
+        return hash(self._valores())
+
+    def __repr__(self):
+        return f"Candidato(id={self.id!r}, nome_urna={self.nome_urna!r}, cargo={self.cargo!r})"
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+# Perfis de codificação por tipo de arquivo. As chaves além de formato, max_bytes e
+# qualidade_minima são repassadas ao Image.save() do Pillow.
+PERFIS = {
+    # Foto processada com fundo: JPEG otimizado e progressivo
+    'foto': {'formato': 'JPEG', 'quality': 90, 'optimize': True, 'progressive': True, 'max_bytes': None},
+    # Foto sem fundo: WebP com canal alfa
+    'foto_sem_fundo': {'formato': 'WEBP', 'quality': 90, 'method': 6, 'max_bytes': None},
+    # Tarjeta: PNG sem perdas com compressão máxima
+    'tarjeta': {'formato': 'PNG', 'optimize': True, 'compress_level': 9, 'max_bytes': None},
+    # Folha de impressão: PNG sem perdas; compressão moderada, porque as páginas são grandes
+    'folha': {'formato': 'PNG', 'compress_level': 6, 'max_bytes': None},
+    # Níveis da pirâmide de miniaturas (ver miniaturas.py)
+    'miniatura': {'formato': 'JPEG', 'quality': 88, 'max_bytes': None},
+    'miniatura_alfa': {'formato': 'WEBP', 'quality': 88, 'max_bytes': None}
+}
+
+EXTENSOES = {'JPEG': '.jpg', 'WEBP': '.webp', 'PNG': '.png'}
+
+OPCOES_INTERNAS = ('formato', 'max_bytes', 'qualidade_minima')
+
+_perfis_carregados = None
+
+def carregar_perfis():
+    """Retorna os perfis padrão com os ajustes de 'perfis_codificacao' do config.json"""
+    global _perfis_carregados
+    if _perfis_carregados is None:
+        perfis = {nome: dict(perfil) for nome, perfil in PERFIS.items()}
+        config_path = os.path.join(os.path.dirname(__file__), 'config.json')
+        try:
+            with open(config_path, 'r', encoding='utf-8') as f:
+                ajustes = json.load(f).get('perfis_codificacao', {})
+        except (OSError, ValueError):
+            ajustes = {}
+        for nome, perfil in ajustes.items():
+            perfis.setdefault(nome, {}).update(perfil)
+        _perfis_carregados = perfis
+    return _perfis_carregados
+
+def obter_perfil(nome):
+    return carregar_perfis()[nome]
+
+def extensao(nome_perfil):
+    """Extensão de arquivo gerada pelo perfil"""
+    return EXTENSOES[obter_perfil(nome_perfil)['formato']]
+
+def _preparar_modo(imagem, formato):
+    from PIL import Image
+
+    if formato == 'JPEG' and imagem.mode != 'RGB':
+        # JPEG não tem transparência: aplica o alfa sobre fundo branco
+        imagem = imagem.convert('RGBA')
+        fundo = Image.new('RGB', imagem.size, 'white')
+        fundo.paste(imagem, mask=imagem.getchannel('A'))
+        return fundo
+    if formato in ('WEBP', 'PNG') and imagem.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+        return imagem.convert('RGBA')
+    return imagem
+
+def _salvar(imagem, perfil):
+    opcoes = {chave: valor for chave, valor in perfil.items() if chave not in OPCOES_INTERNAS}
+    buffer = BytesIO()
+    imagem.save(buffer, perfil['formato'], **opcoes)
+    return buffer.getvalue()
+
+def codificar_imagem(imagem, destino, perfil):
+    """Codifica a imagem conforme o perfil e grava em `destino` de forma atômica
+
+    Se o perfil tiver max_bytes, reduz a qualidade (formatos com perdas) e depois
+    as dimensões até caber no limite. Retorna dict com caminho, bytes e sha256.
+    """
+    from PIL import Image
+
+    if isinstance(perfil, str):
+        perfil = obter_perfil(perfil)
+    imagem = _preparar_modo(imagem, perfil['formato'])
+    dados = _salvar(imagem, perfil)
+
+    max_bytes = perfil.get('max_bytes')
+    if max_bytes:
+        perfil = dict(perfil)
+        qualidade_minima = perfil.get('qualidade_minima', 40)
+        while len(dados) > max_bytes:
+            if 'quality' in perfil and perfil['quality'] > qualidade_minima:
+                perfil['quality'] = max(perfil['quality'] - 10, qualidade_minima)
+            elif min(imagem.size) > 64:
+                imagem = imagem.resize((int(imagem.width * 0.85), int(imagem.height * 0.85)), Image.LANCZOS)
+            else:
+                break
+            dados = _salvar(imagem, perfil)
+
+    os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+    fd, caminho_tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(destino)), prefix=".tmp_")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(dados)
+        os.replace(caminho_tmp, destino)
+    except BaseException:
+        if os.path.exists(caminho_tmp):
+            os.remove(caminho_tmp)
+        raise
+    return {'caminho': destino, 'bytes': len(dados), 'sha256': hashlib.sha256(dados).hexdigest()}
+
+def codificar_arquivo(origem, destino, perfil, remover_origem=False):
+    """Recodifica o arquivo `origem` em `destino` conforme o perfil
+
+    Com remover_origem, `origem` é apagado também quando a codificação falha.
+    """
+    try:
+        from PIL import Image
+
+        with Image.open(origem) as imagem:
+            imagem.load()
+            return codificar_imagem(imagem, destino, perfil)
+    finally:
+        if remover_origem and os.path.abspath(origem) != os.path.abspath(destino) and os.path.exists(origem):
+            os.remove(origem)
+
+def codificar_bytes(dados, destino, perfil):
+    """Codifica a imagem serializada em `dados` (qualquer formato que o Pillow abra)"""
+    from PIL import Image
+
+    with Image.open(BytesIO(dados)) as imagem:
+        imagem.load()
+        return codificar_imagem(imagem, destino, perfil)
+
+def _contexto_processos():
+    """forkserver onde existe (POSIX), spawn nos demais
+
+    Com fork, cada processo herdaria uma cópia do processo principal no meio da
+    execução: threads (hedge, receptor de callbacks, perfilador), locks e conexões.
+    """
+    metodo = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(metodo)
+
+class CodificadorParalelo:
+    """Distribui a codificação entre processos, um por núcleo por padrão"""
+    def __init__(self, max_workers=None):
+        self.executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=_contexto_processos())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.executor.shutdown(wait=True)
+
+    def enviar_arquivo(self, origem, destino, nome_perfil, remover_origem=False):
+        """Agenda a recodificação de um arquivo; retorna um Future"""
+        return self.executor.submit(codificar_arquivo, origem, destino, obter_perfil(nome_perfil), remover_origem)
+
+    def enviar_imagem(self, imagem, destino, nome_perfil):
+        """Agenda a codificação de uma imagem já em memória; retorna um Future
+
+        O processo recebe a imagem como PNG sem compressão, e não o objeto Image:
+        serializá-la assim custa só a cópia dos pixels.
+        """
+        buffer = BytesIO()
+        imagem.save(buffer, 'PNG', compress_level=0)
+        return self.executor.submit(codificar_bytes, buffer.getvalue(), destino, obter_perfil(nome_perfil))
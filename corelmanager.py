@@ -1,4 +1,3 @@
-import win32com.client
 import os
 from log_config import setup_logger
 
@@ -33,11 +32,49 @@ class CorelDrawManager:
         'INFO_Y_OFFSET': -5.064
     }
 
+    MAX_ROWS = 15
+    MAX_COLS = 4
+
+    @classmethod
+    def posicao(cls, col, row):
+        """Centro (x, y) em mm da tarjeta na coluna e linha da grade"""
+        x = cls.CONST_LAYOUT['FIRST_COLUMN_CENTER_X'] + (col * cls.CONST_LAYOUT['DISTANCE_BETWEEN_COLUMNS'])
+        y = cls.CONST_LAYOUT['FIRST_ROW_CENTER_Y'] + (row * cls.CONST_LAYOUT['DISTANCE_BETWEEN_ROWS'])
+        return x, y
+
+    @classmethod
+    def geometria_tarjeta(cls, col, row):
+        """Coordenadas de uma tarjeta (centro, retângulo e âncoras dos textos), sem acessar o CorelDraw"""
+        x, y = cls.posicao(col, row)
+        meia_largura = cls.CONST_RECTANGLE['WIDTH'] / 2
+        meia_altura = cls.CONST_RECTANGLE['HEIGHT'] / 2
+        return {
+            'centro': (x, y),
+            'retangulo': (x - meia_largura, y - meia_altura, x + meia_largura, y + meia_altura),
+            'nome': (x - meia_largura, y + cls.CONST_TEXT['NAME_Y_OFFSET']),
+            'info': (x - meia_largura, y + cls.CONST_TEXT['INFO_Y_OFFSET'])
+        }
+
+    @classmethod
+    def grade(cls, quantidade, max_rows=None, max_cols=None):
+        """(col, row) de cada tarjeta, preenchendo coluna por coluna até a página encher
+
+        max_cols=0 não limita o número de colunas.
+        """
+        max_rows = max_rows or cls.MAX_ROWS
+        max_cols = cls.MAX_COLS if max_cols is None else max_cols
+        if max_cols:
+            quantidade = min(quantidade, max_rows * max_cols)
+        for indice in range(quantidade):
+            yield divmod(indice, max_rows)
+
     def __init__(self):
         """Initialize CorelDraw Manager and setup logging"""
         self.logger = setup_logger('CorelDrawManager', os.path.join(os.path.dirname(__file__), 'corel_manager.log'))
         self.logger.info("Iniciando CorelDraw Manager")
         try:
+            # Importado aqui para que o módulo possa ser carregado fora do Windows
+            import win32com.client
             self.app = win32com.client.Dispatch('CorelDRAW.Application')
             self.app.Visible = False
             self.logger.info("CorelDraw Application iniciado com sucesso")
@@ -63,47 +100,40 @@ class CorelDrawManager:
     def create_tarjeta(self, doc, candidate_data, col, row):
         """Creates a single tarjeta for a candidate"""
         try:
-            self.logger.info(f"Criando tarjeta para {candidate_data['Nome de Urna']} na posição ({col}, {row})")
+            self.logger.info(f"Criando tarjeta para {candidate_data.nome_urna} na posição ({col}, {row})")
             layer = doc.ActivePage.ActiveLayer
             
             # Calculate position
-            x = self.CONST_LAYOUT['FIRST_COLUMN_CENTER_X'] + (col * self.CONST_LAYOUT['DISTANCE_BETWEEN_COLUMNS'])
-            y = self.CONST_LAYOUT['FIRST_ROW_CENTER_Y'] + (row * self.CONST_LAYOUT['DISTANCE_BETWEEN_ROWS'])
+            geometria = self.geometria_tarjeta(col, row)
+            x, y = geometria['centro']
             
             # Create rectangle
             self.logger.debug(f"Criando retângulo na posição (x={x}, y={y})")
-            rect = layer.CreateRectangle(
-                x - (self.CONST_RECTANGLE['WIDTH'] / 2),
-                y - (self.CONST_RECTANGLE['HEIGHT'] / 2),
-                x + (self.CONST_RECTANGLE['WIDTH'] / 2),
-                y + (self.CONST_RECTANGLE['HEIGHT'] / 2)
-            )
+            rect = layer.CreateRectangle(*geometria['retangulo'])
             rect.Outline.Width = self.CONST_LAYOUT['MIN_WIDTH_OUTLINE']
             
             # Create name text
             self.logger.debug("Criando textos da tarjeta")
             name_text = layer.CreateArtisticText(
-                x - (self.CONST_RECTANGLE['WIDTH'] / 2),
-                y + self.CONST_TEXT['NAME_Y_OFFSET'],
-                candidate_data['Nome de Urna'],
+                *geometria['nome'],
+                candidate_data.nome_urna,
                 'Cooper Black',
                 22.154
             )
             self._format_name_text(name_text, x, y)
             
             # Create info text
-            info = f"{candidate_data['Número na Urna']} - {candidate_data['Partido']} - {candidate_data['Cargo']}"
+            info = f"{candidate_data.numero} - {candidate_data.partido} - {candidate_data.cargo}"
             info_text = layer.CreateArtisticText(
-                x - (self.CONST_RECTANGLE['WIDTH'] / 2),
-                y + self.CONST_TEXT['INFO_Y_OFFSET'],
+                *geometria['info'],
                 info,
                 'Arial',
                 9.934
             )
             self._format_info_text(info_text, x, y)
-            self.logger.info(f"Tarjeta criada com sucesso para {candidate_data['Nome de Urna']}")
+            self.logger.info(f"Tarjeta criada com sucesso para {candidate_data.nome_urna}")
         except Exception as e:
-            self.logger.error(f"Erro ao criar tarjeta para {candidate_data.get('Nome de Urna', 'Nome não encontrado')}: {e}")
+            self.logger.error(f"Erro ao criar tarjeta para {candidate_data.nome_urna}: {e}")
             raise
 
     def _format_name_text(self, text_shape, center_x, center_y):
@@ -131,21 +161,12 @@ class CorelDrawManager:
             self.logger.info(f"Iniciando criação do template com {len(candidates_data)} candidatos")
             doc = self.create_document(output_path)
             
-            col = 0
-            row = 0
-            max_rows = 15
-            
-            for i, candidate in enumerate(candidates_data, 1):
-                if row >= max_rows:
-                    row = 0
-                    col += 1
-                if col >= 4:
-                    self.logger.warning("Limite máximo de colunas atingido (4 colunas)")
-                    break
-                    
+            posicoes = self.grade(len(candidates_data))
+            for i, (candidate, (col, row)) in enumerate(zip(candidates_data, posicoes), 1):
                 self.logger.info(f"Processando candidato {i}/{len(candidates_data)}")
                 self.create_tarjeta(doc, candidate, col, row)
-                row += 1
+            if len(candidates_data) > self.MAX_ROWS * self.MAX_COLS:
+                self.logger.warning(f"Limite máximo de colunas atingido ({self.MAX_COLS} colunas)")
             
             self.logger.info(f"Salvando arquivo em: {output_path}")
             doc.SaveAs(output_path)
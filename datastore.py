@@ -0,0 +1,277 @@
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import datetime
+from candidato import Candidato
+from log_config import setup_logger
+
+CAMINHO_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "DADOS", "eleitos.db")
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS execucoes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    iniciada_em TEXT NOT NULL,
+    finalizada_em TEXT,
+    ano TEXT,
+    tipo TEXT,
+    regiao TEXT,
+    uf TEXT,
+    municipio TEXT,
+    parametros TEXT,
+    status TEXT
+);
+
+CREATE TABLE IF NOT EXISTS eleicoes (
+    id_eleicao TEXT PRIMARY KEY,
+    ano TEXT NOT NULL,
+    tipo TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_eleicoes_ano_tipo ON eleicoes (ano, tipo);
+
+CREATE TABLE IF NOT EXISTS candidatos (
+    id_eleicao TEXT NOT NULL,
+    id_candidato TEXT NOT NULL,
+    regiao TEXT,
+    uf TEXT NOT NULL,
+    municipio TEXT NOT NULL,
+    codigo_municipio TEXT NOT NULL,
+    nome_completo TEXT,
+    nome_urna TEXT,
+    numero INTEGER,
+    partido TEXT,
+    codigo_cargo INTEGER NOT NULL,
+    reeleicao INTEGER NOT NULL,
+    id_execucao INTEGER REFERENCES execucoes(id),
+    atualizado_em TEXT NOT NULL,
+    PRIMARY KEY (id_eleicao, id_candidato)
+);
+CREATE INDEX IF NOT EXISTS idx_candidatos_uf_municipio ON candidatos (uf, municipio);
+CREATE INDEX IF NOT EXISTS idx_candidatos_uf_partido_cargo ON candidatos (uf, partido, codigo_cargo);
+CREATE INDEX IF NOT EXISTS idx_candidatos_partido ON candidatos (partido);
+CREATE INDEX IF NOT EXISTS idx_candidatos_cargo ON candidatos (codigo_cargo);
+CREATE INDEX IF NOT EXISTS idx_candidatos_id ON candidatos (id_candidato);
+CREATE INDEX IF NOT EXISTS idx_candidatos_municipio ON candidatos (id_eleicao, codigo_municipio);
+
+CREATE TABLE IF NOT EXISTS fotos (
+    id_eleicao TEXT NOT NULL,
+    id_candidato TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    caminho TEXT NOT NULL,
+    sha256 TEXT,
+    opcoes TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    id_execucao INTEGER REFERENCES execucoes(id),
+    atualizado_em TEXT NOT NULL,
+    PRIMARY KEY (id_eleicao, id_candidato, tipo)
+);
+CREATE INDEX IF NOT EXISTS idx_fotos_sha256 ON fotos (sha256);
+
+CREATE TABLE IF NOT EXISTS latencias (
+    id_execucao INTEGER REFERENCES execucoes(id),
+    operacao TEXT NOT NULL,
+    segundos REAL NOT NULL,
+    registrada_em TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_latencias_operacao ON latencias (operacao);
+"""
+
+COLUNAS_CANDIDATO = ("id_candidato, id_eleicao, nome_completo, nome_urna, numero, partido, "
+                     "codigo_cargo, codigo_municipio, reeleicao")
+
+def sha256_arquivo(caminho):
+    """Calcula o SHA-256 de um arquivo lendo-o em blocos"""
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+def _agora():
+    return datetime.now().isoformat(timespec='seconds')
+
+class EleitosDatastore:
+    """Base SQLite local com candidatos, fotos e histórico de execuções de todos os municípios"""
+    def __init__(self, caminho=CAMINHO_PADRAO):
+        self.logger = setup_logger('EleitosDatastore', os.path.join(os.path.dirname(__file__), 'datastore.log'))
+        os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        self.caminho = caminho
+        self.conn = sqlite3.connect(caminho, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(ESQUEMA)
+        self._migrar()
+        self.logger.info(f"Base de dados aberta em {caminho}")
+
+    def _migrar(self):
+        """Adiciona às bases criadas por versões anteriores as colunas novas do esquema"""
+        colunas = {linha[1] for linha in self.conn.execute("PRAGMA table_info(fotos)")}
+        with self.conn:
+            for coluna in ('etag', 'last_modified'):
+                if coluna not in colunas:
+                    self.conn.execute(f"ALTER TABLE fotos ADD COLUMN {coluna} TEXT")
+
+    def close(self):
+        self.conn.close()
+
+    def iniciar_execucao(self, params):
+        """Registra o início de uma execução e retorna seu ID"""
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO execucoes (iniciada_em, ano, tipo, regiao, uf, municipio, parametros, status) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, 'em andamento')",
+                (_agora(), params.get('ano'), params.get('tipo'), params.get('regiao'), params.get('uf'),
+                 params.get('municipio'),
+                 json.dumps({k: v for k, v in params.items() if k != 'api_key'}, ensure_ascii=False))
+            )
+        return cursor.lastrowid
+
+    def finalizar_execucao(self, id_execucao, status):
+        with self.conn:
+            self.conn.execute("UPDATE execucoes SET finalizada_em = ?, status = ? WHERE id = ?",
+                              (_agora(), status, id_execucao))
+
+    def salvar_eleicao(self, id_eleicao, ano, tipo):
+        """Registra o ID da eleição do ano e tipo, para consultas que não acessam o TSE"""
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO eleicoes (id_eleicao, ano, tipo) VALUES (?, ?, ?)",
+                              (str(id_eleicao), str(ano), tipo.strip().lower()))
+
+    def consultar_id_eleicao(self, ano, tipo):
+        """ID da eleição registrada para o ano e tipo, ou None"""
+        linha = self.conn.execute("SELECT id_eleicao FROM eleicoes WHERE ano = ? AND tipo = ?",
+                                  (str(ano), tipo.strip().lower())).fetchone()
+        return linha[0] if linha else None
+
+    def salvar_candidatos(self, candidatos, regiao, uf, municipio, id_execucao=None):
+        """Substitui, em uma única transação, os candidatos do município pelos informados
+
+        Com regiao None (consultas que não sabem a região, como as do serviço
+        HTTP), mantém a região já registrada para o município.
+        """
+        if not candidatos:
+            return
+        uf = uf.strip().upper()
+        municipio = municipio.strip().upper()
+        agora = _agora()
+        municipios = {(c.id_eleicao, c.codigo_municipio) for c in candidatos}
+        with self.conn:
+            regioes = dict.fromkeys(municipios, regiao)
+            if regiao is None:
+                for chave in municipios:
+                    linha = self.conn.execute(
+                        "SELECT regiao FROM candidatos WHERE id_eleicao = ? AND codigo_municipio = ? "
+                        "AND regiao IS NOT NULL LIMIT 1", chave
+                    ).fetchone()
+                    regioes[chave] = linha[0] if linha else None
+            self.conn.executemany(
+                "DELETE FROM candidatos WHERE id_eleicao = ? AND codigo_municipio = ?", municipios
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO candidatos (id_eleicao, id_candidato, regiao, uf, municipio, codigo_municipio, "
+                "nome_completo, nome_urna, numero, partido, codigo_cargo, reeleicao, id_execucao, atualizado_em) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                ((c.id_eleicao, c.id, regioes[(c.id_eleicao, c.codigo_municipio)], uf, municipio,
+                  c.codigo_municipio, c.nome_completo, c.nome_urna,
+                  c.numero, c.partido, c.codigo_cargo, int(c.reeleicao), id_execucao, agora)
+                 for c in candidatos)
+            )
+        self.logger.info(f"{len(candidatos)} candidatos salvos para {municipio}/{uf}")
+
+    def consultar_candidatos(self, uf=None, municipio=None, partido=None, codigo_cargo=None,
+                             id_eleicao=None, id_candidato=None):
+        """Consulta candidatos de qualquer município pelos filtros informados"""
+        filtros = {
+            'uf': uf.strip().upper() if uf else None,
+            'municipio': municipio.strip().upper() if municipio else None,
+            'partido': partido,
+            'codigo_cargo': codigo_cargo,
+            'id_eleicao': id_eleicao,
+            'id_candidato': id_candidato
+        }
+        condicoes = [f"{coluna} = ?" for coluna, valor in filtros.items() if valor is not None]
+        valores = [valor for valor in filtros.values() if valor is not None]
+        sql = f"SELECT {COLUNAS_CANDIDATO} FROM candidatos"
+        if condicoes:
+            sql += " WHERE " + " AND ".join(condicoes)
+        sql += " ORDER BY uf, municipio, rowid"
+        return [Candidato(*linha) for linha in self.conn.execute(sql, valores)]
+
+    def salvar_fotos(self, registros, id_execucao=None):
+        """Registra caminhos, hashes e opções das fotos em uma única transação
+
+        Cada registro é um dict com as chaves candidato, tipo, caminho, sha256 e opcoes,
+        e opcionalmente etag e last_modified (validadores HTTP da foto no TSE).
+        """
+        agora = _agora()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO fotos (id_eleicao, id_candidato, tipo, caminho, sha256, opcoes, "
+                "etag, last_modified, id_execucao, atualizado_em) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                ((r['candidato'].id_eleicao, r['candidato'].id, r['tipo'], r['caminho'], r.get('sha256'),
+                  json.dumps(r.get('opcoes') or {}), r.get('etag'), r.get('last_modified'), id_execucao, agora)
+                 for r in registros)
+            )
+
+    def remover_fotos(self, chaves):
+        """Remove os registros (candidato, tipo) informados, em uma única transação
+
+        Usado quando o download ou o processamento falha: sem registro, o
+        candidato volta a ser processado na próxima execução incremental.
+        """
+        with self.conn:
+            self.conn.executemany(
+                "DELETE FROM fotos WHERE id_eleicao = ? AND id_candidato = ? AND tipo = ?",
+                ((candidato.id_eleicao, candidato.id, tipo) for candidato, tipo in chaves)
+            )
+
+    @staticmethod
+    def _registro_foto(caminho, sha256, opcoes, etag, last_modified):
+        return {'caminho': caminho, 'sha256': sha256, 'opcoes': json.loads(opcoes or '{}'),
+                'etag': etag, 'last_modified': last_modified}
+
+    def consultar_fotos(self, id_eleicao, id_candidato):
+        """Retorna as fotos registradas do candidato, indexadas pelo tipo"""
+        cursor = self.conn.execute(
+            "SELECT tipo, caminho, sha256, opcoes, etag, last_modified FROM fotos "
+            "WHERE id_eleicao = ? AND id_candidato = ?",
+            (id_eleicao, id_candidato)
+        )
+        return {tipo: self._registro_foto(*registro) for tipo, *registro in cursor}
+
+    def consultar_fotos_municipio(self, id_eleicao, codigo_municipio):
+        """Fotos registradas dos candidatos do município: {id_candidato: {tipo: registro}}
+
+        É o estado de processamento com que a execução incremental compara a listagem.
+        """
+        cursor = self.conn.execute(
+            "SELECT f.id_candidato, f.tipo, f.caminho, f.sha256, f.opcoes, f.etag, f.last_modified "
+            "FROM fotos f JOIN candidatos c ON c.id_eleicao = f.id_eleicao AND c.id_candidato = f.id_candidato "
+            "WHERE f.id_eleicao = ? AND c.codigo_municipio = ?",
+            (id_eleicao, str(codigo_municipio))
+        )
+        estados = {}
+        for id_candidato, tipo, *registro in cursor:
+            estados.setdefault(id_candidato, {})[tipo] = self._registro_foto(*registro)
+        return estados
+
+    def registrar_latencias(self, amostras, id_execucao=None):
+        """Registra amostras (operacao, segundos) medidas durante a execução"""
+        agora = _agora()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO latencias (id_execucao, operacao, segundos, registrada_em) VALUES (?, ?, ?, ?)",
+                ((id_execucao, operacao, segundos, agora) for operacao, segundos in amostras)
+            )
+
+    def latencias_medias(self, amostras_por_operacao=200):
+        """Média das amostras mais recentes de cada operação: {operacao: (media, amostras)}"""
+        medias = {}
+        for (operacao,) in self.conn.execute("SELECT DISTINCT operacao FROM latencias").fetchall():
+            media, amostras = self.conn.execute(
+                "SELECT AVG(segundos), COUNT(*) FROM (SELECT segundos FROM latencias WHERE operacao = ? "
+                "ORDER BY rowid DESC LIMIT ?)", (operacao, amostras_por_operacao)
+            ).fetchone()
+            medias[operacao] = (media, amostras)
+        return medias
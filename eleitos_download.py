@@ -1,28 +1,48 @@
-import requests
+import argparse
 import csv
 import json
 import os
-from picwish import PicWishProcessor
-from geradortarget import process_candidates
+import tempfile
+import threading
+import time
+from candidato import CARGOS, CAMPOS, Candidato
 from log_config import setup_logger
+# requests, a base SQLite (datastore), o leitor de JSON, o perfilamento, o PicWish e
+# os backends de tarjeta (Pillow, svgwrite, CorelDraw) são importados apenas pelas
+# funções que os usam, para que --help e a validação dos argumentos sejam imediatos
 
 # Configuração do logger
 logger = setup_logger('eleitos_download', os.path.join(os.path.dirname(__file__), 'eleitos_download.log'))
 
-# Códigos dos cargos
-CARGOS = {
-    11: "Prefeito",
-    12: "Vice-prefeito",
-    13: "Vereador"
-}
+# Pasta com os dados de todos os municípios (DADOS/<REGIÃO>/<UF>/<MUNICÍPIO>)
+PASTA_DADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "DADOS")
+
+# Tamanho dos trechos lidos da listagem de candidatos
+TAMANHO_PEDACO = 64 * 1024
+
+# Timeout (conexão, leitura) das requisições ao TSE
+TIMEOUT_TSE = (10, 60)
+
+# Uma sessão por thread: reaproveita as conexões com o TSE entre as chamadas sem
+# compartilhar a requests.Session, que não é thread-safe, entre as threads do serviço HTTP
+_local = threading.local()
+
+def obter_sessao():
+    """Sessão HTTP com o TSE da thread atual, criada (e requests importado) na primeira requisição"""
+    sessao = getattr(_local, 'sessao', None)
+    if sessao is None:
+        import requests
+        sessao = _local.sessao = requests.Session()
+    return sessao
 
 def obter_id_eleicao(ano, tipo):
+    import requests
     logger.info(f"Buscando ID da eleição: ano={ano}, tipo={tipo}")
     tipo = tipo.lower()
     abrangencia = "M" if tipo == "municipal" else "F"
     url = "https://divulgacandcontas.tse.jus.br/divulga/rest/v1/ata/ordinarias"
     try:
-        response = requests.get(url)
+        response = obter_sessao().get(url, timeout=TIMEOUT_TSE)
         response.raise_for_status()
         eleicoes = response.json()
         for eleicao in eleicoes:
@@ -33,9 +53,10 @@ def obter_id_eleicao(ano, tipo):
     return None
 
 def obter_ufs_por_regiao(id_eleicao):
+    import requests
     url = f"https://divulgacandcontas.tse.jus.br/divulga/rest/v1/eleicao/eleicao-atual?idEleicao={id_eleicao}"
     try:
-        response = requests.get(url)
+        response = obter_sessao().get(url, timeout=TIMEOUT_TSE)
         response.raise_for_status()
         dados = response.json()
         ues = dados.get("ues", [])
@@ -54,9 +75,10 @@ def obter_ufs_por_regiao(id_eleicao):
     return {}
 
 def buscar_codigo_municipio(uf, id_eleicao, nome_municipio):
+    import requests
     url = f"https://divulgacandcontas.tse.jus.br/divulga/rest/v1/eleicao/buscar/{uf}/{id_eleicao}/municipios"
     try:
-        response = requests.get(url)
+        response = obter_sessao().get(url, timeout=TIMEOUT_TSE)
         response.raise_for_status()
         municipios = response.json()
         
@@ -82,47 +104,51 @@ def buscar_codigo_municipio(uf, id_eleicao, nome_municipio):
         logger.error(f"Erro ao processar dados dos municípios: {e}")
         return None
 
-def obter_candidatos_eleitos(id_eleicao, codigo_municipio, codigo_cargo):
+def iterar_candidatos_eleitos(id_eleicao, codigo_municipio, codigo_cargo):
+    """Gera os candidatos eleitos do cargo, depois de ler a listagem inteira
+
+    A listagem do TSE é decodificada em streaming, sem montar o JSON em memória,
+    mas os eleitos do cargo ficam em um buffer (já como Candidato) e só são
+    gerados quando a resposta termina. Assim a conexão é liberada antes de o
+    chamador começar a processar o primeiro candidato (downloads e PicWish
+    levariam minutos com ela aberta), e uma listagem interrompida ou inválida
+    levanta a exceção antes de qualquer candidato, em vez de ser tratada como
+    completa (e substituir o município na base). O streaming vale entre cargos:
+    o próximo cargo só é consultado quando o chamador termina este.
+    """
+    import requests
+    from leitorjson import LeitorJson, decodificar_utf8
     url = f"https://divulgacandcontas.tse.jus.br/divulga/rest/v1/candidatura/listar/2024/{codigo_municipio}/{id_eleicao}/{codigo_cargo}/candidatos"
+    eleitos = []
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        dados = response.json()
-        candidatos = dados.get("candidatos", [])
-        eleitos = []
-        for candidato in candidatos:
-            totalizacao = candidato.get("descricaoTotalizacao", "")
-            if "Eleito" in totalizacao:
-                id_candidato = candidato.get("id")
-                imagem_url = f"https://divulgacandcontas.tse.jus.br/divulga/rest/arquivo/img/{id_eleicao}/{id_candidato}/{codigo_municipio}"
-                eleitos.append({
-                    "Nome Completo": candidato.get("nomeCompleto"),
-                    "Nome de Urna": candidato.get("nomeUrna"),
-                    "Número na Urna": candidato.get("numero"),
-                    "Partido": candidato.get("partido", {}).get("sigla"),
-                    "Cargo": CARGOS[codigo_cargo],
-                    "Código do Cargo": codigo_cargo,
-                    "Código do Município": codigo_municipio,
-                    "Reeleição": "Sim" if candidato.get("st_REELEICAO") else "Não",
-                    "Imagem Oficial": imagem_url
-                })
-        logger.info(f"Encontrados {len(eleitos)} candidatos eleitos para o cargo {codigo_cargo}")
-        return eleitos
+        with obter_sessao().get(url, stream=True, timeout=TIMEOUT_TSE) as response:
+            response.raise_for_status()
+            leitor = LeitorJson(decodificar_utf8(response.iter_content(chunk_size=TAMANHO_PEDACO)))
+            for candidato in leitor.iterar_array("candidatos"):
+                totalizacao = candidato.get("descricaoTotalizacao") or ""
+                if "Eleito" in totalizacao:
+                    eleitos.append(Candidato.from_tse(candidato, id_eleicao, codigo_municipio, codigo_cargo))
     except requests.RequestException as e:
         logger.error(f"Erro ao acessar candidatos do cargo {codigo_cargo}: {e}")
-    return []
+        raise
+    except ValueError as e:
+        logger.error(f"Erro ao decodificar candidatos do cargo {codigo_cargo}: {e}")
+        raise
+    logger.info(f"Encontrados {len(eleitos)} candidatos eleitos para o cargo {codigo_cargo}")
+    yield from eleitos
+
+def obter_candidatos_eleitos(id_eleicao, codigo_municipio, codigo_cargo):
+    return list(iterar_candidatos_eleitos(id_eleicao, codigo_municipio, codigo_cargo))
 
-def criar_estrutura_diretorios(regiao, uf, municipio):
+def criar_estrutura_diretorios(regiao, uf, municipio, pasta_dados=PASTA_DADOS):
     """Cria a estrutura de diretórios se não existir e retorna o caminho completo"""
     # Converte todos os nomes para maiúsculas e remove espaços extras
     regiao = regiao.strip().upper()
     uf = uf.strip().upper()
     municipio = municipio.strip().upper()
     
-    # Obtém o diretório atual do script
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    # Define o caminho base relativo ao script e cria a estrutura
-    caminho_completo = os.path.join(script_dir, "DADOS", regiao, uf, municipio)
+    # Define o caminho dentro da pasta de dados (DADOS ao lado do script) e cria a estrutura
+    caminho_completo = os.path.join(pasta_dados, regiao, uf, municipio)
     
     # Cria os diretórios se não existirem
     os.makedirs(caminho_completo, exist_ok=True)
@@ -130,30 +156,190 @@ def criar_estrutura_diretorios(regiao, uf, municipio):
     logger.info(f"Caminho da pasta criado: {caminho_completo}")
     return caminho_completo
 
-def exportar_para_csv_json(dados, uf, municipio, regiao):
-    """Exporta os dados para CSV e JSON na estrutura de pastas correta"""
-    # Obtém o caminho completo para salvar os arquivos
-    caminho_pasta = criar_estrutura_diretorios(regiao, uf, municipio)
+def caminho_exportacao(uf, municipio, regiao, pasta_dados=PASTA_DADOS):
+    """Retorna o caminho base (sem extensão) dos arquivos exportados do município"""
+    caminho_pasta = criar_estrutura_diretorios(regiao, uf, municipio, pasta_dados)
     base_nome = f"candidatos_eleitos_{uf.upper()}_{municipio.upper().replace(' ', '_')}"
+    return os.path.join(caminho_pasta, base_nome)
+
+def _escrever_atomico(caminho, escrever, **kwargs):
+    """Escreve em um arquivo temporário na mesma pasta e o renomeia sobre o destino"""
+    pasta = os.path.dirname(caminho)
+    fd, caminho_tmp = tempfile.mkstemp(dir=pasta, prefix=".tmp_", suffix=os.path.splitext(caminho)[1])
+    try:
+        with os.fdopen(fd, mode="w", encoding="utf-8", **kwargs) as arquivo:
+            escrever(arquivo)
+        os.replace(caminho_tmp, caminho)
+    except BaseException:
+        if os.path.exists(caminho_tmp):
+            os.remove(caminho_tmp)
+        raise
+
+def exportar_para_csv_json(dados, uf, municipio, regiao, store, pasta_dados=PASTA_DADOS):
+    """Salva os dados na base SQLite e exporta o município para CSV e JSON na estrutura de pastas correta
+    
+    Se a base falhar, a exportação é feita com os candidatos recebidos. `pasta_dados`
+    troca a pasta DADOS (os benchmarks exportam para uma pasta temporária).
+    """
+    from perfilamento import etapa
+    with etapa('exportacao'):
+        _exportar_municipio(dados, uf, municipio, regiao, store, pasta_dados)
+
+def _exportar_municipio(dados, uf, municipio, regiao, store, pasta_dados):
+    if not dados:
+        logger.info(f"Nenhum candidato para exportar em {municipio}/{uf}")
+        return
+    try:
+        store.salvar_candidatos(dados, regiao, uf, municipio)
+        dados = store.consultar_candidatos(uf=uf, municipio=municipio, id_eleicao=dados[0].id_eleicao)
+    except Exception as e:
+        logger.error(f"Erro ao salvar candidatos na base: {e}")
+    
+    # Obtém o caminho base para salvar os arquivos
+    base_caminho = caminho_exportacao(uf, municipio, regiao, pasta_dados)
     
     try:
         # Cria os caminhos completos para os arquivos
-        caminho_csv = os.path.join(caminho_pasta, f"{base_nome}.csv")
-        caminho_json = os.path.join(caminho_pasta, f"{base_nome}.json")
+        caminho_csv = f"{base_caminho}.csv"
+        caminho_json = f"{base_caminho}.json"
         
         # Salva o arquivo CSV
-        with open(caminho_csv, mode="w", newline="", encoding="utf-8") as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=dados[0].keys())
+        def escrever_csv(csvfile):
+            writer = csv.DictWriter(csvfile, fieldnames=list(CAMPOS))
             writer.writeheader()
-            writer.writerows(dados)
+            writer.writerows(candidato.to_dict() for candidato in dados)
+        _escrever_atomico(caminho_csv, escrever_csv, newline="")
             
         # Salva o arquivo JSON
-        with open(caminho_json, mode="w", encoding="utf-8") as jsonfile:
-            json.dump(dados, jsonfile, ensure_ascii=False, indent=2)
+        _escrever_atomico(caminho_json, lambda jsonfile: json.dump(
+            [candidato.to_dict() for candidato in dados], jsonfile, ensure_ascii=False, indent=2))
             
         logger.info(f"Dados exportados para:\n{caminho_csv}\n{caminho_json}")
     except Exception as e:
         logger.error(f"Erro ao exportar arquivos: {e}")
+    
+    exportar_para_parquet(dados, f"{base_caminho}.parquet")
+
+def exportar_para_parquet(dados, caminho_parquet):
+    """Exporta os dados em formato colunar (Parquet), se o pyarrow estiver instalado"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        logger.info("pyarrow não instalado, exportação Parquet ignorada (pip install pyarrow)")
+        return
+    
+    try:
+        # Monta as colunas diretamente dos atributos, sem passar por dicts
+        tabela = pa.table({
+            "id_candidato": pa.array([c.id for c in dados], pa.string()),
+            "id_eleicao": pa.array([c.id_eleicao for c in dados], pa.string()),
+            "nome_completo": pa.array([c.nome_completo for c in dados], pa.string()),
+            "nome_urna": pa.array([c.nome_urna for c in dados], pa.string()),
+            "numero": pa.array([c.numero for c in dados], pa.int32()),
+            "partido": pa.array([c.partido for c in dados], pa.string()).dictionary_encode(),
+            "codigo_cargo": pa.array([c.codigo_cargo for c in dados], pa.int8()),
+            "cargo": pa.array([c.cargo for c in dados], pa.string()).dictionary_encode(),
+            "codigo_municipio": pa.array([c.codigo_municipio for c in dados], pa.string()),
+            "reeleicao": pa.array([c.reeleicao for c in dados], pa.bool_())
+        })
+        caminho_tmp = f"{caminho_parquet}.tmp"
+        pq.write_table(tabela, caminho_tmp, compression="zstd")
+        os.replace(caminho_tmp, caminho_parquet)
+        logger.info(f"Dados exportados para: {caminho_parquet}")
+    except Exception as e:
+        logger.error(f"Erro ao exportar Parquet: {e}")
+
+def opcoes_processamento(params):
+    """Opções PicWish registradas com a foto processada"""
+    return {chave: params[chave] for chave in ('scale_iterations', 'remove_background', 'make_id_photo')}
+
+def processamento_concluido(estado, params):
+    """Indica se as fotos esperadas pelos parâmetros foram geradas e continuam no disco
+
+    `estado` são as fotos registradas do candidato ({tipo: registro}). A foto
+    processada só vale se foi gerada com as mesmas opções PicWish.
+    """
+    tipos = []
+    if params['baixar_imagens']:
+        tipos.append('original')
+    if params['usar_ia']:
+        tipos.append('processada')
+    for tipo in tipos:
+        registro = estado.get(tipo)
+        if not registro or not os.path.exists(registro['caminho']):
+            return False
+    return not params['usar_ia'] or estado['processada']['opcoes'] == opcoes_processamento(params)
+
+def filtrar_pendentes(candidatos, anteriores, estados, params, processor=None):
+    """Gera os candidatos novos, alterados, sem processamento concluído ou com foto alterada
+
+    `anteriores` é a listagem da execução anterior registrada na base e `estados` as fotos
+    registradas na base (EleitosDatastore.consultar_fotos_municipio). Um
+    candidato cujo download ou processamento falhou não tem registro e volta a ser
+    processado. A foto no TSE só é conferida se houver `processor`.
+    """
+    por_id = {c.id: c for c in anteriores}
+    contagem = {'novos': 0, 'alterados': 0, 'sem processamento': 0, 'com foto alterada': 0, 'inalterados': 0}
+    for candidato in candidatos:
+        anterior = por_id.pop(candidato.id, None)
+        estado = estados.get(candidato.id, {})
+        if anterior is None:
+            contagem['novos'] += 1
+        elif anterior != candidato:
+            contagem['alterados'] += 1
+        elif not processamento_concluido(estado, params):
+            contagem['sem processamento'] += 1
+        elif processor and params['baixar_imagens'] and processor.image_changed(candidato.imagem_oficial, estado['original']):
+            contagem['com foto alterada'] += 1
+        else:
+            contagem['inalterados'] += 1
+            continue
+        yield candidato
+    resumo = ", ".join(f"{quantidade} {situacao}" for situacao, quantidade in contagem.items())
+    logger.info(f"Comparação com a execução anterior: {resumo}, {len(por_id)} removidos")
+
+def registrar_fotos(store, resultados, params, id_execucao=None, adiados=()):
+    """Registra na base SQLite as fotos da execução e descarta as que falharam
+
+    Sem registro, o candidato com download ou processamento malsucedido volta a
+    ser processado na próxima execução incremental; o mesmo vale para os
+    `adiados` pelo orçamento, mesmo que já constem da exportação desta.
+    """
+    from datastore import sha256_arquivo
+    opcoes = opcoes_processamento(params)
+    tipos = ('original', 'processada') if params['usar_ia'] else ('original',)
+    registros = []
+    falhas = []
+    for resultado in resultados:
+        for tipo in tipos:
+            caminho = resultado.get(tipo)
+            if caminho:
+                registros.append({
+                    'candidato': resultado['candidato'],
+                    'tipo': tipo,
+                    'caminho': caminho,
+                    'sha256': resultado.get(f'sha256_{tipo}') or sha256_arquivo(caminho),
+                    'opcoes': opcoes if tipo == 'processada' else {},
+                    'etag': resultado.get(f'etag_{tipo}'),
+                    'last_modified': resultado.get(f'last_modified_{tipo}')
+                })
+            else:
+                falhas.append((resultado['candidato'], tipo))
+    falhas += [(candidato, tipo) for candidato in adiados for tipo in ('original', 'processada')]
+    store.salvar_fotos(registros, id_execucao)
+    store.remover_fotos(falhas)
+
+def fotos_registradas(store, id_eleicao, codigo_municipio):
+    """Foto de cada candidato do município para as tarjetas, {id do candidato: caminho}
+
+    Vem dos registros da base: a processada, se houver, senão a original. O
+    registro da processada é o do último processamento bem-sucedido (um
+    processamento que falha o descarta), então não é preciso procurar na pasta.
+    """
+    return {id_candidato: (estado.get('processada') or estado['original'])['caminho']
+            for id_candidato, estado in store.consultar_fotos_municipio(id_eleicao, codigo_municipio).items()
+            if estado.get('processada') or estado.get('original')}
 
 def carregar_config():
     """Carrega configurações do arquivo config.json"""
@@ -181,6 +367,8 @@ def obter_parametros():
     uf = input("UF (Ex: SC/PR/RS/SP): ").strip().upper()
     municipio = input("Nome do Município: ").strip()
     
+    incremental = input("Atualização incremental (apenas novos/alterados)? (s/N): ").strip().lower() == 's'
+    
     print("\n=== Configuração do Processamento de Imagens ===")
     usar_ia = input("Deseja melhorar as fotos com IA? (s/N): ").strip().lower() == 's'
     
@@ -190,11 +378,14 @@ def obter_parametros():
         'regiao': regiao,
         'uf': uf,
         'municipio': municipio,
+        'incremental': incremental,
         'usar_ia': usar_ia,
         'api_key': None,
         'scale_iterations': 0,
         'remove_background': False,
-        'make_id_photo': False
+        'make_id_photo': False,
+        'baixar_imagens': True,
+        'backend_tarjeta': 'corel'
     }
     
     if usar_ia:
@@ -207,6 +398,9 @@ def obter_parametros():
         
         make_3x4 = input("Processar para 3x4? (s/N): ").strip().lower()
         params['make_id_photo'] = make_3x4 == 's'
+        
+        creditos = input("Limite de créditos PicWish (Enter para sem limite): ").strip()
+        params['orcamento'] = {'creditos': float(creditos) if creditos.replace('.', '', 1).isdigit() else None}
     
     print("\n=== Configuração de Tarjetas ===")
     gerar_tarjetas = input("Deseja gerar tarjetas? (s/N): ").strip().lower() == 's'
@@ -215,54 +409,329 @@ def obter_parametros():
     logger.info(f"Parâmetros obtidos: {params}")
     return params
 
-# === Fluxo principal com variáveis fixas ===
-if __name__ == "__main__":
-    logger.info("Iniciando processo de download de eleitos")
-    # Obter parâmetros via input
-    params = obter_parametros()
-    
+def resolver_municipio(params):
+    """Retorna (id_eleicao, codigo_municipio) ou (None, None) se não encontrados"""
     id_eleicao = obter_id_eleicao(params['ano'], params['tipo'])
-    if id_eleicao:
-        regioes = obter_ufs_por_regiao(id_eleicao)
-        ufs = regioes.get(params['regiao'])
-        if ufs and any(uf["sigla"] == params['uf'] for uf in ufs):
-            codigo_municipio = buscar_codigo_municipio(params['uf'], id_eleicao, params['municipio'])
-            if codigo_municipio:
-                todos_eleitos = []
-                for codigo_cargo in CARGOS:
-                    eleitos = obter_candidatos_eleitos(id_eleicao, codigo_municipio, codigo_cargo)
-                    todos_eleitos.extend(eleitos)
-                if todos_eleitos:
-                    # Exportar dados
-                    caminho_base = criar_estrutura_diretorios(params['regiao'], params['uf'], params['municipio'])
-                    exportar_para_csv_json(todos_eleitos, params['uf'], params['municipio'], params['regiao'])
-                    
-                    # Processar imagens
-                    processor = PicWishProcessor(api_key=params['api_key'])
-                    if params['usar_ia']:
-                        resultados = processor.process_candidates_list(
-                            todos_eleitos,
-                            caminho_base,
-                            scale_iterations=params['scale_iterations'],
-                            remove_background=params['remove_background'],
-                            make_id_photo=params['make_id_photo']
-                        )
-                    else:
-                        resultados = processor.download_candidates_list(todos_eleitos, caminho_base)
-                    
-                    # Mostrar resultados do processamento
-                    for resultado in resultados:
-                        status = "sucesso" if resultado['sucesso'] else "falha"
-                        print(f"{'Processamento' if params['usar_ia'] else 'Download'} de {resultado['nome']} ({resultado['cargo']}): {status}")
-                    
-                    # Gerar tarjetas se solicitado
-                    if params['gerar_tarjetas']:
-                        process_candidates(todos_eleitos, True)
-                else:
-                    logger.info("Nenhum candidato eleito encontrado.")
-            else:
-                logger.info("Município não encontrado.")
+    if not id_eleicao:
+        logger.info("Eleição não encontrada.")
+        return None, None
+    regioes = obter_ufs_por_regiao(id_eleicao)
+    ufs = regioes.get(params['regiao'])
+    if not (ufs and any(uf["sigla"] == params['uf'] for uf in ufs)):
+        logger.info("UF não encontrada na região selecionada.")
+        return None, None
+    codigo_municipio = buscar_codigo_municipio(params['uf'], id_eleicao, params['municipio'])
+    if not codigo_municipio:
+        logger.info("Município não encontrado.")
+        return None, None
+    return id_eleicao, codigo_municipio
+
+def gerar_tarjetas(candidatos, backend, output_dir, **opcoes):
+    """Gera as tarjetas com o backend informado, carregado apenas neste momento"""
+    from backends import carregar_backend
+    from perfilamento import etapa
+    with etapa(f"tarjetas_{backend}"):
+        carregar_backend(backend)(candidatos, output_dir, **opcoes)
+
+def executar(params):
+    """Executa a coleta de um município conforme os parâmetros"""
+    from datastore import EleitosDatastore
+    from perfilamento import etapa
+    store = EleitosDatastore()
+    id_execucao = store.iniciar_execucao(params)
+    status_execucao = "sem candidatos"
+    processor = None
+    # Amostras (operacao, segundos) gravadas na base para o planejador
+    latencias = []
+    todos_eleitos = []
+    anteriores = []
+    resultados = []
+    adiados = []
+    registrado = False
+    try:
+        inicio = time.monotonic()
+        with etapa('tse_municipio'):
+            id_eleicao, codigo_municipio = resolver_municipio(params)
+        latencias.append(('tse_municipio', time.monotonic() - inicio))
+        if not codigo_municipio:
+            status_execucao = "município não encontrado"
+            return
+        store.salvar_eleicao(id_eleicao, params['ano'], params['tipo'])
+        # Listagem da execução anterior, como ficou registrada na base
+        anteriores = store.consultar_candidatos(uf=params['uf'], municipio=params['municipio'], id_eleicao=id_eleicao)
+        
+        caminho_base = criar_estrutura_diretorios(params['regiao'], params['uf'], params['municipio'])
+        if params['baixar_imagens']:
+            from picwish import PicWishProcessor
+            hedge = None
+            if params.get('hedge'):
+                from hedging import PoliticaHedge
+                hedge = PoliticaHedge()
+            receptor = None
+            callback = params.get('callback') or {}
+            if params['usar_ia'] and callback.get('porta'):
+                from picwish_callbacks import ReceptorCallbacks
+                receptor = ReceptorCallbacks(callback.get('host') or '127.0.0.1', callback['porta'], callback.get('url'))
+            opcoes_picwish = {'base_url': params['picwish_url']} if params.get('picwish_url') else {}
+            processor = PicWishProcessor(api_key=params['api_key'] or '', hedge=hedge, receptor=receptor,
+                                         **opcoes_picwish)
+        
+        # Os candidatos de cada cargo seguem para o processamento assim que a listagem do cargo termina
+        def eleitos_listados():
+            for codigo_cargo in CARGOS:
+                inicio = time.monotonic()
+                with etapa('tse_listagem'):
+                    candidatos = obter_candidatos_eleitos(id_eleicao, codigo_municipio, codigo_cargo)
+                latencias.append(('tse_listagem', time.monotonic() - inicio))
+                todos_eleitos.extend(candidatos)
+                yield from candidatos
+        
+        # No modo incremental só seguem adiante candidatos novos, alterados, sem processamento
+        # concluído na base ou com foto alterada
+        pendentes = eleitos_listados()
+        if params['incremental']:
+            estados = store.consultar_fotos_municipio(id_eleicao, codigo_municipio)
+            pendentes = filtrar_pendentes(pendentes, anteriores, estados, params, processor)
+        
+        # Com orçamento de créditos ou tempo, os candidatos de maior valor são processados primeiro;
+        # a listagem já chega por cargo, em ordem de valor, e continua sendo consumida aos poucos
+        from planejador import Planejador
+        if processor and Planejador.limites(params) != (None, None):
+            planejador = Planejador(store)
+            pendentes = planejador.selecionar_no_orcamento(pendentes, params, adiados,
+                                                           planejador.segundos_fixos_execucao(params, anteriores))
+        
+        # Processar imagens (os resultados vão para `resultados` à medida que saem, para serem
+        # registrados na base mesmo que a listagem de um cargo seguinte falhe)
+        if params['usar_ia']:
+            processor.process_candidates_list(
+                pendentes,
+                caminho_base,
+                scale_iterations=params['scale_iterations'],
+                remove_background=params['remove_background'],
+                make_id_photo=params['make_id_photo'],
+                results=resultados
+            )
+        elif processor:
+            processor.download_candidates_list(pendentes, caminho_base, results=resultados)
         else:
-            logger.info("UF não encontrada na região selecionada.")
-    else:
-        logger.info("Eleição não encontrada.")
\ No newline at end of file
+            for candidato in pendentes:
+                print(f"{candidato.numero} - {candidato.nome_urna} ({candidato.partido}) - {candidato.cargo}")
+                resultados.append({'nome': candidato.nome_urna, 'cargo': candidato.cargo, 'sucesso': True})
+        
+        # Registradas já aqui porque as tarjetas usam as fotos da base
+        registrar_fotos(store, [r for r in resultados if 'candidato' in r], params, id_execucao, adiados)
+        registrado = True
+        for candidato in adiados:
+            print(f"Adiado pelo orçamento: {candidato.nome_urna} ({candidato.cargo})")
+        
+        if not todos_eleitos:
+            logger.info("Nenhum candidato eleito encontrado.")
+            return
+        
+        # Exportar dados
+        exportar_para_csv_json(todos_eleitos, params['uf'], params['municipio'], params['regiao'], store)
+        status_execucao = "concluída"
+        
+        # Mostrar resultados do processamento
+        if processor:
+            for resultado in resultados:
+                status = "sucesso" if resultado['sucesso'] else "falha"
+                print(f"{'Processamento' if params['usar_ia'] else 'Download'} de {resultado['nome']} ({resultado['cargo']}): {status}")
+        
+        # Gerar tarjetas se solicitado (o documento CorelDraw contém todos os eleitos,
+        # então só é refeito quando algo mudou)
+        if params['gerar_tarjetas'] and resultados:
+            inicio = time.monotonic()
+            gerar_tarjetas(todos_eleitos, params['backend_tarjeta'], os.path.join(caminho_base, 'tarjetas'),
+                           fotos_dir=caminho_base, fotos=fotos_registradas(store, id_eleicao, codigo_municipio),
+                           **params.get('opcoes_tarjeta', {}))
+            latencias.append((f"tarjeta_{params['backend_tarjeta']}", (time.monotonic() - inicio) / len(todos_eleitos)))
+    except BaseException:
+        # Falha antes da exportação: os candidatos já listados vão para a base, completados pela
+        # listagem anterior, para que a próxima execução incremental não refaça o que já foi pago
+        if todos_eleitos and status_execucao != "concluída":
+            listados = {c.id for c in todos_eleitos}
+            store.salvar_candidatos(todos_eleitos + [c for c in anteriores if c.id not in listados],
+                                    params['regiao'], params['uf'], params['municipio'])
+        status_execucao = "falha"
+        raise
+    finally:
+        try:
+            # Falha no meio do processamento: o que já foi feito (e pago ao PicWish) fica registrado
+            if not registrado:
+                registrar_fotos(store, [r for r in resultados if 'candidato' in r], params, id_execucao, adiados)
+            store.finalizar_execucao(id_execucao, status_execucao)
+            store.registrar_latencias(latencias + (processor.latencias if processor else []), id_execucao)
+        finally:
+            store.close()
+            if processor and processor.hedge:
+                processor.hedge.close()
+            if processor and processor.receptor:
+                processor.receptor.close()
+
+def gerar_tarjetas_municipio(params):
+    """Gera tarjetas a partir dos candidatos da eleição já salvos na base, sem acessar o TSE"""
+    from datastore import EleitosDatastore
+    store = EleitosDatastore()
+    try:
+        id_eleicao = store.consultar_id_eleicao(params['ano'], params['tipo'])
+        candidatos = store.consultar_candidatos(uf=params['uf'], municipio=params['municipio'],
+                                                id_eleicao=id_eleicao) if id_eleicao else []
+        fotos = fotos_registradas(store, id_eleicao, candidatos[0].codigo_municipio) if candidatos else {}
+    finally:
+        store.close()
+    if not candidatos:
+        logger.info(f"Nenhum candidato da eleição {params['tipo']} de {params['ano']} salvo para "
+                    f"{params['municipio']}/{params['uf']}. Execute 'listar' antes.")
+        return
+    caminho_base = criar_estrutura_diretorios(params['regiao'], params['uf'], params['municipio'])
+    gerar_tarjetas(candidatos, params['backend_tarjeta'], os.path.join(caminho_base, 'tarjetas'),
+                   fotos_dir=caminho_base, fotos=fotos, **params.get('opcoes_tarjeta', {}))
+
+def criar_parser():
+    parser = argparse.ArgumentParser(
+        description="Coleta e processamento de fotos de candidatos eleitos. Sem subcomando, roda no modo interativo."
+    )
+    subparsers = parser.add_subparsers(dest='comando')
+    
+    municipio = argparse.ArgumentParser(add_help=False)
+    municipio.add_argument('--ano', default='2024', help="Ano da eleição (padrão: 2024)")
+    municipio.add_argument('--tipo', default='municipal', choices=['municipal', 'federal'])
+    municipio.add_argument('--regiao', required=True, type=str.upper, help="SUL/SUDESTE/NORTE/NORDESTE/CENTRO-OESTE")
+    municipio.add_argument('--uf', required=True, type=str.upper)
+    municipio.add_argument('--municipio', required=True)
+    
+    coleta = argparse.ArgumentParser(add_help=False)
+    coleta.add_argument('--incremental', action='store_true', help="Processa apenas candidatos novos/alterados")
+    coleta.add_argument('--tarjetas', action='store_true', help="Gera tarjetas ao final")
+    coleta.add_argument('--hedge', action='store_true',
+                        help="Reenvia downloads lentos (acima do p95 observado) e fica com a primeira resposta")
+    coleta.add_argument('--backend', default='corel', help="Backend de tarjeta: corel, png, folha-pdf, folha-png")
+    coleta.add_argument('--pagina', default='A4', help="Página das folhas: A4, A4-paisagem, A3, A3-paisagem, corel")
+    coleta.add_argument('--dpi', type=int, default=300, help="Resolução das folhas (padrão: 300)")
+    coleta.add_argument('--creditos', type=float, help="Limite de créditos PicWish; prefeitos e vices são processados primeiro")
+    coleta.add_argument('--minutos', type=float, help="Limite de tempo estimado, com a mesma prioridade de --creditos")
+    
+    perfil = argparse.ArgumentParser(add_help=False)
+    # Os modos (perfilamento.MODOS) são validados por configurar(), para não importar o módulo no --help
+    perfil.add_argument('--perfil', default=os.environ.get('ELEITOSFOTO_PERFIL', 'desligado'),
+                        help="Perfilamento por etapa: desligado, amostragem (leve) ou completo (cProfile e tracemalloc)")
+    
+    picwish = argparse.ArgumentParser(add_help=False)
+    picwish.add_argument('--iteracoes', type=int, default=1, help="Iterações de melhoria de qualidade")
+    picwish.add_argument('--remover-fundo', action='store_true')
+    picwish.add_argument('--3x4', dest='foto_3x4', action='store_true')
+    
+    subparsers.add_parser('listar', aliases=['list'], parents=[municipio, coleta, perfil],
+                          help="Lista e exporta os eleitos (sem baixar imagens)")
+    subparsers.add_parser('baixar', aliases=['download'], parents=[municipio, coleta, perfil],
+                          help="Lista, exporta e baixa as fotos originais")
+    melhorar = subparsers.add_parser('melhorar', aliases=['enhance'], parents=[municipio, coleta, picwish, perfil],
+                                     help="Lista, exporta, baixa e melhora as fotos com PicWish")
+    melhorar.add_argument('--callback-porta', type=int,
+                          help="Recebe a conclusão das tarefas por callback nesta porta em vez de consultar o status")
+    melhorar.add_argument('--callback-url', help="URL pública que encaminha para a porta de callback")
+    melhorar.add_argument('--callback-host', default='127.0.0.1',
+                          help="Interface em que o receptor de callbacks ouve (padrão: 127.0.0.1; "
+                               "0.0.0.0 exige --callback-url)")
+    melhorar.add_argument('--picwish-url', help="URL base da API de tarefas (ex.: a do picwish_simulado.py)")
+    
+    tarjetas = subparsers.add_parser('tarjetas', parents=[municipio, perfil],
+                                     help="Gera tarjetas dos eleitos já salvos na base")
+    tarjetas.add_argument('--backend', default='corel', help="Backend de tarjeta: corel, png, folha-pdf, folha-png")
+    tarjetas.add_argument('--pagina', default='A4', help="Página das folhas: A4, A4-paisagem, A3, A3-paisagem, corel")
+    tarjetas.add_argument('--dpi', type=int, default=300, help="Resolução das folhas (padrão: 300)")
+    
+    planejar = subparsers.add_parser('planejar', aliases=['plan'], parents=[municipio, coleta, picwish],
+                                     help="Estima operações, tempo e créditos de uma execução sem executá-la")
+    planejar.add_argument('--etapa', default='melhorar', choices=['listar', 'baixar', 'melhorar'],
+                          help="Subcomando a planejar (padrão: melhorar)")
+    
+    servir = subparsers.add_parser('servir', aliases=['serve'],
+                                   help="Sobe a API HTTP local com caches em memória")
+    servir.add_argument('--host', default='127.0.0.1')
+    servir.add_argument('--porta', type=int, default=8080)
+    return parser
+
+def parametros_da_linha_de_comando(args):
+    """Converte os argumentos de um subcomando no mesmo dicionário de obter_parametros()"""
+    comando = {'list': 'listar', 'download': 'baixar', 'enhance': 'melhorar', 'plan': 'planejar'}.get(args.comando, args.comando)
+    # planejar monta os parâmetros da etapa que será executada depois
+    etapa = getattr(args, 'etapa', comando)
+    usar_ia = etapa == 'melhorar'
+    params = {
+        'ano': args.ano,
+        'tipo': args.tipo,
+        'regiao': args.regiao,
+        'uf': args.uf,
+        'municipio': args.municipio,
+        'incremental': getattr(args, 'incremental', False),
+        'hedge': getattr(args, 'hedge', False),
+        'usar_ia': usar_ia,
+        'api_key': carregar_config().get('picwish_api_key') if comando == 'melhorar' else None,
+        'scale_iterations': args.iteracoes if usar_ia else 0,
+        'remove_background': usar_ia and args.remover_fundo,
+        'make_id_photo': usar_ia and args.foto_3x4,
+        'baixar_imagens': etapa != 'listar',
+        'gerar_tarjetas': getattr(args, 'tarjetas', False),
+        'backend_tarjeta': args.backend,
+        'opcoes_tarjeta': {'pagina': args.pagina, 'dpi': args.dpi},
+        'callback': {'porta': getattr(args, 'callback_porta', None), 'url': getattr(args, 'callback_url', None),
+                     'host': getattr(args, 'callback_host', None)},
+        'picwish_url': getattr(args, 'picwish_url', None),
+        'orcamento': {'creditos': getattr(args, 'creditos', None), 'minutos': getattr(args, 'minutos', None)},
+        'perfil': getattr(args, 'perfil', 'desligado')
+    }
+    return comando, params
+
+def main(argv=None):
+    parser = criar_parser()
+    args = parser.parse_args(argv)
+    if args.comando is None:
+        logger.info("Iniciando processo de download de eleitos")
+        # Obter parâmetros via input
+        params = obter_parametros()
+        if params['usar_ia']:
+            from planejador import Planejador, formatar_plano
+            print("\n" + formatar_plano(Planejador().planejar(params)))
+            if input("\nContinuar com a execução? (S/n): ").strip().lower() == 'n':
+                return
+        executar(params)
+        return
+    
+    if args.comando in ('servir', 'serve'):
+        from servico import servir
+        servir(args.host, args.porta)
+        return
+    
+    comando, params = parametros_da_linha_de_comando(args)
+    callback = params['callback']
+    if callback['porta'] and not callback['url']:
+        from picwish_callbacks import HOSTS_CURINGA
+        if callback['host'] in HOSTS_CURINGA:
+            parser.error(f"--callback-host {callback['host']} exige --callback-url com o endereço público do receptor")
+    logger.info(f"Executando '{comando}' com parâmetros: { {k: v for k, v in params.items() if k != 'api_key'} }")
+    if comando == 'planejar':
+        from planejador import Planejador, formatar_plano
+        print(formatar_plano(Planejador().planejar(params)))
+        return
+    
+    from perfilamento import configurar
+    try:
+        perfilador = configurar(args.perfil)
+    except ValueError as e:
+        parser.error(str(e))
+    try:
+        if comando == 'tarjetas':
+            gerar_tarjetas_municipio(params)
+        else:
+            executar(params)
+    finally:
+        if perfilador.ativo:
+            nome = f"{comando}_{params['uf']}_{params['municipio'].strip().upper().replace(' ', '_')}_{perfilador.iniciado_em.replace(':', '')}"
+            print(f"Relatório de perfilamento: {perfilador.salvar(nome)}")
+        perfilador.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import os
+from PIL import Image
+from codificador import codificar_imagem, extensao, obter_perfil
+from corelmanager import CorelDrawManager
+from geradortarget import TarjetaGenerator
+from log_config import setup_logger
+
+MM_POR_POLEGADA = 25.4
+
+# Tamanhos de página (largura, altura) em mm
+TAMANHOS_PAGINA = {
+    'corel': (CorelDrawManager.CONST_PAGE['WIDTH'], CorelDrawManager.CONST_PAGE['HEIGHT']),
+    'A4': (210, 297),
+    'A4-paisagem': (297, 210),
+    'A3': (297, 420),
+    'A3-paisagem': (420, 297)
+}
+
+# Tamanho padrão da tarjeta impressa (largura, altura) em mm: 9x6 cm, na proporção
+# do layout de 600x400; cabem 8 por página A4
+TAMANHO_TARJETA = (90, 60)
+
+class FolhaCompositor:
+    """Monta as tarjetas do TarjetaGenerator em folhas paginadas para impressão
+
+    As páginas são geradas uma a uma: apenas a página atual fica em memória,
+    independentemente do número de tarjetas.
+    """
+    def __init__(self, generator=None, pagina='A4', dpi=300, tamanho_tarjeta=None, margem=10, espacamento=4):
+        self.logger = setup_logger('FolhaCompositor', os.path.join(os.path.dirname(__file__), 'folha_compositor.log'))
+        self.generator = generator or TarjetaGenerator()
+        self.largura_mm, self.altura_mm = TAMANHOS_PAGINA[pagina] if isinstance(pagina, str) else pagina
+        self.dpi = dpi
+        self.tarjeta_mm = tamanho_tarjeta or TAMANHO_TARJETA
+        self.margem = margem
+        self.espacamento = espacamento
+
+        self.colunas = int((self.largura_mm - 2 * margem + espacamento) // (self.tarjeta_mm[0] + espacamento))
+        self.linhas = int((self.altura_mm - 2 * margem + espacamento) // (self.tarjeta_mm[1] + espacamento))
+        if self.colunas < 1 or self.linhas < 1:
+            raise ValueError(f"Tarjeta de {self.tarjeta_mm[0]:.1f}x{self.tarjeta_mm[1]:.1f}mm não cabe na página "
+                             f"de {self.largura_mm}x{self.altura_mm}mm")
+        self.por_pagina = self.colunas * self.linhas
+        self.logger.info(f"Página {self.largura_mm}x{self.altura_mm}mm a {dpi} dpi: "
+                         f"{self.colunas}x{self.linhas} tarjetas por página")
+
+    def _px(self, mm):
+        return round(mm * self.dpi / MM_POR_POLEGADA)
+
+    def posicao(self, indice):
+        """Posição (x, y) em pixels da tarjeta de índice `indice` dentro da página"""
+        col = indice % self.colunas
+        row = indice // self.colunas
+        x = self.margem + col * (self.tarjeta_mm[0] + self.espacamento)
+        y = self.margem + row * (self.tarjeta_mm[1] + self.espacamento)
+        return self._px(x), self._px(y)
+
+    def paginas(self, candidatos):
+        """Gera as páginas (imagens RGB) uma de cada vez"""
+        tamanho_pagina = (self._px(self.largura_mm), self._px(self.altura_mm))
+        tamanho_tarjeta = (self._px(self.tarjeta_mm[0]), self._px(self.tarjeta_mm[1]))
+        pagina = None
+        indice = 0
+        for candidato in candidatos:
+            if pagina is None:
+                pagina = Image.new("RGB", tamanho_pagina, "white")
+            # Desenhada já no tamanho de impressão: ampliar a tarjeta de 600x400 a borraria
+            tarjeta = self.generator.renderizar_png(candidato, tamanho_tarjeta)
+            pagina.paste(tarjeta, self.posicao(indice))
+            indice += 1
+            if indice == self.por_pagina:
+                yield pagina
+                pagina = None
+                indice = 0
+        if pagina is not None:
+            yield pagina
+
+    def gerar_png(self, candidatos, output_dir, prefixo="folha"):
+        """Salva uma imagem por página (perfil 'folha' do codificador) e retorna os caminhos gerados"""
+        os.makedirs(output_dir, exist_ok=True)
+        perfil = dict(obter_perfil('folha'), dpi=(self.dpi, self.dpi))
+        caminhos = []
+        for numero, pagina in enumerate(self.paginas(candidatos), 1):
+            caminho = os.path.join(output_dir, f"{prefixo}_{numero:03d}{extensao('folha')}")
+            codificado = codificar_imagem(pagina, caminho, perfil)
+            caminhos.append(caminho)
+            self.logger.info(f"Página {numero} salva em {caminho} ({codificado['bytes']} bytes)")
+        return caminhos
+
+    def gerar_pdf(self, candidatos, output_path):
+        """Salva todas as páginas em um único PDF, acrescentando uma página por vez
+
+        Retorna o número de páginas geradas.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        caminho_tmp = f"{output_path}.tmp"
+        numero = 0
+        try:
+            for numero, pagina in enumerate(self.paginas(candidatos), 1):
+                pagina.save(caminho_tmp, "PDF", resolution=self.dpi, append=numero > 1)
+                self.logger.info(f"Página {numero} adicionada a {output_path}")
+            if numero:
+                os.replace(caminho_tmp, output_path)
+        finally:
+            if os.path.exists(caminho_tmp):
+                os.remove(caminho_tmp)
+        return numero
+
+def gerar_folhas_pdf(candidatos, output_dir="tarjetas", pagina='A4', dpi=300, fotos_dir=None, fotos=None, **opcoes):
+    """Backend 'folha-pdf': gera um PDF paginado com todas as tarjetas"""
+    output_path = os.path.join(output_dir, "tarjetas_eleitos.pdf")
+    paginas = FolhaCompositor(TarjetaGenerator(output_dir, fotos_dir, fotos=fotos), pagina=pagina, dpi=dpi).gerar_pdf(candidatos, output_path)
+    print(f"PDF com {paginas} páginas gerado em: {output_path}")
+
+def gerar_folhas_png(candidatos, output_dir="tarjetas", pagina='A4', dpi=300, fotos_dir=None, fotos=None, **opcoes):
+    """Backend 'folha-png': gera uma PNG por página com as tarjetas"""
+    caminhos = FolhaCompositor(TarjetaGenerator(output_dir, fotos_dir, fotos=fotos), pagina=pagina, dpi=dpi).gerar_png(candidatos, output_dir)
+    print(f"{len(caminhos)} folhas geradas em: {output_dir}")
@@ -1,16 +1,26 @@
 import os
 import json
-import requests
-from PIL import Image, ImageDraw, ImageFont
+import functools
+from PIL import Image, ImageDraw, ImageFont, ImageOps
 from io import BytesIO
 import svgwrite
 from svgwrite import cm, mm
-from corelmanager import CorelDrawManager
+from codificador import CodificadorParalelo, codificar_imagem, extensao
+from eleitos_download import TIMEOUT_TSE, obter_sessao
+from miniaturas import abrir_miniatura, obter_miniatura
 from log_config import setup_logger
+from perfilamento import etapa, perfilar
 
 class TarjetaGenerator:
-    def __init__(self, output_dir="tarjetas"):
+    def __init__(self, output_dir="tarjetas", fotos_dir=None, carregar_foto=None, fotos=None):
         self.output_dir = output_dir
+        # Pasta do município com as fotos baixadas; sem ela, as fotos vêm do TSE
+        self.fotos_dir = fotos_dir
+        # Fotos registradas na base para o lote, {id do candidato: caminho} (ver fotos_registradas)
+        self.fotos = fotos or {}
+        # Função (candidato, lado) -> foto RGB contida em lado x lado; o padrão lê a
+        # miniatura local ou baixa do TSE (o serviço HTTP usa o seu cache de fotos)
+        self.carregar_foto = carregar_foto or self._carregar_foto
         self.logger = setup_logger('TarjetaGenerator', os.path.join(os.path.dirname(__file__), 'tarjeta_generator.log'))
         self.logger.info("Iniciando TarjetaGenerator")
         self.largura = 600
@@ -23,16 +33,36 @@ class TarjetaGenerator:
             # Fallback para fonte padrão se não encontrar a DejaVu
             print("Fonte DejaVu não encontrada, usando fonte padrão")
             self.font = ImageFont.load_default()
+        # Fontes por tamanho em pixels, para tarjetas desenhadas em outras resoluções
+        self._fontes = {self.font_size: self.font}
         os.makedirs(output_dir, exist_ok=True)
+
+    def _fonte(self, tamanho):
+        """Fonte no tamanho pedido (a fonte padrão do Pillow, sem a DejaVu, não muda de tamanho)"""
+        fonte = self._fontes.get(tamanho)
+        if fonte is None:
+            try:
+                fonte = ImageFont.truetype(self.font_path, tamanho)
+            except OSError:
+                fonte = self.font
+            self._fontes[tamanho] = fonte
+        return fonte
         
-    def gerar_tarjeta(self, candidato):
-        """Gera uma tarjeta individual"""
-        self.logger.info(f"Gerando tarjeta para candidato: {candidato.get('Nome de Urna')}")
-        nome_arquivo = f"{candidato.get('Nome de Urna')}_{candidato.get('Código do Município')}"
+    def gerar_tarjeta(self, candidato, codificador=None):
+        """Gera uma tarjeta individual
         
-        # Gerar versão PNG
-        png_path = os.path.join(self.output_dir, f"{nome_arquivo}.png")
-        self._gerar_tarjeta_png(candidato, png_path)
+        Com um CodificadorParalelo, a imagem é codificada em outro processo.
+        """
+        self.logger.info(f"Gerando tarjeta para candidato: {candidato.nome_urna}")
+        nome_arquivo = f"{candidato.nome_urna}_{candidato.codigo_municipio}"
+        
+        # Gerar versão PNG (extensão conforme o perfil de codificação 'tarjeta')
+        png_path = os.path.join(self.output_dir, f"{nome_arquivo}{extensao('tarjeta')}")
+        if codificador:
+            futuro = codificador.enviar_imagem(self.renderizar_png(candidato), png_path, 'tarjeta')
+            futuro.add_done_callback(functools.partial(self._registrar_falha_png, png_path))
+        else:
+            self._gerar_tarjeta_png(candidato, png_path)
         
         # Gerar versão SVG
         svg_path = os.path.join(self.output_dir, f"{nome_arquivo}.svg")
@@ -40,46 +70,97 @@ class TarjetaGenerator:
         
         return png_path, svg_path
 
-    def _gerar_tarjeta_png(self, candidato, output_path):
+    def _registrar_falha_png(self, png_path, futuro):
+        """Callback do Future da codificação em paralelo: registra o erro, se houver"""
+        if not futuro.cancelled() and futuro.exception() is not None:
+            self.logger.error(f"Erro ao gerar PNG {png_path}: {futuro.exception()}")
+
+    def _foto_local(self, candidato):
+        """Caminho da foto já baixada: a registrada na base para o lote, senão a original na pasta do município"""
+        caminhos = [self.fotos.get(candidato.id)]
+        if self.fotos_dir:
+            caminhos.append(candidato.caminho_original(self.fotos_dir))
+        return next((caminho for caminho in caminhos if caminho and os.path.exists(caminho)), None)
+
+    @staticmethod
+    def _sobre_branco(foto):
+        """Remove a transparência (fotos sem fundo) compondo a foto sobre fundo branco"""
+        if 'A' not in foto.getbands() and 'transparency' not in foto.info:
+            return foto.convert("RGB")
+        foto = foto.convert("RGBA")
+        fundo = Image.new("RGB", foto.size, "white")
+        fundo.paste(foto, mask=foto.getchannel('A'))
+        return fundo
+
+    @perfilar('tarjeta_foto')
+    def _carregar_foto(self, candidato, lado=200):
+        """Foto do candidato contida em `lado`x`lado`, mantendo a proporção (miniatura local quando disponível, download caso contrário)"""
+        foto_local = self._foto_local(candidato)
+        if foto_local:
+            return self._sobre_branco(abrir_miniatura(foto_local, lado))
+        response = obter_sessao().get(candidato.imagem_oficial, timeout=TIMEOUT_TSE)
+        response.raise_for_status()
+        foto = Image.open(BytesIO(response.content))
+        return self._sobre_branco(ImageOps.contain(foto, (lado, lado), Image.LANCZOS))
+
+    @perfilar('tarjeta_png')
+    def renderizar_png(self, candidato, tamanho=None, foto=None):
+        """Desenha a tarjeta do candidato e retorna a imagem (sem salvar)
+        
+        Com `tamanho` (largura, altura) em pixels, foto, texto e margens são desenhados
+        diretamente nessa resolução, na escala do layout de 600x400, em vez de a
+        tarjeta pronta ser ampliada. `foto` é a foto já carregada, contida no quadro
+        da foto nessa escala; sem ela, a foto vem de carregar_foto.
+        """
+        largura, altura = tamanho or (self.largura, self.altura)
+        escala = min(largura / self.largura, altura / self.altura)
+        def px(valor):
+            return round(valor * escala)
+        
+        tarjeta = Image.new("RGB", (largura, altura), "white")
+        draw = ImageDraw.Draw(tarjeta)
+
+        # Paste candidate image
+        lado_foto = px(200)
         try:
-            self.logger.info(f"Gerando PNG para {candidato.get('Nome de Urna')}")
-            """Gera versão PNG da tarjeta"""
-            tarjeta = Image.new("RGB", (self.largura, self.altura), "white")
-            draw = ImageDraw.Draw(tarjeta)
+            if foto is None:
+                foto = self.carregar_foto(candidato, lado_foto)
+            # Centralizada no quadro da foto, que ela pode não preencher em uma das dimensões
+            tarjeta.paste(foto, ((largura - foto.width) // 2, px(20) + (lado_foto - foto.height) // 2))
+        except Exception as e:
+            self.logger.warning(f"Erro ao baixar imagem de {candidato.nome_completo}: {e}")
 
-            # Download and paste candidate image
-            imagem_url = candidato.get("Imagem Oficial")
-            try:
-                response = requests.get(imagem_url)
-                foto = Image.open(BytesIO(response.content)).convert("RGB")
-                foto = foto.resize((200, 200))
-                tarjeta.paste(foto, ((self.largura - 200) // 2, 20))
-            except Exception as e:
-                self.logger.warning(f"Erro ao baixar imagem de {candidato.get('Nome Completo')}: {e}")
-
-            # Prepare text lines
-            texto = [
-                f"Nome: {candidato.get('Nome Completo')}",
-                f"Urna: {candidato.get('Nome de Urna')}",
-                f"Número: {candidato.get('Número na Urna')}",
-                f"Partido: {candidato.get('Partido')}",
-                f"Cargo: {candidato.get('Cargo')}",
-                f"Reeleição: {candidato.get('Reeleição')}",
-                f"Cidade/UF: {candidato.get('Código do Município')}"
-            ]
-
-            # Draw text below the image
-            y_text = 240
-            for line in texto:
-                draw.text((30, y_text), line, font=self.font, fill="black")
-                y_text += 30
-
-            tarjeta.save(output_path)
-            self.logger.info(f"PNG gerado com sucesso: {output_path}")
+        # Prepare text lines
+        texto = [
+            f"Nome: {candidato.nome_completo}",
+            f"Urna: {candidato.nome_urna}",
+            f"Número: {candidato.numero}",
+            f"Partido: {candidato.partido}",
+            f"Cargo: {candidato.cargo}",
+            f"Reeleição: {candidato.reeleicao_texto}",
+            f"Cidade/UF: {candidato.codigo_municipio}"
+        ]
+
+        # Draw text below the image
+        fonte = self._fonte(px(self.font_size))
+        for indice, line in enumerate(texto):
+            draw.text((px(30), px(240 + 30 * indice)), line, font=fonte, fill="black")
+
+        return tarjeta
+
+    def _gerar_tarjeta_png(self, candidato, output_path):
+        """Gera versão PNG da tarjeta"""
+        try:
+            self.logger.info(f"Gerando PNG para {candidato.nome_urna}")
+            tarjeta = self.renderizar_png(candidato)
+            with etapa('codificacao'):
+                codificado = codificar_imagem(tarjeta, output_path, 'tarjeta')
+            self.logger.info(f"PNG gerado com sucesso: {output_path} ({codificado['bytes']} bytes)")
         except Exception as e:
             self.logger.error(f"Erro ao gerar PNG: {e}")
             raise
 
+    @perfilar('tarjeta_svg')
     def _gerar_tarjeta_svg(self, candidato, output_path):
         """Gera versão SVG da tarjeta (preparação para CorelDraw)"""
         dwg = svgwrite.Drawing(output_path, size=(f"{self.largura}px", f"{self.altura}px"))
@@ -87,8 +168,11 @@ class TarjetaGenerator:
         # Adicionar elementos
         dwg.add(dwg.rect(insert=(0, 0), size=('100%', '100%'), fill='white'))
         
-        # Adicionar imagem do candidato
-        imagem_url = candidato.get("Imagem Oficial")
+        # Adicionar imagem do candidato (miniatura local quando disponível)
+        imagem_url = candidato.imagem_oficial
+        foto_local = self._foto_local(candidato)
+        if foto_local:
+            imagem_url = os.path.relpath(obter_miniatura(foto_local, 200), os.path.dirname(os.path.abspath(output_path)))
         # Usando um elemento image do SVG para a foto
         dwg.add(dwg.image(href=imagem_url,
                          insert=((self.largura - 200) // 2, 20),
@@ -96,12 +180,12 @@ class TarjetaGenerator:
         
         # Texto
         texts = [
-            f"Nome: {candidato.get('Nome Completo')}",
-            f"Urna: {candidato.get('Nome de Urna')}",
-            f"Número: {candidato.get('Número na Urna')}",
-            f"Partido: {candidato.get('Partido')}",
-            f"Cargo: {candidato.get('Cargo')}",
-            f"Reeleição: {candidato.get('Reeleição')}"
+            f"Nome: {candidato.nome_completo}",
+            f"Urna: {candidato.nome_urna}",
+            f"Número: {candidato.numero}",
+            f"Partido: {candidato.partido}",
+            f"Cargo: {candidato.cargo}",
+            f"Reeleição: {candidato.reeleicao_texto}"
         ]
         
         y = 240
@@ -114,6 +198,7 @@ class TarjetaGenerator:
             
         dwg.save()
 
+    @perfilar('corel_svg')
     def gerar_arquivo_corel(self, candidatos):
         """Gera arquivo CorelDraw com todas as tarjetas"""
         # Criar SVG master que será convertido para CDR
@@ -140,21 +225,35 @@ class TarjetaGenerator:
         print(f"Arquivo master SVG gerado em: {master_svg}")
         print("Para usar no CorelDraw, importe o arquivo SVG")
 
-def process_candidates(candidatos_data, gerar_tarjetas=False):
-    """Função para ser chamada do eleitos_download.py"""
-    if not gerar_tarjetas:
-        return
+def gerar_tarjetas_corel(candidatos, output_dir="tarjetas", **opcoes):
+    """Backend 'corel': gera um documento CorelDraw com todas as tarjetas"""
+    from corelmanager import CorelDrawManager
     
+    corel = None
     try:
         corel = CorelDrawManager()
-        output_dir = "tarjetas"
         os.makedirs(output_dir, exist_ok=True)
         
         # Gerar arquivo CDR
         output_path = os.path.join(output_dir, "tarjetas_eleitos.cdr")
-        corel.create_template(candidatos_data, output_path)
+        with etapa('corel_layout'):
+            corel.create_template(candidatos, output_path)
         print(f"Arquivo CorelDraw gerado em: {output_path}")
         
     finally:
-        corel.quit()
+        if corel:
+            corel.quit()
+
+def gerar_tarjetas_png(candidatos, output_dir="tarjetas", fotos_dir=None, fotos=None, **opcoes):
+    """Backend 'png': gera uma tarjeta PNG e uma SVG por candidato"""
+    generator = TarjetaGenerator(output_dir, fotos_dir, fotos=fotos)
+    with CodificadorParalelo() as codificador:
+        for candidato in candidatos:
+            generator.gerar_tarjeta(candidato, codificador)
+    print(f"Tarjetas geradas em: {output_dir}")
 
+def process_candidates(candidatos_data, gerar_tarjetas=False):
+    """Função para ser chamada do eleitos_download.py"""
+    if not gerar_tarjetas:
+        return
+    gerar_tarjetas_corel(candidatos_data)
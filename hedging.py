@@ -0,0 +1,156 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import requests
+from log_config import setup_logger
+
+# Tamanho do primeiro bloco do corpo lido antes de a resposta ser considerada recebida
+TAMANHO_BLOCO = 64 * 1024
+
+class _RespostaIniciada:
+    """Response cujo primeiro bloco do corpo já foi lido por PoliticaHedge
+
+    iter_content entrega esse bloco e continua a leitura de onde ela parou; os
+    demais atributos são os da Response original.
+    """
+    def __init__(self, response, primeiro, restante):
+        self._response = response
+        self._primeiro = primeiro
+        self._restante = restante
+
+    def __getattr__(self, nome):
+        return getattr(self._response, nome)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._response.close()
+
+    def iter_content(self, chunk_size=None, decode_unicode=False):
+        primeiro, self._primeiro = self._primeiro, b''
+        if primeiro:
+            yield primeiro
+        yield from self._restante
+
+    @property
+    def content(self):
+        return b''.join(self.iter_content())
+
+class PoliticaHedge:
+    """GETs idempotentes com requisição de reserva (hedge) para cortar a cauda de latência
+
+    Se a resposta não chega até o percentil observado (p95 por padrão) das
+    latências recentes, uma segunda requisição igual é disparada; fica a que
+    responder primeiro e a outra é cancelada (ou fechada, se já tiver começado).
+    O número de hedges simultâneos é limitado por max_hedges.
+
+    As requisições usam stream=True. Uma resposta só conta como recebida depois
+    do primeiro bloco do corpo (ou do corpo inteiro, se for menor), porque um
+    servidor lento costuma demorar a enviar os dados, não os cabeçalhos; o resto
+    do corpo da resposta vencedora é lido pelo chamador.
+
+    Sem uma `sessao` informada, cada thread do executor usa a sua própria
+    requests.Session, que não é thread-safe.
+    """
+    def __init__(self, sessao=None, percentil=0.95, janela=200, amostras_minimas=20, atraso_inicial=2.0,
+                 atraso_minimo=0.05, max_hedges=4, max_workers=8, timeout=(10, 60)):
+        self.logger = setup_logger('PoliticaHedge', os.path.join(os.path.dirname(__file__), 'hedging.log'))
+        self.sessao = sessao
+        self._local = threading.local()
+        self._sessoes = []
+        self.percentil = percentil
+        self.amostras_minimas = amostras_minimas
+        self.atraso_inicial = atraso_inicial
+        self.atraso_minimo = atraso_minimo
+        self.timeout = timeout
+        self._latencias = deque(maxlen=janela)
+        self._lock = threading.Lock()
+        self._vagas_hedge = threading.BoundedSemaphore(max_hedges)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers + max_hedges)
+        self.estatisticas = {'requisicoes': 0, 'hedges': 0, 'hedges_vencedores': 0}
+
+    def atraso_hedge(self):
+        """Tempo de espera antes de disparar o hedge: o percentil das latências recentes"""
+        with self._lock:
+            if len(self._latencias) < self.amostras_minimas:
+                return self.atraso_inicial
+            ordenadas = sorted(self._latencias)
+        indice = min(int(len(ordenadas) * self.percentil), len(ordenadas) - 1)
+        return max(ordenadas[indice], self.atraso_minimo)
+
+    def _sessao(self):
+        """Sessão HTTP da thread atual, criada na primeira requisição dela"""
+        if self.sessao is not None:
+            return self.sessao
+        sessao = getattr(self._local, 'sessao', None)
+        if sessao is None:
+            sessao = self._local.sessao = requests.Session()
+            with self._lock:
+                self._sessoes.append(sessao)
+        return sessao
+
+    def _requisitar(self, url, kwargs):
+        """GET até o primeiro bloco do corpo; a latência registrada inclui a espera por ele"""
+        inicio = time.monotonic()
+        response = self._sessao().get(url, stream=True, timeout=self.timeout, **kwargs)
+        try:
+            restante = response.iter_content(chunk_size=TAMANHO_BLOCO)
+            primeiro = next(restante, b'')
+        except BaseException:
+            response.close()
+            raise
+        with self._lock:
+            self._latencias.append(time.monotonic() - inicio)
+        return _RespostaIniciada(response, primeiro, restante)
+
+    @staticmethod
+    def _descartar(futuro):
+        """Cancela a requisição perdedora, ou fecha sua conexão quando terminar"""
+        if not futuro.cancel():
+            futuro.add_done_callback(lambda f: f.exception() is None and f.result().close())
+
+    def get(self, url, **kwargs):
+        """GET com hedge; retorna a Response vencedora (use com `with`)"""
+        with self._lock:
+            self.estatisticas['requisicoes'] += 1
+        primario = self._executor.submit(self._requisitar, url, kwargs)
+        concluidos, _ = wait([primario], timeout=self.atraso_hedge())
+        if concluidos or not self._vagas_hedge.acquire(blocking=False):
+            return primario.result()
+
+        self.logger.info(f"Resposta lenta, enviando hedge para {url}")
+        hedge = self._executor.submit(self._requisitar, url, kwargs)
+        hedge.add_done_callback(lambda f: self._vagas_hedge.release())
+        with self._lock:
+            self.estatisticas['hedges'] += 1
+
+        pendentes = {primario, hedge}
+        erro = None
+        while pendentes:
+            concluidos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+            for futuro in concluidos:
+                if futuro.exception() is not None:
+                    erro = erro or futuro.exception()
+                    continue
+                for outro in pendentes:
+                    self._descartar(outro)
+                # Os dois podem ter terminado juntos: fecha a resposta excedente
+                for outro in concluidos - {futuro}:
+                    if outro.exception() is None:
+                        outro.result().close()
+                if futuro is hedge:
+                    with self._lock:
+                        self.estatisticas['hedges_vencedores'] += 1
+                return futuro.result()
+        raise erro
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        with self._lock:
+            sessoes, self._sessoes = self._sessoes, []
+        for sessao in sessoes:
+            sessao.close()
+        self.logger.info(f"Estatísticas de hedge: {self.estatisticas}")
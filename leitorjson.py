@@ -0,0 +1,111 @@
+import codecs
+import json
+
+# Maior valor (item do array, chave ou valor descartado) aceito, em caracteres
+TAMANHO_MAXIMO_VALOR = 1024 * 1024
+
+_CONTINUACAO_NUMERO = frozenset("0123456789+-.eE")
+
+class LeitorJson:
+    """Leitor incremental de JSON a partir de trechos de texto
+
+    Mantém em memória apenas o trecho ainda não consumido, de forma que um array
+    grande pode ser percorrido item a item sem carregar a resposta inteira. Um
+    valor que não se completa em max_valor caracteres é tratado como JSON
+    inválido, em vez de o restante da entrada ser carregado à procura do fim dele.
+    """
+    def __init__(self, pedacos, max_valor=TAMANHO_MAXIMO_VALOR):
+        self.max_valor = max_valor
+        self._pedacos = iter(pedacos)
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._fim = False
+
+    def _carregar(self):
+        """Lê mais um trecho da entrada; retorna False quando ela acabou"""
+        if self._fim:
+            return False
+        for pedaco in self._pedacos:
+            if pedaco:
+                # Descarta o que já foi consumido
+                self._buffer = self._buffer[self._pos:] + pedaco
+                self._pos = 0
+                return True
+        self._fim = True
+        return False
+
+    def _espiar(self):
+        """Retorna o próximo caractere não branco sem consumi-lo"""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in " \t\r\n":
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._carregar():
+                raise ValueError("Fim inesperado do JSON")
+
+    def _esperar(self, caractere):
+        encontrado = self._espiar()
+        if encontrado != caractere:
+            raise ValueError(f"JSON inválido: esperado '{caractere}', encontrado '{encontrado}'")
+        self._pos += 1
+
+    def _decodificar(self):
+        """Decodifica o próximo valor completo, lendo mais trechos se necessário"""
+        self._espiar()
+        while True:
+            try:
+                valor, fim = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError as e:
+                if len(self._buffer) - self._pos > self.max_valor:
+                    raise ValueError(f"JSON inválido ou valor acima de {self.max_valor} caracteres: {e.msg}") from e
+                if not self._carregar():
+                    raise
+                continue
+            # Um número no fim do trecho pode continuar no próximo, inclusive depois de
+            # um expoente incompleto ("1.5e" decodifica como 1.5 e deixa o "e")
+            if (fim == len(self._buffer) or self._numero_incompleto(valor, fim)) and self._carregar():
+                continue
+            self._pos = fim
+            return valor
+
+    def _numero_incompleto(self, valor, fim):
+        return (isinstance(valor, (int, float)) and not isinstance(valor, bool)
+                and all(c in _CONTINUACAO_NUMERO for c in self._buffer[fim:]))
+
+    def iterar_array(self, chave):
+        """Gera os itens do array `chave` do objeto JSON de primeiro nível"""
+        self._esperar("{")
+        if self._espiar() == "}":
+            return
+        while True:
+            nome = self._decodificar()
+            self._esperar(":")
+            if nome == chave:
+                break
+            # Descarta os valores das demais chaves
+            self._decodificar()
+            if self._espiar() == "}":
+                return
+            self._esperar(",")
+
+        if self._espiar() != "[":
+            # Ex.: "candidatos": null
+            self._decodificar()
+            return
+        self._pos += 1
+        if self._espiar() == "]":
+            return
+        while True:
+            yield self._decodificar()
+            if self._espiar() == "]":
+                return
+            self._esperar(",")
+
+def decodificar_utf8(pedacos):
+    """Converte trechos de bytes em texto sem quebrar caracteres multibyte"""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for pedaco in pedacos:
+        yield decoder.decode(pedaco)
+    yield decoder.decode(b"", final=True)
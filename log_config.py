@@ -9,8 +9,8 @@ def setup_logger(name, log_file):
     
     # Evita duplicação de handlers
     if not logger.handlers:
-        # Handler para arquivo
-        file_handler = logging.FileHandler(log_file, mode='w', encoding='utf-8')
+        # Handler para arquivo (aberto apenas na primeira mensagem registrada)
+        file_handler = logging.FileHandler(log_file, mode='w', encoding='utf-8', delay=True)
         file_handler.setFormatter(
             logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
         )
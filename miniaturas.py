@@ -0,0 +1,72 @@
+import os
+from PIL import Image, ImageOps
+from codificador import codificar_imagem, extensao
+
+# Lado maior (px) de cada nível da pirâmide de miniaturas
+TAMANHOS_PIRAMIDE = (800, 400, 200, 100)
+
+# As miniaturas ficam em uma subpasta ao lado da foto original
+PASTA_MINIATURAS = 'miniaturas'
+
+def caminho_miniatura(caminho, tamanho, com_alfa=False):
+    """Caminho do nível `tamanho` da pirâmide da foto `caminho`"""
+    pasta, arquivo = os.path.split(caminho)
+    nome = os.path.splitext(arquivo)[0]
+    perfil = 'miniatura_alfa' if com_alfa else 'miniatura'
+    return os.path.join(pasta, PASTA_MINIATURAS, f"{nome}_{tamanho}{extensao(perfil)}")
+
+def _niveis_existentes(caminho, tamanhos):
+    """Caminhos dos níveis já gerados e atualizados, ou None se a pirâmide precisa ser (re)gerada"""
+    mtime_original = os.path.getmtime(caminho)
+    niveis = {}
+    for tamanho in tamanhos:
+        for com_alfa in (False, True):
+            miniatura = caminho_miniatura(caminho, tamanho, com_alfa)
+            if os.path.exists(miniatura) and os.path.getmtime(miniatura) >= mtime_original:
+                niveis[tamanho] = miniatura
+                break
+        else:
+            return None
+    return niveis
+
+def gerar_piramide(caminho, tamanhos=TAMANHOS_PIRAMIDE):
+    """Decodifica a foto uma única vez, já reduzida, e grava todos os níveis da pirâmide
+
+    Para JPEG, draft() faz o decodificador trabalhar em 1/2, 1/4 ou 1/8 da
+    resolução, o que evita decodificar fotos ampliadas pelo PicWish por inteiro.
+    Cada nível é reduzido a partir do anterior. Retorna {tamanho: caminho}.
+    """
+    niveis = {}
+    with Image.open(caminho) as imagem:
+        maior = max(tamanhos)
+        imagem.draft(imagem.mode if imagem.mode in ('RGB', 'L') else 'RGB', (maior, maior))
+        atual = imagem.convert('RGBA' if 'A' in imagem.getbands() or 'transparency' in imagem.info else 'RGB')
+    com_alfa = atual.mode == 'RGBA'
+    for tamanho in sorted(tamanhos, reverse=True):
+        atual = atual.copy()
+        atual.thumbnail((tamanho, tamanho), Image.LANCZOS)
+        destino = caminho_miniatura(caminho, tamanho, com_alfa)
+        codificar_imagem(atual, destino, 'miniatura_alfa' if com_alfa else 'miniatura')
+        niveis[tamanho] = destino
+    return niveis
+
+def obter_miniatura(caminho, tamanho, tamanhos=TAMANHOS_PIRAMIDE):
+    """Caminho do menor nível da pirâmide com lado maior >= `tamanho`
+
+    Gera a pirâmide na primeira consulta (ou se a foto original mudou). Para
+    tamanhos acima do maior nível, retorna a própria foto original.
+    """
+    if tamanho > max(tamanhos):
+        return caminho
+    niveis = _niveis_existentes(caminho, tamanhos) or gerar_piramide(caminho, tamanhos)
+    return niveis[min(t for t in tamanhos if t >= tamanho)]
+
+def abrir_miniatura(caminho, largura, altura=None):
+    """Abre a foto contida em `largura`x`altura`, mantendo a proporção, a partir do nível adequado da pirâmide
+
+    A imagem retornada pode ser menor que a caixa em uma das dimensões (uma
+    foto 3x4 em uma caixa quadrada fica mais estreita); cabe a quem cola centralizá-la.
+    """
+    altura = altura or largura
+    with Image.open(obter_miniatura(caminho, max(largura, altura))) as imagem:
+        return ImageOps.contain(imagem, (largura, altura), Image.LANCZOS)
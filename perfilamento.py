@@ -0,0 +1,317 @@
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
+from datetime import datetime
+from log_config import setup_logger
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+# cProfile, pstats e tracemalloc só são importados no modo completo
+
+MODOS = ('desligado', 'amostragem', 'completo')
+
+PASTA_RELATORIOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "DADOS", "perfis")
+
+# Etapa vazia reaproveitada quando o perfilamento está desligado
+_NULO = nullcontext()
+
+def _local_codigo(codigo):
+    return f"{os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno}({codigo.co_name})"
+
+def _local_pstats(chave):
+    arquivo, linha, funcao = chave
+    return f"{os.path.basename(arquivo)}:{linha}({funcao})"
+
+def _rss_maximo_kb():
+    """Pico de memória residente do processo (ru_maxrss), quando disponível"""
+    if resource is None:
+        return None
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS informa em bytes, Linux em KiB
+    return maximo // 1024 if sys.platform == 'darwin' else maximo
+
+class _Registro:
+    """Uma entrada em uma etapa, na pilha da thread que a executa"""
+    __slots__ = ('nome', 'parede', 'cpu', 'perfil', 'snapshot', 'memoria_inicial', 'pico')
+
+    def __init__(self, nome):
+        self.nome = nome
+        self.perfil = None
+        self.snapshot = None
+        self.memoria_inicial = 0
+        self.pico = 0
+
+class _Etapa:
+    __slots__ = ('perfilador', 'nome', 'registro')
+
+    def __init__(self, perfilador, nome):
+        self.perfilador = perfilador
+        self.nome = nome
+
+    def __enter__(self):
+        self.registro = self.perfilador._entrar(self.nome)
+
+    def __exit__(self, *exc):
+        self.perfilador._sair(self.registro)
+
+class Perfilador:
+    """Mede cada etapa do pipeline e monta um relatório por execução
+
+    Modos:
+    - desligado: etapa() não faz nada.
+    - amostragem: tempo de parede e de CPU (da thread que executa a etapa, para
+      não somar o trabalho das outras threads) por etapa e uma thread que amostra
+      as pilhas a cada `intervalo` segundos (sys._current_frames). Barato o
+      suficiente para ficar ligado nos lotes de produção.
+    - completo: além dos tempos, cProfile e tracemalloc por etapa (pico de
+      memória e principais locais de alocação). Os locais de alocação vêm das
+      primeiras `max_snapshots` entradas de cada etapa, porque cada snapshot custa caro.
+
+    Os tempos de uma etapa incluem as etapas aninhadas nela; as estatísticas do
+    cProfile não, porque o perfil da etapa externa é pausado durante a interna.
+    """
+    def __init__(self, modo='desligado', intervalo=0.02, top=15, max_snapshots=5):
+        if modo not in MODOS:
+            raise ValueError(f"Modo de perfilamento inválido: {modo} (use {', '.join(MODOS)})")
+        self.logger = setup_logger('Perfilador', os.path.join(os.path.dirname(__file__), 'perfilamento.log'))
+        self.modo = modo
+        self.intervalo = intervalo
+        self.top = top
+        self.max_snapshots = max_snapshots
+        self.iniciado_em = datetime.now().isoformat(timespec='seconds')
+        self._inicio = time.perf_counter()
+        self._lock = threading.Lock()
+        self._pilhas = {}
+        self._etapas = {}
+        self._parar = threading.Event()
+        self._amostrador = None
+        # tracemalloc só é parado no close() se foi iniciado por este perfilador
+        self._iniciou_tracemalloc = False
+        if modo == 'completo':
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._iniciou_tracemalloc = True
+        if modo == 'amostragem':
+            self._amostrador = threading.Thread(target=self._amostrar, name='Perfilador', daemon=True)
+            self._amostrador.start()
+
+    @property
+    def ativo(self):
+        return self.modo != 'desligado'
+
+    def _dados(self, nome):
+        dados = self._etapas.get(nome)
+        if dados is None:
+            dados = self._etapas[nome] = {
+                'chamadas': 0, 'parede': 0.0, 'cpu': 0.0, 'pico_memoria': 0, 'rss_maximo_kb': None,
+                'snapshots': 0, 'alocacoes': Counter(), 'estatisticas': None,
+                'amostras': 0, 'amostras_folha': Counter(), 'amostras_pilha': Counter()
+            }
+        return dados
+
+    def etapa(self, nome):
+        """Context manager que mede a etapa `nome` na thread atual"""
+        if self.modo == 'desligado':
+            return _NULO
+        return _Etapa(self, nome)
+
+    def _entrar(self, nome):
+        registro = _Registro(nome)
+        thread = threading.get_ident()
+        with self._lock:
+            pilha = self._pilhas.setdefault(thread, [])
+            externo = pilha[-1] if pilha else None
+            pilha.append(registro)
+            dados = self._dados(nome)
+            tirar_snapshot = self.modo == 'completo' and dados['snapshots'] < self.max_snapshots
+            if tirar_snapshot:
+                dados['snapshots'] += 1
+
+        if self.modo == 'completo':
+            import cProfile
+            import tracemalloc
+            if externo and externo.perfil:
+                externo.perfil.disable()
+            if externo:
+                externo.pico = max(externo.pico, tracemalloc.get_traced_memory()[1])
+            if tirar_snapshot:
+                registro.snapshot = tracemalloc.take_snapshot()
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            registro.memoria_inicial = tracemalloc.get_traced_memory()[0]
+            registro.perfil = cProfile.Profile()
+            try:
+                registro.perfil.enable()
+            except ValueError:
+                # Outra thread já está com um perfil ativo (Python 3.12+): só os tempos são medidos
+                registro.perfil = None
+
+        registro.parede = time.perf_counter()
+        registro.cpu = time.thread_time()
+        return registro
+
+    def _sair(self, registro):
+        parede = time.perf_counter() - registro.parede
+        cpu = time.thread_time() - registro.cpu
+        alocacoes = None
+        pico = 0
+        if self.modo == 'completo':
+            import tracemalloc
+            if registro.perfil:
+                registro.perfil.disable()
+            pico = max(registro.pico, tracemalloc.get_traced_memory()[1])
+            if registro.snapshot:
+                diferencas = tracemalloc.take_snapshot().compare_to(registro.snapshot, 'lineno')
+                alocacoes = Counter({str(d.traceback[0]): d.size_diff for d in diferencas[:self.top] if d.size_diff > 0})
+
+        thread = threading.get_ident()
+        with self._lock:
+            pilha = self._pilhas[thread]
+            pilha.pop()
+            externo = pilha[-1] if pilha else None
+            if not pilha:
+                del self._pilhas[thread]
+            dados = self._dados(registro.nome)
+            dados['chamadas'] += 1
+            dados['parede'] += parede
+            dados['cpu'] += cpu
+            dados['pico_memoria'] = max(dados['pico_memoria'], pico - registro.memoria_inicial)
+            if self.modo == 'amostragem':
+                dados['rss_maximo_kb'] = _rss_maximo_kb()
+            if alocacoes:
+                dados['alocacoes'].update(alocacoes)
+            if registro.perfil:
+                import pstats
+                if dados['estatisticas'] is None:
+                    dados['estatisticas'] = pstats.Stats(registro.perfil)
+                else:
+                    dados['estatisticas'].add(registro.perfil)
+
+        if self.modo == 'completo' and externo:
+            externo.pico = max(externo.pico, pico)
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            if externo.perfil:
+                try:
+                    externo.perfil.enable()
+                except ValueError:
+                    # Outra thread ocupou o perfil enquanto este estava pausado
+                    pass
+
+    def _amostrar(self):
+        """Thread de amostragem: atribui a pilha de cada thread à etapa em que ela está"""
+        while not self._parar.wait(self.intervalo):
+            quadros = sys._current_frames()
+            with self._lock:
+                etapas = {thread: pilha[-1].nome for thread, pilha in self._pilhas.items() if pilha}
+                for thread, nome in etapas.items():
+                    quadro = quadros.get(thread)
+                    if quadro is None:
+                        continue
+                    dados = self._dados(nome)
+                    dados['amostras'] += 1
+                    dados['amostras_folha'][_local_codigo(quadro.f_code)] += 1
+                    vistos = set()
+                    while quadro is not None:
+                        local = _local_codigo(quadro.f_code)
+                        if local not in vistos:
+                            vistos.add(local)
+                            dados['amostras_pilha'][local] += 1
+                        quadro = quadro.f_back
+            del quadros
+
+    def relatorio(self):
+        """Relatório da execução em um dict serializável em JSON"""
+        etapas = {}
+        with self._lock:
+            for nome, dados in self._etapas.items():
+                etapa = {
+                    'chamadas': dados['chamadas'],
+                    'parede_s': round(dados['parede'], 6),
+                    'cpu_s': round(dados['cpu'], 6),
+                    # Perto de 1: CPU (Pillow, JSON); perto de 0: espera (rede, polling)
+                    'cpu_por_parede': round(dados['cpu'] / dados['parede'], 3) if dados['parede'] else None
+                }
+                if self.modo == 'completo':
+                    etapa['pico_memoria_bytes'] = dados['pico_memoria']
+                    etapa['alocacoes_top'] = [{'local': local, 'bytes': tamanho}
+                                              for local, tamanho in dados['alocacoes'].most_common(self.top)]
+                    etapa['funcoes_top'] = []
+                    if dados['estatisticas'] is not None:
+                        linhas = sorted(dados['estatisticas'].stats.items(), key=lambda item: item[1][2], reverse=True)
+                        etapa['funcoes_top'] = [
+                            {'funcao': _local_pstats(chave), 'chamadas': nc, 'tempo_proprio_s': round(tt, 6),
+                             'tempo_acumulado_s': round(ct, 6)}
+                            for chave, (cc, nc, tt, ct, _) in linhas[:self.top]
+                        ]
+                if self.modo == 'amostragem':
+                    etapa['rss_maximo_kb'] = dados['rss_maximo_kb']
+                    etapa['amostras'] = dados['amostras']
+                    total = dados['amostras'] or 1
+                    etapa['amostras_folha_top'] = [{'funcao': local, 'amostras': n, 'percentual': round(100 * n / total, 1)}
+                                                   for local, n in dados['amostras_folha'].most_common(self.top)]
+                    etapa['amostras_pilha_top'] = [{'funcao': local, 'amostras': n, 'percentual': round(100 * n / total, 1)}
+                                                   for local, n in dados['amostras_pilha'].most_common(self.top)]
+                etapas[nome] = etapa
+        relatorio = {
+            'modo': self.modo,
+            'iniciado_em': self.iniciado_em,
+            'duracao_s': round(time.perf_counter() - self._inicio, 3),
+            'etapas': dict(sorted(etapas.items(), key=lambda item: item[1]['parede_s'], reverse=True))
+        }
+        if self.modo == 'amostragem':
+            relatorio['intervalo_amostragem_s'] = self.intervalo
+        return relatorio
+
+    def salvar(self, nome, pasta=PASTA_RELATORIOS):
+        """Grava o relatório em <pasta>/<nome>.json e retorna o caminho"""
+        os.makedirs(pasta, exist_ok=True)
+        caminho = os.path.join(pasta, f"{nome}.json")
+        with open(caminho, 'w', encoding='utf-8') as f:
+            json.dump(self.relatorio(), f, ensure_ascii=False, indent=2)
+        self.logger.info(f"Relatório de perfilamento salvo em {caminho}")
+        return caminho
+
+    def close(self):
+        self._parar.set()
+        if self._amostrador:
+            self._amostrador.join()
+        if self._iniciou_tracemalloc:
+            import tracemalloc
+            tracemalloc.stop()
+            self._iniciou_tracemalloc = False
+
+# Perfilador do processo; desligado até configurar()
+_perfilador = Perfilador()
+
+def configurar(modo, **opcoes):
+    """Troca o perfilador do processo e o retorna"""
+    global _perfilador
+    _perfilador.close()
+    _perfilador = Perfilador(modo, **opcoes)
+    return _perfilador
+
+def perfilador():
+    return _perfilador
+
+def etapa(nome):
+    """Mede um trecho como etapa do pipeline: `with etapa('download'): ...`"""
+    return _perfilador.etapa(nome)
+
+def perfilar(nome):
+    """Decorador que mede cada chamada da função como a etapa `nome`"""
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            with _perfilador.etapa(nome):
+                return funcao(*args, **kwargs)
+        return envolvida
+    return decorador
@@ -1,9 +1,24 @@
+import hashlib
 import json
+import tempfile
 import time
 import requests
 import os
 from urllib.parse import urlparse
+from candidato import Candidato
+from codificador import CodificadorParalelo, codificar_arquivo, extensao
+from datastore import sha256_arquivo
 from log_config import setup_logger
+from perfilamento import etapa, perfilar
+
+# Downloads são gravados em blocos; nenhuma imagem fica inteira em memória
+TAMANHO_BLOCO = 64 * 1024
+TAMANHO_MAXIMO_IMAGEM = 64 * 1024 * 1024
+
+PICWISH_API = 'https://techhk.aoscdn.com/api/tasks/visual'
+
+# Timeout (conexão, leitura) das requisições ao TSE e ao PicWish
+TIMEOUT = (10, 60)
 
 def carregar_config():
     """Carrega configurações do arquivo config.json"""
@@ -12,7 +27,7 @@ def carregar_config():
         return json.load(f)
 
 class PicWishProcessor:
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, hedge=None, receptor=None, base_url=PICWISH_API, fallback_interval=10):
         self.logger = setup_logger('PicWishProcessor', os.path.join(os.path.dirname(__file__), 'picwish_processor.log'))
         self.logger.info("Iniciando PicWishProcessor")
         
@@ -21,24 +36,105 @@ class PicWishProcessor:
             api_key = config.get('picwish_api_key')
         self.logger.info(f"API Key configurada: {api_key[:4]}..." if api_key else "API Key não configurada")
         self.api_key = api_key
+        # PoliticaHedge opcional para os downloads (GETs idempotentes)
+        self.hedge = hedge
+        # ReceptorCallbacks opcional: conclusão das tarefas por callback em vez de polling
+        self.receptor = receptor
+        self.base_url = base_url.rstrip('/')
+        self.fallback_interval = fallback_interval
+        self.status_requests = 0
+        # Amostras (operacao, segundos) usadas pelo planejador para estimar execuções futuras
+        self.latencias = []
+        self._inicio_tarefas = {}
         
-    def download_image(self, url, save_path):
-        """Download da imagem original"""
+    def _get_stream(self, url, **kwargs):
+        """GET em streaming, com hedge se configurado"""
+        if self.hedge:
+            return self.hedge.get(url, **kwargs)
+        return requests.get(url, stream=True, timeout=TIMEOUT, **kwargs)
+        
+    @perfilar('download')
+    def download_image(self, url, save_path, max_bytes=TAMANHO_MAXIMO_IMAGEM, validators=None):
+        """Baixa a imagem em blocos para um arquivo temporário e o renomeia sobre o destino
+        
+        Retorna o SHA-256 do conteúdo, calculado durante o download (None em caso de falha).
+        Se `validators` for um dict, recebe o ETag e o Last-Modified da resposta.
+        """
+        caminho_tmp = None
+        inicio = time.monotonic()
         try:
             self.logger.info(f"Baixando imagem de {url}")
-            response = requests.get(url)
-            response.raise_for_status()
             os.makedirs(os.path.dirname(save_path), exist_ok=True)
-            with open(save_path, 'wb') as f:
-                f.write(response.content)
-            self.logger.info(f"Imagem salva em {save_path}")
-            return True
+            with self._get_stream(url) as response:
+                response.raise_for_status()
+                tamanho_declarado = int(response.headers.get('Content-Length') or 0)
+                if tamanho_declarado > max_bytes:
+                    raise ValueError(f"Imagem excede o limite de {max_bytes} bytes ({tamanho_declarado})")
+                if validators is not None:
+                    validators['etag'] = response.headers.get('ETag')
+                    validators['last_modified'] = response.headers.get('Last-Modified')
+                
+                sha256 = hashlib.sha256()
+                tamanho = 0
+                fd, caminho_tmp = tempfile.mkstemp(dir=os.path.dirname(save_path), prefix=".tmp_")
+                with os.fdopen(fd, 'wb') as f:
+                    for bloco in response.iter_content(chunk_size=TAMANHO_BLOCO):
+                        tamanho += len(bloco)
+                        if tamanho > max_bytes:
+                            raise ValueError(f"Imagem excede o limite de {max_bytes} bytes")
+                        sha256.update(bloco)
+                        f.write(bloco)
+            if tamanho == 0:
+                raise ValueError("Imagem vazia")
+            os.replace(caminho_tmp, save_path)
+            caminho_tmp = None
+            self.latencias.append(('download', time.monotonic() - inicio))
+            self.logger.info(f"Imagem salva em {save_path} ({tamanho} bytes)")
+            return sha256.hexdigest()
         except Exception as e:
             self.logger.error(f"Erro ao baixar imagem: {e}")
+            return None
+        finally:
+            if caminho_tmp and os.path.exists(caminho_tmp):
+                os.remove(caminho_tmp)
+
+    @perfilar('verificacao_foto')
+    def image_changed(self, url, record):
+        """Verifica se a imagem remota difere da foto original registrada na base
+        
+        `record` é a foto original de EleitosDatastore.consultar_fotos. Com ETag ou
+        Last-Modified registrados, a requisição é condicional e um 304 encerra a
+        verificação sem baixar a imagem; senão o conteúdo é comparado ao SHA-256 registrado.
+        """
+        if not record or not os.path.exists(record['caminho']):
+            return True
+        headers = {}
+        if record.get('etag'):
+            headers['If-None-Match'] = record['etag']
+        if record.get('last_modified'):
+            headers['If-Modified-Since'] = record['last_modified']
+        try:
+            sha256 = hashlib.sha256()
+            with self._get_stream(url, headers=headers) as response:
+                if response.status_code == 304:
+                    return False
+                response.raise_for_status()
+                for bloco in response.iter_content(chunk_size=TAMANHO_BLOCO):
+                    sha256.update(bloco)
+        except Exception as e:
+            self.logger.error(f"Erro ao verificar imagem {url}: {e}")
             return False
+        alterada = (record.get('sha256') or sha256_arquivo(record['caminho'])) != sha256.hexdigest()
+        if alterada:
+            self.logger.info(f"Imagem alterada no TSE: {url}")
+        return alterada
 
-    def process_image_with_picwish(self, image_url):
-        """Processa a imagem usando a API PicWish"""
+    def original_path(self, base_dir, candidate_data):
+        """Caminho da imagem original do candidato dentro de base_dir"""
+        return candidate_data.caminho_original(base_dir)
+
+    def _submit_task(self, operation, image_url, description):
+        """Envia uma tarefa assíncrona ao PicWish e retorna o task_id"""
         if not self.api_key:
             self.logger.error("API Key não configurada!")
             self.logger.info("Configure uma API Key válida no arquivo config.json")
@@ -46,12 +142,16 @@ class PicWishProcessor:
 
         headers = {'X-API-KEY': self.api_key}
         data = {'sync': '0', 'image_url': image_url}
-        url = 'https://techhk.aoscdn.com/api/tasks/visual/scale'
+        if self.receptor:
+            data['callback_url'] = self.receptor.url_callback
+        url = f'{self.base_url}/{operation}'
+        inicio = time.monotonic()
 
         try:
-            self.logger.info(f"Enviando requisição para PicWish API...")
-            response = requests.post(url, headers=headers, data=data)
-            response_json = response.json()
+            self.logger.info(f"Enviando requisição para {description}...")
+            with etapa(f'picwish_{operation}_envio'):
+                response = requests.post(url, headers=headers, data=data, timeout=TIMEOUT)
+                response_json = response.json()
             self.logger.info(f"Status da requisição: {response.status_code}")
             
             if response.status_code == 401:
@@ -67,163 +167,117 @@ class PicWishProcessor:
             if response_json.get('status') == 200 and 'data' in response_json:
                 task_id = response_json['data'].get('task_id')
                 if task_id:
-                    self.logger.info(f"Task ID obtido: {task_id}")
+                    self.logger.info(f"Task ID obtido ({description}): {task_id}")
+                    self._inicio_tarefas[task_id] = inicio
+                    if self.receptor:
+                        self.receptor.registrar(task_id)
                     return task_id
                 else:
                     self.logger.warning("Task ID não encontrado na resposta")
             else:
                 self.logger.error(f"Erro na resposta: {response_json.get('message', 'Sem mensagem de erro')}")
         except Exception as e:
-            self.logger.error(f"Erro ao processar imagem: {e}")
+            self.logger.error(f"Erro ao processar imagem ({description}): {e}")
         return None
 
-    def get_processed_image(self, task_id, timeout=30):
-        """Obtém o resultado do processamento"""
+    def _poll_task(self, url):
+        """Consulta o status da tarefa; retorna o bloco 'data' da resposta"""
         headers = {'X-API-KEY': self.api_key}
-        url = f'https://techhk.aoscdn.com/api/tasks/visual/scale/{task_id}'
+        response = requests.get(url, headers=headers, timeout=TIMEOUT)
+        self.status_requests += 1
+        data = response.json()
+        self.logger.info(f"Status da resposta: {response.status_code}")
+        if data.get('status') == 200 and 'data' in data:
+            return data['data']
+        return None
+
+    def _wait_task(self, operation, task_id, timeout=30):
+        """Aguarda o resultado da tarefa e retorna a URL da imagem gerada
         
-        self.logger.info(f"Iniciando polling para task_id: {task_id}")
-        for i in range(timeout):
-            if i > 0:
-                self.logger.info(f"Tentativa {i+1} de {timeout}")
-                time.sleep(1)
-            try:
-                response = requests.get(url, headers=headers)
-                data = response.json()
-                self.logger.info(f"Status da resposta: {response.status_code}")
+        Com um ReceptorCallbacks, espera o callback do PicWish e só consulta o
+        status a cada fallback_interval segundos, para cobrir callbacks perdidos.
+        Um callback de conclusão (estado 1 com a URL da imagem) chega pelo caminho
+        com o token da execução e dispensa a consulta; os demais apenas a antecipam.
+        Sem receptor, consulta o status a cada segundo.
+        """
+        url = f'{self.base_url}/{operation}/{task_id}'
+        inicio = time.monotonic()
+        limite = inicio + timeout
+        tentativa = 0
+        
+        self.logger.info(f"Aguardando task_id {task_id} ({'callback' if self.receptor else 'polling'})")
+        try:
+            with etapa(f'picwish_{operation}_espera'):
+                while True:
+                    task_data = None
+                    if self.receptor:
+                        espera = max(0, min(self.fallback_interval, limite - time.monotonic()))
+                        task_data = self.receptor.esperar(task_id, espera)
+                        if task_data is None:
+                            self.logger.info(f"Callback não recebido, consultando status de {task_id}")
+                        elif task_data.get('state') == 1 and task_data.get('image'):
+                            self.logger.info(f"Callback de conclusão recebido para {task_id}")
+                        else:
+                            self.logger.info(f"Callback recebido (estado {task_data.get('state')}), consultando status de {task_id}")
+                            task_data = None
+                    elif tentativa > 0:
+                        self.logger.info(f"Tentativa {tentativa + 1}")
+                        time.sleep(1)
+                    if task_data is None:
+                        try:
+                            task_data = self._poll_task(url)
+                        except Exception as e:
+                            self.logger.error(f"Erro ao obter resultado: {e}")
+                            break
+                        tentativa += 1
                 
-                if data.get('status') == 200 and 'data' in data:
-                    task_data = data['data']
-                    state = task_data.get('state')
-                    state_detail = task_data.get('state_detail', '')
-                    self.logger.info(f"Estado da tarefa: {state}")
-                    self.logger.info(f"Detalhe do estado: {state_detail}")
+                    if task_data:
+                        state = task_data.get('state')
+                        self.logger.info(f"Estado da tarefa: {state}")
                     
-                    # Verifica se o processamento está completo
-                    if state == 1 and 'image' in task_data:  # Removido state_detail == 'Complete'
-                        processed_url = task_data['image']
-                        self.logger.info(f"URL da imagem processada: {processed_url}")
-                        return processed_url
-                    elif state < 0:
-                        self.logger.error(f"Erro no processamento: {data}")
+                        if state == 1 and 'image' in task_data:
+                            self.latencias.append((f'picwish_{operation}', time.monotonic() - self._inicio_tarefas.get(task_id, inicio)))
+                            self.logger.info(f"URL da imagem gerada: {task_data['image']}")
+                            return task_data['image']
+                        elif state is not None and state < 0:
+                            self.logger.error(f"Erro no processamento: {task_data}")
+                            break
+                        elif state == 2:  # Estado "Preparing"
+                            self.logger.info("Preparando o processamento...")
+                        else:
+                            self.logger.info("Processamento ainda em andamento...")
+                    if time.monotonic() >= limite:
                         break
-                    elif state == 2:  # Estado "Preparing"
-                        self.logger.info("Preparando o processamento...")
-                    else:
-                        self.logger.info("Processamento ainda em andamento...")
-            except Exception as e:
-                self.logger.error(f"Erro ao obter resultado: {e}")
-                break
+        finally:
+            self._inicio_tarefas.pop(task_id, None)
+            if self.receptor:
+                self.receptor.descartar(task_id)
         self.logger.warning("Timeout ou erro ao aguardar processamento")
         return None
 
+    def process_image_with_picwish(self, image_url):
+        """Processa a imagem usando a API PicWish"""
+        return self._submit_task('scale', image_url, "melhoria de qualidade")
+
+    def get_processed_image(self, task_id, timeout=30):
+        """Obtém o resultado do processamento"""
+        return self._wait_task('scale', task_id, timeout)
+
     def process_remove_background(self, image_url):
         """Processa a imagem para remover o fundo"""
-        headers = {'X-API-KEY': self.api_key}
-        data = {'sync': '0', 'image_url': image_url}
-        url = 'https://techhk.aoscdn.com/api/tasks/visual/segmentation'
-
-        try:
-            self.logger.info(f"Enviando requisição para remover fundo...")
-            response = requests.post(url, headers=headers, data=data)
-            response_json = response.json()
-            self.logger.info(f"Status da requisição: {response.status_code}")
-            self.logger.debug(f"Resposta completa: {response_json}")
-            
-            if response_json.get('status') == 200 and 'data' in response_json:
-                task_id = response_json['data'].get('task_id')
-                if task_id:
-                    self.logger.info(f"Task ID obtido para remoção de fundo: {task_id}")
-                    return task_id
-                else:
-                    self.logger.warning("Task ID não encontrado na resposta")
-            else:
-                self.logger.error(f"Erro na resposta: {response_json.get('message', 'Sem mensagem de erro')}")
-        except Exception as e:
-            self.logger.error(f"Erro ao processar remoção de fundo: {e}")
-        return None
+        return self._submit_task('segmentation', image_url, "remoção de fundo")
 
     def get_background_removed_image(self, task_id, timeout=30):
         """Obtém o resultado do processamento de remoção de fundo"""
-        headers = {'X-API-KEY': self.api_key}
-        url = f'https://techhk.aoscdn.com/api/tasks/visual/segmentation/{task_id}'
-        
-        self.logger.info(f"Iniciando polling para remoção de fundo task_id: {task_id}")
-        for i in range(timeout):
-            if i > 0:
-                self.logger.info(f"Tentativa {i+1} de {timeout}")
-                time.sleep(1)
-            try:
-                response = requests.get(url, headers=headers)
-                data = response.json()
-                
-                if data.get('status') == 200 and 'data' in data:
-                    task_data = data['data']
-                    state = task_data.get('state')
-                    self.logger.info(f"Estado da tarefa: {state}")
-                    
-                    if state == 1 and 'image' in task_data:
-                        processed_url = task_data['image']
-                        self.logger.info(f"URL da imagem sem fundo: {processed_url}")
-                        return processed_url
-                    elif state < 0:
-                        self.logger.error(f"Erro no processamento: {data}")
-                        break
-                    else:
-                        self.logger.info("Processamento ainda em andamento...")
-            except Exception as e:
-                self.logger.error(f"Erro ao obter resultado: {e}")
-                break
-        self.logger.warning("Timeout ou erro ao aguardar processamento")
-        return None
+        return self._wait_task('segmentation', task_id, timeout)
 
     def process_id_photo(self, image_url):
         """Processa a imagem para formato 3x4"""
-        headers = {'X-API-KEY': self.api_key}
-        data = {'sync': '0', 'image_url': image_url}
-        url = 'https://techhk.aoscdn.com/api/tasks/visual/idphoto'
-
-        try:
-            self.logger.info(f"Enviando requisição para formato 3x4...")
-            response = requests.post(url, headers=headers, data=data)
-            response_json = response.json()
-            self.logger.info(f"Status da requisição: {response.status_code}")
-            self.logger.debug(f"Resposta completa: {response_json}")
-            
-            if response_json.get('status') == 200 and 'data' in response_json:
-                task_id = response_json['data'].get('task_id')
-                if task_id:
-                    self.logger.info(f"Task ID obtido para foto 3x4: {task_id}")
-                    return task_id
-        except Exception as e:
-            self.logger.error(f"Erro ao processar foto 3x4: {e}")
-        return None
+        return self._submit_task('idphoto', image_url, "formato 3x4")
 
     def get_id_photo_result(self, task_id, timeout=30):
         """Obtém o resultado do processamento 3x4"""
-        headers = {'X-API-KEY': self.api_key}
-        url = f'https://techhk.aoscdn.com/api/tasks/visual/idphoto/{task_id}'
-        
-        for i in range(timeout):
-            if i > 0:
-                time.sleep(1)
-            try:
-                response = requests.get(url, headers=headers)
-                data = response.json()
-                
-                if data.get('status') == 200 and 'data' in data:
-                    task_data = data['data']
-                    state = task_data.get('state')
-                    
-                    if state == 1 and 'image' in task_data:
-                        return task_data['image']
-                    elif state < 0:
-                        self.logger.error(f"Erro no processamento 3x4: {data}")
-                        break
-            except Exception as e:
-                self.logger.error(f"Erro ao obter resultado 3x4: {e}")
-                break
-        return None
+        return self._wait_task('idphoto', task_id, timeout)
 
     def get_processed_filename(self, nome, remove_background, make_id_photo):
         """Gera o nome do arquivo baseado nos processos aplicados"""
@@ -238,36 +292,54 @@ class PicWishProcessor:
         if make_id_photo:
             parts.append("3x4")
             
-        # Junta as partes com underscore e define a extensão
+        # Junta as partes com underscore e define a extensão pelo perfil de codificação
         filename = "_".join(parts)
-        extension = ".png" if remove_background else ".jpg"
+        extension = extensao(self.get_processed_profile(remove_background))
         
         return f"{filename}{extension}"
 
+    def get_processed_profile(self, remove_background):
+        """Perfil de codificação da imagem processada (ver codificador.PERFIS)"""
+        return 'foto_sem_fundo' if remove_background else 'foto'
+
     def process_candidate(self, candidate_data, base_dir, scale_iterations=1, remove_background=False, make_id_photo=False):
-        """Processa um único candidato"""
-        nome = candidate_data['Nome de Urna'].replace(' ', '_')
-        cargo = candidate_data['Cargo']
-        url_original = candidate_data['Imagem Oficial']
+        """Processa um único candidato e retorna o caminho da imagem processada (False em caso de falha)"""
+        result = self._process_and_encode(candidate_data, base_dir, scale_iterations, remove_background, make_id_photo)
+        return result['processada'] or False
+
+    def _process_and_encode(self, candidate_data, base_dir, scale_iterations, remove_background, make_id_photo,
+                            encoder=None):
+        """Processa um único candidato e retorna caminhos e hashes das imagens geradas
+        
+        Com um CodificadorParalelo, a codificação da imagem processada fica agendada
+        em result['_encoding'] (Future) para ser resolvida pelo chamador.
+        """
+        nome = candidate_data.nome_arquivo
+        cargo = candidate_data.cargo
+        url_original = candidate_data.imagem_oficial
         
         self.logger.info(f"Processando candidato: {nome}")
         self.logger.info(f"URL original: {url_original}")
         
         # Criar estrutura de pastas
-        images_dir = os.path.join(base_dir, 'imagens')
-        processed_dir = os.path.join(base_dir, 'imagens_processadas')
-        cargo_dir = os.path.join(images_dir, cargo)
-        processed_cargo_dir = os.path.join(processed_dir, cargo)
+        original_path = self.original_path(base_dir, candidate_data)
+        processed_cargo_dir = os.path.join(base_dir, 'imagens_processadas', cargo)
         
         # Criar todas as pastas necessárias
-        os.makedirs(cargo_dir, exist_ok=True)
+        os.makedirs(os.path.dirname(original_path), exist_ok=True)
         os.makedirs(processed_cargo_dir, exist_ok=True)
 
+        result = {'original': None, 'sha256_original': None, 'processada': None, 'sha256_processada': None}
+
         # Baixar imagem original primeiro
-        original_path = os.path.join(cargo_dir, f"{nome}.jpg")
-        if not self.download_image(url_original, original_path):
+        validators = {}
+        if not (sha256_original := self.download_image(url_original, original_path, validators=validators)):
             self.logger.warning(f"Falha ao baixar imagem original para {nome}")
-            return False
+            return result
+        result['original'] = original_path
+        result['sha256_original'] = sha256_original
+        result['etag_original'] = validators.get('etag')
+        result['last_modified_original'] = validators.get('last_modified')
 
         self.logger.info(f"Imagem original salva em: {original_path}")
         
@@ -302,58 +374,102 @@ class PicWishProcessor:
         if processed_success and current_url != url_original:
             filename = self.get_processed_filename(nome, remove_background, make_id_photo)
             processed_path = os.path.join(processed_cargo_dir, filename)
-            if self.download_image(current_url, processed_path):
-                self.logger.info(f"Imagem processada salva em: {processed_path}")
-                return True
+            raw_path = os.path.join(processed_cargo_dir, f".bruto_{nome}")
+            profile = self.get_processed_profile(remove_background)
+            if self.download_image(current_url, raw_path):
+                result['_raw_path'] = raw_path
+                # A imagem do PicWish é recodificada conforme o perfil de saída
+                if encoder:
+                    result['_encoding'] = encoder.enviar_arquivo(raw_path, processed_path, profile, remover_origem=True)
+                else:
+                    self._finish_encoding(result, 'codificacao', codificar_arquivo, raw_path, processed_path, profile, remover_origem=True)
             else:
                 self.logger.warning(f"Falha ao salvar imagem processada para {nome}")
         else:
             self.logger.info(f"Nenhum processamento foi concluído com sucesso para {nome}")
         
-        return False
+        return result
 
-    def process_candidates_list(self, candidates_data, base_dir, scale_iterations=1, remove_background=False, make_id_photo=False):
-        """Processa uma lista de candidatos"""
-        results = []
-        for candidate in candidates_data:
-            success = self.process_candidate(
-                candidate,
-                base_dir,
-                scale_iterations=scale_iterations,
-                remove_background=remove_background,
-                make_id_photo=make_id_photo
-            )
-            results.append({
-                'nome': candidate['Nome de Urna'],
-                'cargo': candidate['Cargo'],
-                'sucesso': success
-            })
+    def _finish_encoding(self, result, stage, encode, *args, **kwargs):
+        """Executa (ou aguarda) a codificação e registra o arquivo final no resultado
+
+        `stage` é a etapa de perfilamento: 'codificacao' quando a codificação roda
+        nesta thread, 'espera_codificacao' quando só se aguarda o processo que a executa.
+        """
+        raw_path = result.pop('_raw_path', None)
+        try:
+            with etapa(stage):
+                encoded = encode(*args, **kwargs)
+        except Exception as e:
+            self.logger.error(f"Erro ao codificar imagem processada: {e}")
+            return
+        finally:
+            # A imagem bruta do PicWish não fica na pasta, nem quando a codificação falha
+            if raw_path and os.path.exists(raw_path):
+                os.remove(raw_path)
+        result['processada'] = encoded['caminho']
+        result['sha256_processada'] = encoded['sha256']
+        self.logger.info(f"Imagem processada salva em: {encoded['caminho']} ({encoded['bytes']} bytes)")
+
+    def process_candidates_list(self, candidates_data, base_dir, scale_iterations=1, remove_background=False, make_id_photo=False,
+                                results=None):
+        """Processa uma lista de candidatos, codificando as imagens em paralelo enquanto os próximos são processados
+
+        Os resultados são acrescentados a `results`, quando informada, à medida que
+        cada candidato termina: se `candidates_data` falhar no meio (uma listagem
+        do TSE, por exemplo), o chamador ainda tem o que já foi processado.
+        """
+        results = [] if results is None else results
+        with CodificadorParalelo() as encoder:
+            try:
+                for candidate in candidates_data:
+                    result = self._process_and_encode(
+                        candidate,
+                        base_dir,
+                        scale_iterations,
+                        remove_background,
+                        make_id_photo,
+                        encoder
+                    )
+                    results.append({
+                        'nome': candidate.nome_urna,
+                        'cargo': candidate.cargo,
+                        'candidato': candidate,
+                        **result
+                    })
+            finally:
+                for result in results:
+                    if future := result.pop('_encoding', None):
+                        self._finish_encoding(result, 'espera_codificacao', future.result)
+                    result['sucesso'] = result['processada'] is not None
         return results
 
-    def download_candidates_list(self, candidates_data, base_dir):
-        """Apenas baixa as imagens originais dos candidatos"""
-        results = []
+    def download_candidates_list(self, candidates_data, base_dir, results=None):
+        """Apenas baixa as imagens originais dos candidatos, acrescentando os resultados a `results`"""
+        results = [] if results is None else results
         for candidate in candidates_data:
-            nome = candidate['Nome de Urna'].replace(' ', '_')
-            cargo = candidate['Cargo']
-            url_original = candidate['Imagem Oficial']
-            
-            # Criar estrutura de pastas
-            images_dir = os.path.join(base_dir, 'imagens')
-            cargo_dir = os.path.join(images_dir, cargo)
-            os.makedirs(cargo_dir, exist_ok=True)
+            nome = candidate.nome_arquivo
+            url_original = candidate.imagem_oficial
             
             # Baixar imagem original
-            original_path = os.path.join(cargo_dir, f"{nome}.jpg")
-            success = self.download_image(url_original, original_path)
+            original_path = self.original_path(base_dir, candidate)
+            validators = {}
+            sha256_original = self.download_image(url_original, original_path, validators=validators)
             
-            if success:
+            if sha256_original:
                 self.logger.info(f"Imagem de {nome} salva em: {original_path}")
             
             results.append({
-                'nome': candidate['Nome de Urna'],
-                'cargo': candidate['Cargo'],
-                'sucesso': success
+                'nome': candidate.nome_urna,
+                'cargo': candidate.cargo,
+                'sucesso': sha256_original is not None,
+                'candidato': candidate,
+                'original': original_path if sha256_original else None,
+                'sha256_original': sha256_original,
+                'etag_original': validators.get('etag'),
+                'last_modified_original': validators.get('last_modified'),
+                'processada': None,
+                'sha256_processada': None
             })
         return results
 
@@ -363,7 +479,7 @@ if __name__ == "__main__":
     
     # Ler o arquivo JSON
     with open(json_file, 'r', encoding='utf-8') as f:
-        candidatos = json.load(f)
+        candidatos = [Candidato.from_dict(registro) for registro in json.load(f)]
 
     base_dir = os.path.dirname(json_file)
     
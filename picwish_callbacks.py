@@ -0,0 +1,113 @@
+import hmac
+import json
+import os
+import secrets
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from log_config import setup_logger
+
+CAMINHO_CALLBACK = '/picwish/callback'
+
+# Endereços que ouvem em todas as interfaces: não servem como URL de callback
+HOSTS_CURINGA = ('', '0.0.0.0', '::')
+
+class ReceptorCallbacks:
+    """Servidor HTTP local que recebe os callbacks de conclusão de tarefas do PicWish
+
+    O processador registra o task_id ao enviar a tarefa e aguarda em esperar();
+    quando o callback chega, a thread que está esperando é acordada e recebe os
+    dados da tarefa. Callbacks de tarefas não registradas (já concluídas ou de
+    outra execução) são ignorados.
+
+    Por padrão só aceita conexões locais; a URL pública (url_publica) precisa
+    ser acessível pelo PicWish e encaminhar para a porta. O caminho do callback
+    leva um token gerado a cada execução, e callbacks com outro caminho são recusados.
+    """
+    def __init__(self, host='127.0.0.1', porta=8765, url_publica=None):
+        if not url_publica and host in HOSTS_CURINGA:
+            raise ValueError(f"Informe a URL pública do receptor de callbacks: {host or '*'} não é um endereço "
+                             f"que o PicWish consiga acessar")
+        self.logger = setup_logger('ReceptorCallbacks', os.path.join(os.path.dirname(__file__), 'picwish_callbacks.log'))
+        self._lock = threading.Lock()
+        self._tarefas = {}
+        self.caminho = f"{CAMINHO_CALLBACK}/{secrets.token_urlsafe(24)}"
+        receptor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                tamanho = int(self.headers.get('Content-Length') or 0)
+                corpo = self.rfile.read(tamanho).decode('utf-8', errors='replace')
+                self.send_response(receptor._receber(self.path, corpo, self.headers.get('Content-Type', '')))
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, formato, *args):
+                receptor.logger.debug(f"{self.address_string()} - {formato % args}")
+
+        self.servidor = ThreadingHTTPServer((host, porta), Handler)
+        porta = self.servidor.server_address[1]
+        self.url_callback = f"{(url_publica or f'http://{host}:{porta}').rstrip('/')}{self.caminho}"
+        self._thread = threading.Thread(target=self.servidor.serve_forever, daemon=True)
+        self._thread.start()
+        # O token não vai para o log
+        self.logger.info(f"Receptor de callbacks ouvindo em {host}:{porta} ({self.url_callback.rsplit('/', 1)[0]}/...)")
+
+    def _receber(self, caminho, corpo, content_type):
+        """Interpreta o callback (JSON ou formulário), acorda quem espera pela tarefa e retorna o status HTTP"""
+        if not hmac.compare_digest(urlparse(caminho).path.encode('utf-8'), self.caminho.encode('utf-8')):
+            self.logger.warning("Callback recusado: caminho sem o token desta execução")
+            return 404
+        try:
+            if 'json' in content_type or corpo.lstrip().startswith('{'):
+                dados = json.loads(corpo)
+            else:
+                dados = {chave: valores[0] for chave, valores in parse_qs(corpo).items()}
+            # O PicWish envia os dados da tarefa no mesmo formato da consulta de status
+            dados = dados.get('data', dados) if isinstance(dados, dict) else {}
+            if not isinstance(dados, dict):
+                raise ValueError("campo data não é um objeto")
+            if 'state' in dados:
+                dados['state'] = int(dados['state'])
+        except (TypeError, ValueError) as e:
+            self.logger.warning(f"Callback inválido ({e}): {corpo[:200]}")
+            return 400
+        task_id = dados.get('task_id')
+        if not task_id or not isinstance(task_id, str):
+            self.logger.warning(f"Callback sem task_id: {corpo[:200]}")
+            return 400
+        with self._lock:
+            tarefa = self._tarefas.get(task_id)
+            if tarefa is not None:
+                self._tarefas[task_id] = (tarefa[0], dados)
+        if tarefa is None:
+            # Respondido com 200 para o PicWish não reenviar um aviso que ninguém espera
+            self.logger.warning(f"Callback ignorado: task_id {task_id} não registrado")
+            return 200
+        self.logger.info(f"Callback recebido para task_id {task_id} (estado {dados.get('state')})")
+        tarefa[0].set()
+        return 200
+
+    def registrar(self, task_id):
+        """Registra a tarefa antes de esperar, para não perder um callback que chegue antes"""
+        with self._lock:
+            self._tarefas.setdefault(task_id, (threading.Event(), None))
+
+    def esperar(self, task_id, timeout):
+        """Aguarda o callback da tarefa; retorna os dados ou None se o tempo acabar"""
+        self.registrar(task_id)
+        with self._lock:
+            evento, _ = self._tarefas[task_id]
+        if not evento.wait(timeout):
+            return None
+        with self._lock:
+            _, dados = self._tarefas.pop(task_id)
+        return dados
+
+    def descartar(self, task_id):
+        with self._lock:
+            self._tarefas.pop(task_id, None)
+
+    def close(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
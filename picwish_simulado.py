@@ -0,0 +1,118 @@
+import base64
+import json
+import os
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+import requests
+from log_config import setup_logger
+
+# PNG 1x1 usado como "imagem processada"
+IMAGEM_PNG = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=='
+)
+
+class PicWishSimulado:
+    """Imitação local da API de tarefas do PicWish, para testar o fluxo sem créditos
+
+    Aceita POST /<operacao> e GET /<operacao>/<task_id> como a API real. Se a
+    tarefa foi enviada com callback_url, o resultado é enviado por POST depois
+    de `atraso` segundos. consultas_status conta as consultas de status recebidas.
+
+        with PicWishSimulado() as simulado:
+            processor = PicWishProcessor('x', receptor=receptor, base_url=simulado.base_url)
+    """
+    def __init__(self, host='127.0.0.1', porta=0, atraso=0.5, enviar_callback=True):
+        self.logger = setup_logger('PicWishSimulado', os.path.join(os.path.dirname(__file__), 'picwish_simulado.log'))
+        self.atraso = atraso
+        self.enviar_callback = enviar_callback
+        self.consultas_status = 0
+        self.callbacks_enviados = 0
+        self._lock = threading.Lock()
+        self._tarefas = {}
+        simulado = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _responder(self, status, corpo, content_type='application/json'):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def do_POST(self):
+                tamanho = int(self.headers.get('Content-Length') or 0)
+                dados = {chave: valores[0] for chave, valores
+                         in parse_qs(self.rfile.read(tamanho).decode('utf-8')).items()}
+                resposta = simulado._criar_tarefa(self.path.strip('/'), dados)
+                self._responder(200, json.dumps(resposta).encode('utf-8'))
+
+            def do_GET(self):
+                partes = [parte for parte in self.path.split('/') if parte]
+                if partes and partes[0] == 'imagem':
+                    self._responder(200, IMAGEM_PNG, 'image/png')
+                elif len(partes) == 2:
+                    self._responder(200, json.dumps(simulado._consultar(partes[1])).encode('utf-8'))
+                else:
+                    self._responder(404, b'{"status": 404}')
+
+            def log_message(self, formato, *args):
+                simulado.logger.debug(f"{self.address_string()} - {formato % args}")
+
+        self.servidor = ThreadingHTTPServer((host, porta), Handler)
+        self.base_url = f"http://{host}:{self.servidor.server_address[1]}"
+        self._thread = threading.Thread(target=self.servidor.serve_forever, daemon=True)
+        self._thread.start()
+        self.logger.info(f"PicWish simulado em {self.base_url}")
+
+    def _resultado(self, task_id):
+        return {'task_id': task_id, 'state': 1, 'image': f"{self.base_url}/imagem/{task_id}.png"}
+
+    def _criar_tarefa(self, operacao, dados):
+        task_id = uuid.uuid4().hex
+        with self._lock:
+            self._tarefas[task_id] = time.monotonic() + self.atraso
+        self.logger.info(f"Tarefa {operacao} criada: {task_id}")
+        callback_url = dados.get('callback_url')
+        if callback_url and self.enviar_callback:
+            threading.Timer(self.atraso, self._enviar_callback, (callback_url, task_id)).start()
+        return {'status': 200, 'data': {'task_id': task_id}}
+
+    def _enviar_callback(self, callback_url, task_id):
+        try:
+            requests.post(callback_url, json={'status': 200, 'data': self._resultado(task_id)}, timeout=10)
+            with self._lock:
+                self.callbacks_enviados += 1
+        except Exception as e:
+            self.logger.error(f"Erro ao enviar callback de {task_id}: {e}")
+
+    def _consultar(self, task_id):
+        with self._lock:
+            self.consultas_status += 1
+            pronta_em = self._tarefas.get(task_id)
+        if pronta_em is None:
+            return {'status': 404, 'message': 'task not found'}
+        if time.monotonic() < pronta_em:
+            return {'status': 200, 'data': {'task_id': task_id, 'state': 0}}
+        return {'status': 200, 'data': self._resultado(task_id)}
+
+    def close(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+if __name__ == "__main__":
+    simulado = PicWishSimulado(porta=8766)
+    print(f"PicWish simulado em {simulado.base_url} (Ctrl+C para encerrar)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        simulado.close()
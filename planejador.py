@@ -0,0 +1,247 @@
+import json
+import os
+from candidato import CARGOS
+from datastore import EleitosDatastore
+from log_config import setup_logger
+
+# Ordem de prioridade dos cargos quando há orçamento: prefeitos terminam primeiro
+PRIORIDADE_CARGO = {11: 0, 12: 1, 13: 2}
+
+# Créditos PicWish por tarefa; ajustáveis em 'creditos_picwish' no config.json
+CREDITOS_PICWISH = {'scale': 1, 'segmentation': 1, 'idphoto': 1}
+
+# Latências (segundos) usadas enquanto a base não tem amostras de execuções anteriores
+LATENCIAS_PADRAO = {
+    'tse_municipio': 3.0,       # eleição, UFs da região e código do município
+    'tse_listagem': 2.0,        # listagem de um cargo
+    'download': 0.5,            # foto do TSE ou resultado do PicWish
+    'picwish_scale': 10.0,      # envio até a conclusão da tarefa
+    'picwish_segmentation': 8.0,
+    'picwish_idphoto': 10.0,
+    'tarjeta': 0.5              # por tarjeta, quando o backend ainda não tem amostras
+}
+
+def carregar_creditos():
+    """Créditos por tarefa com os ajustes de 'creditos_picwish' do config.json"""
+    creditos = dict(CREDITOS_PICWISH)
+    config_path = os.path.join(os.path.dirname(__file__), 'config.json')
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            creditos.update(json.load(f).get('creditos_picwish', {}))
+    except (OSError, ValueError):
+        pass
+    return creditos
+
+def ordenar_por_valor(candidatos):
+    """Prefeitos, vices e depois vereadores, mantendo a ordem do TSE dentro do cargo"""
+    return sorted(candidatos, key=lambda c: PRIORIDADE_CARGO.get(c.codigo_cargo, len(PRIORIDADE_CARGO)))
+
+class Planejador:
+    """Conta as operações de uma execução e estima tempo e créditos antes de rodá-la
+
+    As latências vêm das amostras gravadas na base pelas execuções anteriores
+    (tabela latencias); sem amostras, usa LATENCIAS_PADRAO.
+    """
+    def __init__(self, store=None):
+        self.logger = setup_logger('Planejador', os.path.join(os.path.dirname(__file__), 'planejador.log'))
+        self.store = store or EleitosDatastore()
+        self.medias = self.store.latencias_medias()
+        self.creditos = carregar_creditos()
+
+    def latencia(self, operacao):
+        """Retorna (segundos, fonte) da operação"""
+        if operacao in self.medias:
+            media, amostras = self.medias[operacao]
+            return media, f"histórico ({amostras})"
+        if operacao.startswith('tarjeta_'):
+            operacao = 'tarjeta'
+        return LATENCIAS_PADRAO[operacao], "padrão"
+
+    def tarefas_picwish(self, params):
+        """Tarefas PicWish aplicadas a cada candidato, na ordem do processamento"""
+        if not params['usar_ia']:
+            return []
+        tarefas = ['scale'] * params['scale_iterations']
+        if params['remove_background']:
+            tarefas.append('segmentation')
+        if params['make_id_photo']:
+            tarefas.append('idphoto')
+        return tarefas
+
+    def custo_candidato(self, params):
+        """Retorna (créditos, segundos) do processamento de um candidato pendente"""
+        if not params['baixar_imagens']:
+            return 0, 0.0
+        tarefas = self.tarefas_picwish(params)
+        creditos = sum(self.creditos.get(tarefa, 1) for tarefa in tarefas)
+        segundos = self.latencia('download')[0] + sum(self.latencia(f'picwish_{tarefa}')[0] for tarefa in tarefas)
+        if tarefas:
+            # A imagem final do PicWish também é baixada
+            segundos += self.latencia('download')[0]
+        return creditos, segundos
+
+    def resolver_candidatos(self, params):
+        """Retorna (candidatos, origem), usando a base local quando o município já foi listado na eleição"""
+        id_eleicao = self.store.consultar_id_eleicao(params['ano'], params['tipo'])
+        if id_eleicao:
+            candidatos = self.store.consultar_candidatos(uf=params['uf'], municipio=params['municipio'],
+                                                         id_eleicao=id_eleicao)
+            if candidatos:
+                return candidatos, "base local"
+        from eleitos_download import iterar_candidatos_eleitos, resolver_municipio
+        id_eleicao, codigo_municipio = resolver_municipio(params)
+        if not codigo_municipio:
+            return [], "TSE"
+        return [c for codigo_cargo in CARGOS
+                for c in iterar_candidatos_eleitos(id_eleicao, codigo_municipio, codigo_cargo)], "TSE"
+
+    def separar_pendentes(self, candidatos, params):
+        """Retorna (pendentes, verificacoes): candidatos a processar e fotos a conferir no TSE
+
+        Fora do modo incremental todos são processados. No incremental, são
+        pendentes os novos, os alterados e os sem processamento concluído na
+        base; as fotos dos demais são conferidas no TSE e consideradas sem alteração.
+        """
+        if not params['incremental']:
+            return list(candidatos), 0
+        from eleitos_download import filtrar_pendentes
+        anteriores, estados = [], {}
+        if candidatos:
+            anteriores = self.store.consultar_candidatos(uf=params['uf'], municipio=params['municipio'],
+                                                         id_eleicao=candidatos[0].id_eleicao)
+            estados = self.store.consultar_fotos_municipio(candidatos[0].id_eleicao, candidatos[0].codigo_municipio)
+        pendentes = list(filtrar_pendentes(candidatos, anteriores, estados, params))
+        verificacoes = len(candidatos) - len(pendentes) if params['baixar_imagens'] else 0
+        return pendentes, verificacoes
+
+    def aplicar_orcamento(self, pendentes, params, segundos_fixos=0.0):
+        """Ordena os pendentes por valor e retorna (selecionados, adiados) dentro do orçamento
+
+        O orçamento vem de params['orcamento'] ({'creditos': ..., 'minutos': ...});
+        segundos_fixos é o tempo já comprometido com etapas que não dependem dos pendentes.
+        """
+        if self.limites(params) == (None, None):
+            return list(pendentes), []
+        adiados = []
+        selecionados = list(self.selecionar_no_orcamento(ordenar_por_valor(pendentes), params, adiados, segundos_fixos))
+        return selecionados, adiados
+
+    @staticmethod
+    def limites(params):
+        """Retorna (créditos, segundos) do orçamento; None onde não há limite (zero é um limite)"""
+        orcamento = params.get('orcamento') or {}
+        creditos, minutos = orcamento.get('creditos'), orcamento.get('minutos')
+        return creditos, minutos * 60 if minutos is not None else None
+
+    def segundos_fixos(self, params, candidatos, verificacoes):
+        """Tempo das etapas que não dependem dos pendentes: consultas ao TSE,
+        verificação das fotos no modo incremental e tarjetas de todos os `candidatos`"""
+        segundos = self.latencia('tse_municipio')[0] + self.latencia('tse_listagem')[0] * len(CARGOS)
+        # Verificação de foto no modo incremental: um GET da imagem no TSE
+        segundos += self.latencia('download')[0] * verificacoes
+        if params.get('gerar_tarjetas'):
+            segundos += self.latencia(f"tarjeta_{params['backend_tarjeta']}")[0] * candidatos
+        return segundos
+
+    def segundos_fixos_execucao(self, params, anteriores):
+        """segundos_fixos de uma execução que ainda vai listar os candidatos no TSE
+
+        A listagem anterior registrada na base faz as vezes da atual, como no plano
+        feito a partir da base local.
+        """
+        _, verificacoes = self.separar_pendentes(anteriores, params)
+        return self.segundos_fixos(params, len(anteriores), verificacoes)
+
+    def selecionar_no_orcamento(self, pendentes, params, adiados, segundos_fixos=0.0):
+        """Gera os pendentes que cabem no orçamento e acrescenta os demais à lista `adiados`
+
+        Os pendentes são consumidos um a um, na ordem recebida, que deve ser a de
+        valor (ordenar_por_valor): a listagem do TSE, feita cargo a cargo na ordem
+        de CARGOS, já chega assim. Depois do primeiro adiado, todos os seguintes
+        também são adiados, para que um vereador não passe à frente de um prefeito.
+        """
+        limite_creditos, limite_segundos = self.limites(params)
+        if limite_creditos is None and limite_segundos is None:
+            yield from pendentes
+            return
+
+        creditos_candidato, segundos_candidato = self.custo_candidato(params)
+        creditos, segundos = 0, segundos_fixos
+        selecionados = 0
+        for candidato in pendentes:
+            cabe = ((limite_creditos is None or creditos + creditos_candidato <= limite_creditos) and
+                    (limite_segundos is None or segundos + segundos_candidato <= limite_segundos))
+            if cabe and not adiados:
+                selecionados += 1
+                creditos += creditos_candidato
+                segundos += segundos_candidato
+                yield candidato
+            else:
+                adiados.append(candidato)
+        if adiados:
+            self.logger.info(f"Orçamento atingido: {selecionados} candidatos selecionados, {len(adiados)} adiados")
+
+    def planejar(self, params):
+        """Monta o plano da execução: operações por etapa, tempo e créditos estimados"""
+        candidatos, origem = self.resolver_candidatos(params)
+        pendentes, verificacoes = self.separar_pendentes(candidatos, params)
+
+        selecionados, adiados = self.aplicar_orcamento(pendentes, params,
+                                                       self.segundos_fixos(params, len(candidatos), verificacoes))
+
+        operacoes = {'tse_municipio': 1, 'tse_listagem': len(CARGOS)}
+        operacao_tarjeta = f"tarjeta_{params['backend_tarjeta']}"
+
+        tarefas = self.tarefas_picwish(params)
+        if params['baixar_imagens']:
+            operacoes['download'] = len(selecionados) * (2 if tarefas else 1) + verificacoes
+            for tarefa in tarefas:
+                operacao = f'picwish_{tarefa}'
+                operacoes[operacao] = operacoes.get(operacao, 0) + len(selecionados)
+        if params.get('gerar_tarjetas') and selecionados:
+            operacoes[operacao_tarjeta] = len(candidatos)
+
+        estimativas = {}
+        for operacao, quantidade in operacoes.items():
+            segundos, fonte = self.latencia(operacao)
+            estimativas[operacao] = {'quantidade': quantidade, 'segundos': segundos * quantidade, 'fonte': fonte}
+        plano = {
+            'municipio': f"{params['municipio'].strip().upper()}/{params['uf']}",
+            'origem_candidatos': origem,
+            'candidatos': len(candidatos),
+            'pendentes': len(pendentes),
+            'selecionados': selecionados,
+            'adiados': adiados,
+            'chamadas_tse': 3 + len(CARGOS) + verificacoes,
+            'operacoes': estimativas,
+            'creditos': self.custo_candidato(params)[0] * len(selecionados),
+            'segundos': sum(estimativa['segundos'] for estimativa in estimativas.values())
+        }
+        self.logger.info(f"Plano de {plano['municipio']}: {len(selecionados)} candidatos, "
+                         f"{plano['creditos']} créditos, {plano['segundos']:.0f}s estimados")
+        return plano
+
+def formatar_plano(plano):
+    """Texto do plano para exibir antes da execução"""
+    linhas = [
+        f"=== Plano de execução: {plano['municipio']} ===",
+        f"Candidatos eleitos: {plano['candidatos']} (origem: {plano['origem_candidatos']})",
+        f"Pendentes de processamento: {plano['pendentes']}",
+        f"Chamadas ao TSE: {plano['chamadas_tse']}",
+        "",
+        f"{'Operação':<24}{'Qtd':>8}{'Tempo':>12}  Latência"
+    ]
+    for operacao, estimativa in plano['operacoes'].items():
+        linhas.append(f"{operacao:<24}{estimativa['quantidade']:>8}{estimativa['segundos'] / 60:>10.1f}min  {estimativa['fonte']}")
+    linhas += [
+        "",
+        f"Créditos PicWish estimados: {plano['creditos']}",
+        f"Tempo estimado: {plano['segundos'] / 60:.1f} min"
+    ]
+    if plano['adiados']:
+        linhas.append(f"Dentro do orçamento: {len(plano['selecionados'])} candidatos; "
+                      f"adiados para a próxima execução: {len(plano['adiados'])}")
+        linhas += [f"  - {c.nome_urna} ({c.cargo})" for c in plano['adiados'][:10]]
+        if len(plano['adiados']) > 10:
+            linhas.append(f"  ... e mais {len(plano['adiados']) - 10}")
+    return "\n".join(linhas)
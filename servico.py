@@ -0,0 +1,268 @@
+import json
+import mimetypes
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from urllib.parse import parse_qs, urlparse
+from datastore import EleitosDatastore
+from eleitos_download import (CARGOS, TIMEOUT_TSE, buscar_codigo_municipio, iterar_candidatos_eleitos,
+                              obter_id_eleicao, obter_sessao)
+from log_config import setup_logger
+
+logger = setup_logger('servico', os.path.join(os.path.dirname(__file__), 'servico.log'))
+
+# Validade das entradas em cache: os metadados do TSE (IDs de eleição e município)
+# quase não mudam; candidatos e fotos são revalidados de hora em hora
+TTL_METADADOS = 24 * 3600
+TTL_DADOS = 3600
+
+# Memória máxima das fotos, fotos decodificadas e tarjetas em cache
+MAX_BYTES_FOTOS = 256 * 1024 * 1024
+MAX_BYTES_FOTOS_DECODIFICADAS = 256 * 1024 * 1024
+MAX_BYTES_TARJETAS = 128 * 1024 * 1024
+
+class ErroOrigem(Exception):
+    """Falha ao consultar o TSE; respondida com 502 e não armazenada no cache"""
+
+def _bytes_imagem(imagem):
+    """Memória ocupada pelos pixels de uma imagem decodificada do Pillow"""
+    return imagem.width * imagem.height * len(imagem.getbands())
+
+class CacheCoalescente:
+    """Cache LRU em memória que agrupa requisições simultâneas pela mesma chave
+
+    Enquanto uma chave está sendo carregada, as demais threads que a pedirem
+    aguardam o mesmo resultado em vez de repetir o carregamento. Erros não são
+    armazenados. As entradas expiram após `ttl` segundos; com `max_bytes`, o
+    tamanho de cada valor vem de `tamanho(valor)` e as menos usadas saem até o
+    total caber no limite (um valor maior que o limite não é armazenado).
+    """
+    def __init__(self, max_itens=1024, ttl=None, max_bytes=None, tamanho=len):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.tamanho = tamanho
+        self.bytes = 0
+        self._itens = OrderedDict()
+        self._em_andamento = {}
+        self._lock = threading.Lock()
+
+    def obter(self, chave, carregar):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None:
+                valor, expira_em, _ = item
+                if expira_em is None or time.monotonic() < expira_em:
+                    self._itens.move_to_end(chave)
+                    return valor
+                self._remover(chave)
+            futuro = self._em_andamento.get(chave)
+            responsavel = futuro is None
+            if responsavel:
+                futuro = self._em_andamento[chave] = Future()
+        if not responsavel:
+            return futuro.result()
+
+        try:
+            valor = carregar()
+        except BaseException as e:
+            with self._lock:
+                del self._em_andamento[chave]
+            futuro.set_exception(e)
+            raise
+        tamanho = self.tamanho(valor) if self.max_bytes is not None else 0
+        with self._lock:
+            if self.max_bytes is None or tamanho <= self.max_bytes:
+                expira_em = time.monotonic() + self.ttl if self.ttl is not None else None
+                self._itens[chave] = (valor, expira_em, tamanho)
+                self.bytes += tamanho
+                while len(self._itens) > self.max_itens or (self.max_bytes is not None and self.bytes > self.max_bytes):
+                    self._remover(next(iter(self._itens)))
+            del self._em_andamento[chave]
+        futuro.set_result(valor)
+        return valor
+
+    def _remover(self, chave):
+        self.bytes -= self._itens.pop(chave)[2]
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self.bytes = 0
+
+class ServicoEleitos:
+    """Mantém em memória metadados do TSE, candidatos, fotos e tarjetas entre requisições"""
+    def __init__(self, store=None):
+        self.store = store or EleitosDatastore()
+        self._lock_store = threading.Lock()
+        self._lock_render = threading.Lock()
+        self._generator = None
+        self.metadados = CacheCoalescente(256, ttl=TTL_METADADOS)
+        self.candidatos = CacheCoalescente(512, ttl=TTL_DADOS)
+        self.fotos = CacheCoalescente(2048, ttl=TTL_DADOS, max_bytes=MAX_BYTES_FOTOS,
+                                      tamanho=lambda foto: len(foto[0]))
+        self.fotos_decodificadas = CacheCoalescente(2048, ttl=TTL_DADOS, max_bytes=MAX_BYTES_FOTOS_DECODIFICADAS,
+                                                    tamanho=_bytes_imagem)
+        self.tarjetas = CacheCoalescente(1024, ttl=TTL_DADOS, max_bytes=MAX_BYTES_TARJETAS)
+
+    def _metadado(self, chave, carregar):
+        def carregar_ou_falhar():
+            valor = carregar()
+            if not valor:
+                # Erros não ficam no cache: a próxima requisição tenta de novo
+                raise LookupError(f"{chave[0]} não encontrado(a): {chave[1:]}")
+            return valor
+
+        return self.metadados.obter(chave, carregar_ou_falhar)
+
+    def eleitos(self, ano, tipo, uf, municipio):
+        """Candidatos eleitos de um município; consulta o TSE só na primeira vez"""
+        uf = uf.strip().upper()
+        municipio = municipio.strip().upper()
+
+        def carregar():
+            id_eleicao = self._metadado(('eleição', ano, tipo.lower()), lambda: obter_id_eleicao(ano, tipo))
+            codigo_municipio = self._metadado(('município', uf, id_eleicao, municipio),
+                                              lambda: buscar_codigo_municipio(uf, id_eleicao, municipio))
+            try:
+                # Uma listagem que falha em qualquer cargo invalida o resultado inteiro
+                candidatos = [c for codigo_cargo in CARGOS
+                              for c in iterar_candidatos_eleitos(id_eleicao, codigo_municipio, codigo_cargo)]
+            except (OSError, ValueError) as e:
+                raise ErroOrigem(f"Falha ao listar os eleitos de {municipio}/{uf} no TSE: {e}") from e
+            if not candidatos:
+                raise LookupError(f"Nenhum eleito encontrado em {municipio}/{uf}")
+            with self._lock_store:
+                self.store.salvar_candidatos(candidatos, None, uf, municipio)
+            return candidatos
+
+        return self.candidatos.obter((ano, tipo.lower(), uf, municipio), carregar)
+
+    def candidato(self, id_eleicao, id_candidato):
+        with self._lock_store:
+            encontrados = self.store.consultar_candidatos(id_eleicao=id_eleicao, id_candidato=id_candidato)
+        if not encontrados:
+            raise LookupError(f"Candidato {id_candidato} não encontrado na eleição {id_eleicao}")
+        return encontrados[0]
+
+    def foto(self, candidato, tipo='original'):
+        """Retorna (bytes, content-type) da foto original ou processada"""
+        def carregar():
+            with self._lock_store:
+                registro = self.store.consultar_fotos(candidato.id_eleicao, candidato.id).get(tipo)
+            if registro and os.path.exists(registro['caminho']):
+                with open(registro['caminho'], 'rb') as f:
+                    return f.read(), mimetypes.guess_type(registro['caminho'])[0] or 'application/octet-stream'
+            if tipo != 'original':
+                raise LookupError(f"Foto {tipo} de {candidato.nome_urna} não encontrada")
+            try:
+                response = obter_sessao().get(candidato.imagem_oficial, timeout=TIMEOUT_TSE)
+                response.raise_for_status()
+            except OSError as e:
+                raise ErroOrigem(f"Falha ao baixar a foto de {candidato.nome_urna} do TSE: {e}") from e
+            return response.content, response.headers.get('Content-Type', 'image/jpeg')
+
+        return self.fotos.obter((candidato.id_eleicao, candidato.id, tipo), carregar)
+
+    def _foto_decodificada(self, candidato, lado=200):
+        """Foto original contida em `lado`x`lado`, no formato esperado por TarjetaGenerator(carregar_foto=...)"""
+        from PIL import Image, ImageOps
+
+        def carregar():
+            dados, _ = self.foto(candidato)
+            return ImageOps.contain(Image.open(BytesIO(dados)).convert("RGB"), (lado, lado), Image.LANCZOS)
+
+        return self.fotos_decodificadas.obter((candidato.id_eleicao, candidato.id, lado), carregar)
+
+    def _tarjeta_generator(self):
+        # Criado uma única vez: mantém as fontes carregadas (chamado com _lock_render)
+        if self._generator is None:
+            from geradortarget import TarjetaGenerator
+            self._generator = TarjetaGenerator(os.path.join(tempfile.gettempdir(), 'eleitosfoto_tarjetas'),
+                                               carregar_foto=self._foto_decodificada)
+        return self._generator
+
+    def tarjeta(self, candidato):
+        """PNG da tarjeta do candidato"""
+        def carregar():
+            # Download e decodificação da foto ficam fora do lock: ele só protege o
+            # gerador compartilhado e seu cache de fontes durante o desenho
+            foto = self._foto_decodificada(candidato)
+            with self._lock_render:
+                imagem = self._tarjeta_generator().renderizar_png(candidato, foto=foto)
+            buffer = BytesIO()
+            # Compressão leve: a resposta interativa vale mais que alguns bytes
+            imagem.save(buffer, 'PNG', compress_level=1)
+            return buffer.getvalue()
+
+        return self.tarjetas.obter((candidato.id_eleicao, candidato.id), carregar)
+
+class _Handler(BaseHTTPRequestHandler):
+    servico = None
+
+    def _responder(self, status, corpo, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _responder_json(self, status, dados):
+        self._responder(status, json.dumps(dados, ensure_ascii=False).encode('utf-8'), 'application/json; charset=utf-8')
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        partes = [parte for parte in url.path.split('/') if parte]
+        query = {chave: valores[0] for chave, valores in parse_qs(url.query).items()}
+        try:
+            if partes == ['eleitos']:
+                faltando = [parametro for parametro in ('uf', 'municipio') if parametro not in query]
+                if faltando:
+                    self._responder_json(400, {'erro': f"Parâmetros obrigatórios ausentes: {', '.join(faltando)}"})
+                    return
+                candidatos = self.servico.eleitos(query.get('ano', '2024'), query.get('tipo', 'municipal'),
+                                                  query['uf'], query['municipio'])
+                self._responder_json(200, [c.to_dict() for c in candidatos])
+            elif len(partes) == 3 and partes[0] == 'foto':
+                candidato = self.servico.candidato(partes[1], partes[2])
+                dados, content_type = self.servico.foto(candidato, query.get('tipo', 'original'))
+                self._responder(200, dados, content_type)
+            elif len(partes) == 3 and partes[0] == 'tarjeta':
+                candidato = self.servico.candidato(partes[1], os.path.splitext(partes[2])[0])
+                self._responder(200, self.servico.tarjeta(candidato), 'image/png')
+            else:
+                self._responder_json(404, {'erro': 'Rota não encontrada',
+                                           'rotas': ['/eleitos?uf=&municipio=[&ano=&tipo=]',
+                                                     '/foto/<id_eleicao>/<id_candidato>[?tipo=original|processada]',
+                                                     '/tarjeta/<id_eleicao>/<id_candidato>.png']})
+        except LookupError as e:
+            self._responder_json(404, {'erro': str(e)})
+        except ErroOrigem as e:
+            logger.error(f"Erro ao atender {self.path}: {e}")
+            self._responder_json(502, {'erro': str(e)})
+        except Exception as e:
+            logger.error(f"Erro ao atender {self.path}: {e}")
+            self._responder_json(500, {'erro': str(e)})
+
+    def log_message(self, formato, *args):
+        logger.info(f"{self.address_string()} - {formato % args}")
+
+def criar_servidor(host='127.0.0.1', porta=8080, servico=None):
+    """Cria o servidor HTTP; cada requisição é atendida em uma thread"""
+    handler = type('Handler', (_Handler,), {'servico': servico or ServicoEleitos()})
+    return ThreadingHTTPServer((host, porta), handler)
+
+def servir(host='127.0.0.1', porta=8080):
+    servidor = criar_servidor(host, porta)
+    logger.info(f"Serviço disponível em http://{host}:{porta}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Encerrando serviço")
+    finally:
+        servidor.server_close()
@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+# Os módulos do projeto ficam na raiz do repositório, fora de um pacote
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+from candidato import Candidato
+from datastore import EleitosDatastore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = EleitosDatastore(str(tmp_path / 'eleitos.db'))
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def candidato():
+    """Fábrica de candidatos eleitos de um mesmo município: candidato(id, codigo_cargo=13, **campos)"""
+    def criar(id_candidato, codigo_cargo=13, **campos):
+        dados = {'id_eleicao': '2045202024', 'nome_completo': f"CANDIDATO {id_candidato}",
+                 'nome_urna': f"C{id_candidato}", 'numero': 10, 'partido': 'PSD', 'codigo_cargo': codigo_cargo,
+                 'codigo_municipio': '80000'}
+        dados.update(campos)
+        return Candidato(id_candidato, **dados)
+    return criar
@@ -0,0 +1,43 @@
+import json
+import os
+
+import pytest
+
+from benchmarks import executar
+from benchmarks.sinteticos import gerar_candidatos
+
+ARGUMENTOS = ['--benchmarks', 'posicoes_corel', '--tamanhos', '10', '--repeticoes', '1']
+
+
+@pytest.fixture(autouse=True)
+def rapido(monkeypatch):
+    monkeypatch.setattr(executar, 'TEMPO_MINIMO', 0.01)
+
+
+def test_sem_baseline_termina_com_erro(tmp_path, capsys):
+    caminho = tmp_path / 'baseline.json'
+
+    assert executar.main(ARGUMENTOS + ['--baseline', str(caminho)]) == 2
+    assert '--salvar-baseline' in capsys.readouterr().err
+    assert not caminho.exists()
+
+
+def test_salva_e_compara_com_a_baseline(tmp_path, capsys):
+    caminho = tmp_path / 'baseline.json'
+
+    assert executar.main(ARGUMENTOS + ['--baseline', str(caminho), '--salvar-baseline']) == 0
+    resultados = json.loads(caminho.read_text(encoding='utf-8'))['resultados']
+    assert set(resultados['posicoes_corel']) == {'10'}
+
+    assert executar.main(ARGUMENTOS + ['--baseline', str(caminho), '--tolerancia', '100']) == 0
+    assert 'vazão' in capsys.readouterr().out
+
+
+def test_exportacao_grava_apenas_na_pasta_temporaria(tmp_path):
+    pytest.importorskip('requests')
+    candidatos = gerar_candidatos(5)
+
+    executar.BENCHMARKS['exportacao_csv_json']['preparar'](candidatos, str(tmp_path))()
+
+    assert os.path.exists(tmp_path / 'DADOS' / 'BENCHMARK' / 'SC' / 'BENCHMARK' / 'candidatos_eleitos_SC_BENCHMARK.json')
+    assert not os.path.exists(os.path.join(executar.RAIZ, 'DADOS', 'BENCHMARK'))
@@ -0,0 +1,107 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from picwish_callbacks import ReceptorCallbacks
+
+
+@pytest.fixture
+def receptor():
+    receptor = ReceptorCallbacks(porta=0)
+    yield receptor
+    receptor.close()
+
+
+def postar(url, corpo):
+    requisicao = urllib.request.Request(url, data=json.dumps(corpo).encode('utf-8'),
+                                        headers={'Content-Type': 'application/json'}, method='POST')
+    try:
+        with urllib.request.urlopen(requisicao, timeout=5) as resposta:
+            return resposta.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def test_padrao_ouve_apenas_localmente(receptor):
+    assert receptor.servidor.server_address[0] == '127.0.0.1'
+    assert receptor.url_callback.startswith('http://127.0.0.1:')
+
+
+def test_host_curinga_exige_url_publica():
+    with pytest.raises(ValueError):
+        ReceptorCallbacks('0.0.0.0', 0)
+
+
+def test_url_publica_com_token(receptor):
+    outro = ReceptorCallbacks(porta=0, url_publica='https://exemplo.org/')
+    try:
+        assert outro.url_callback.startswith('https://exemplo.org/picwish/callback/')
+        assert outro.caminho != receptor.caminho
+    finally:
+        outro.close()
+
+
+def test_callback_sem_token_e_recusado(receptor):
+    base = receptor.url_callback.rsplit('/', 1)[0]
+    receptor.registrar('t1')
+
+    assert postar(base, {'data': {'task_id': 't1', 'state': 1}}) == 404
+    assert postar(f"{base}/outro-token", {'data': {'task_id': 't1', 'state': 1}}) == 404
+    assert receptor.esperar('t1', 0) is None
+
+
+@pytest.mark.parametrize('corpo', [
+    {'data': {'task_id': 't1', 'state': 'pronto'}},
+    {'data': {'task_id': 't1', 'state': None}},
+    {'data': ['t1']},
+    {'data': {'state': 1}}
+])
+def test_callback_malformado_responde_400(receptor, corpo):
+    assert postar(receptor.url_callback, corpo) == 400
+
+
+def test_callback_valido_acorda_a_espera(receptor):
+    receptor.registrar('t1')
+
+    assert postar(receptor.url_callback, {'status': 200, 'data': {'task_id': 't1', 'state': '1'}}) == 200
+    assert receptor.esperar('t1', 1) == {'task_id': 't1', 'state': 1}
+
+
+def test_fluxo_com_picwish_simulado(receptor):
+    pytest.importorskip('requests')
+    from picwish import PicWishProcessor
+    from picwish_simulado import PicWishSimulado
+
+    with PicWishSimulado(atraso=0.1) as simulado:
+        processor = PicWishProcessor('teste', receptor=receptor, base_url=simulado.base_url, fallback_interval=5)
+        task_id = processor.process_image_with_picwish('http://tse/foto.jpg')
+
+        imagem = processor.get_processed_image(task_id, timeout=5)
+
+        # A imagem veio do callback de conclusão, autenticado pelo token, sem consulta de status
+        assert imagem == f"{simulado.base_url}/imagem/{task_id}.png"
+        assert simulado.consultas_status == 0
+
+
+def test_callback_de_andamento_leva_a_consulta_de_status(receptor):
+    pytest.importorskip('requests')
+    from picwish import PicWishProcessor
+    from picwish_simulado import PicWishSimulado
+
+    with PicWishSimulado(atraso=0.1, enviar_callback=False) as simulado:
+        processor = PicWishProcessor('teste', receptor=receptor, base_url=simulado.base_url, fallback_interval=0.2)
+        task_id = processor.process_image_with_picwish('http://tse/foto.jpg')
+        assert postar(receptor.url_callback, {'data': {'task_id': task_id, 'state': 2}}) == 200
+
+        imagem = processor.get_processed_image(task_id, timeout=5)
+
+        assert imagem == f"{simulado.base_url}/imagem/{task_id}.png"
+        assert simulado.consultas_status >= 1
+
+
+def test_callback_de_tarefa_nao_registrada_e_ignorado(receptor):
+    assert postar(receptor.url_callback, {'data': {'task_id': 'desconhecida', 'state': 1}}) == 200
+
+    assert receptor._tarefas == {}
@@ -0,0 +1,36 @@
+from candidato import Candidato
+
+ITEM_TSE = {
+    'id': 240002012345,
+    'nomeCompleto': 'MARIA DE FÁTIMA DA CONCEIÇÃO',
+    'nomeUrna': 'PROFESSORA MARIA',
+    'numero': 55123,
+    'partido': {'sigla': 'PSD'},
+    'st_REELEICAO': True,
+    'descricaoTotalizacao': 'Eleito por QP'
+}
+
+
+def test_from_tse():
+    candidato = Candidato.from_tse(ITEM_TSE, 2045202024, 80047, 13)
+
+    assert candidato.id == '240002012345'
+    assert candidato.id_eleicao == '2045202024'
+    assert candidato.cargo == 'Vereador'
+    assert candidato.imagem_oficial.endswith('/2045202024/240002012345/80047')
+    assert candidato.nome_arquivo == 'PROFESSORA_MARIA'
+
+
+def test_registro_exportado_ida_e_volta():
+    candidato = Candidato.from_tse(ITEM_TSE, 2045202024, 80047, 13)
+
+    assert Candidato.from_dict(candidato.to_dict()) == candidato
+    assert candidato['Reeleição'] == 'Sim'
+    assert candidato.get('Inexistente', 'padrão') == 'padrão'
+
+
+def test_parametro_id_candidato():
+    candidato = Candidato(id_candidato=1, id_eleicao=2, nome_completo='A', nome_urna='A', numero=10,
+                          partido='PT', codigo_cargo=11, codigo_municipio=3)
+
+    assert (candidato.id, candidato.reeleicao) == ('1', False)
@@ -0,0 +1,55 @@
+import subprocess
+import sys
+
+import pytest
+
+import datastore
+import eleitos_download
+from candidato import Candidato
+from conftest import RAIZ
+
+
+def test_cli_nao_importa_dependencias_pesadas():
+    codigo = ("import sys, eleitos_download; eleitos_download.criar_parser().format_help(); "
+              "print(' '.join(m for m in ('requests', 'sqlite3', 'datastore', 'leitorjson', 'perfilamento', "
+              "'picwish', 'PIL') if m in sys.modules))")
+    saida = subprocess.run([sys.executable, '-c', codigo], cwd=RAIZ, capture_output=True, text=True, check=True)
+
+    assert saida.stdout.strip() == ''
+
+
+def test_perfil_invalido_e_recusado(capsys):
+    with pytest.raises(SystemExit):
+        eleitos_download.main(['tarjetas', '--regiao', 'SUL', '--uf', 'SC', '--municipio', 'Sombrio',
+                               '--perfil', 'detalhado'])
+    assert 'Modo de perfilamento inválido' in capsys.readouterr().err
+
+
+def test_callback_em_todas_as_interfaces_exige_url(capsys, monkeypatch):
+    monkeypatch.setattr(eleitos_download, 'carregar_config', lambda: {})
+    with pytest.raises(SystemExit):
+        eleitos_download.main(['melhorar', '--regiao', 'SUL', '--uf', 'SC', '--municipio', 'Sombrio',
+                               '--callback-porta', '8765', '--callback-host', '0.0.0.0'])
+    assert '--callback-url' in capsys.readouterr().err
+
+
+def test_tarjetas_usa_a_eleicao_de_ano_e_tipo(tmp_path, monkeypatch):
+    caminho = str(tmp_path / 'eleitos.db')
+    store = datastore.EleitosDatastore(caminho)
+    store.salvar_eleicao('2045202024', '2024', 'municipal')
+    store.salvar_eleicao('2030402020', '2020', 'municipal')
+    for id_eleicao in ('2045202024', '2030402020'):
+        store.salvar_candidatos([Candidato(id_eleicao[-4:], id_eleicao, 'A', 'A', 10, 'PT', 11, '80047')],
+                                'SUL', 'SC', 'Sombrio')
+    store.close()
+
+    gerados = []
+    classe = datastore.EleitosDatastore
+    monkeypatch.setattr(datastore, 'EleitosDatastore', lambda: classe(caminho))
+    monkeypatch.setattr(eleitos_download, 'criar_estrutura_diretorios', lambda *args: str(tmp_path))
+    monkeypatch.setattr(eleitos_download, 'gerar_tarjetas', lambda candidatos, *args, **kwargs: gerados.extend(candidatos))
+
+    eleitos_download.main(['tarjetas', '--ano', '2020', '--regiao', 'SUL', '--uf', 'SC', '--municipio', 'Sombrio',
+                           '--backend', 'png'])
+
+    assert [c.id_eleicao for c in gerados] == ['2030402020']
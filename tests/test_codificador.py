@@ -0,0 +1,29 @@
+import pytest
+
+from codificador import CodificadorParalelo, codificar_arquivo
+
+
+def test_origem_removida_quando_a_codificacao_falha(tmp_path):
+    origem = tmp_path / '.bruto_foto'
+    origem.write_bytes(b'nao e uma imagem')
+
+    with pytest.raises(Exception):
+        codificar_arquivo(str(origem), str(tmp_path / 'foto.jpg'), 'foto', remover_origem=True)
+    assert not origem.exists()
+
+
+def test_processos_sem_fork():
+    with CodificadorParalelo(max_workers=1) as codificador:
+        assert codificador.executor._mp_context.get_start_method() in ('forkserver', 'spawn')
+
+
+def test_imagem_enviada_como_bytes(tmp_path):
+    Image = pytest.importorskip('PIL.Image')
+    imagem = Image.new('RGB', (60, 40), 'red')
+
+    with CodificadorParalelo(max_workers=1) as codificador:
+        resultado = codificador.enviar_imagem(imagem, str(tmp_path / 'tarjeta.png'), 'tarjeta').result()
+
+    with Image.open(resultado['caminho']) as gravada:
+        assert gravada.size == (60, 40)
+        assert gravada.getpixel((0, 0)) == (255, 0, 0)
@@ -0,0 +1,79 @@
+import sqlite3
+
+import pytest
+
+from datastore import EleitosDatastore
+
+
+def test_estado_de_processamento_por_municipio(store, candidato):
+    a, b, outro = candidato(1), candidato(2), candidato(3, codigo_municipio='80001')
+    store.salvar_candidatos([a, b], 'SUL', 'SC', 'Sombrio')
+    store.salvar_candidatos([outro], 'SUL', 'SC', 'Araranguá')
+    store.salvar_fotos([
+        {'candidato': a, 'tipo': 'original', 'caminho': '/a.jpg', 'sha256': 'h1', 'etag': '"v1"',
+         'last_modified': 'Mon, 07 Oct 2024 10:00:00 GMT'},
+        {'candidato': a, 'tipo': 'processada', 'caminho': '/a.png', 'sha256': 'h2', 'opcoes': {'scale_iterations': 1}},
+        {'candidato': outro, 'tipo': 'original', 'caminho': '/o.jpg', 'sha256': 'h3'}
+    ])
+
+    estados = store.consultar_fotos_municipio('2045202024', '80000')
+
+    assert set(estados) == {'1'}
+    assert estados['1']['original']['etag'] == '"v1"'
+    assert estados['1']['original']['last_modified'] == 'Mon, 07 Oct 2024 10:00:00 GMT'
+    assert estados['1']['processada']['opcoes'] == {'scale_iterations': 1}
+
+
+def test_remover_fotos_descarta_apenas_o_tipo_informado(store, candidato):
+    a = candidato(1)
+    store.salvar_candidatos([a], 'SUL', 'SC', 'Sombrio')
+    store.salvar_fotos([{'candidato': a, 'tipo': tipo, 'caminho': f"/{tipo}", 'sha256': tipo}
+                        for tipo in ('original', 'processada')])
+
+    store.remover_fotos([(a, 'processada')])
+
+    assert set(store.consultar_fotos(a.id_eleicao, a.id)) == {'original'}
+
+
+def test_base_antiga_recebe_colunas_de_validadores(tmp_path):
+    caminho = str(tmp_path / 'antiga.db')
+    conn = sqlite3.connect(caminho)
+    conn.execute("CREATE TABLE fotos (id_eleicao TEXT NOT NULL, id_candidato TEXT NOT NULL, tipo TEXT NOT NULL, "
+                 "caminho TEXT NOT NULL, sha256 TEXT, opcoes TEXT, id_execucao INTEGER, atualizado_em TEXT NOT NULL, "
+                 "PRIMARY KEY (id_eleicao, id_candidato, tipo))")
+    conn.close()
+
+    store = EleitosDatastore(caminho)
+    try:
+        colunas = {linha[1] for linha in store.conn.execute("PRAGMA table_info(fotos)")}
+    finally:
+        store.close()
+    assert {'etag', 'last_modified'} <= colunas
+
+
+def test_id_eleicao_registrado_por_ano_e_tipo(store):
+    store.salvar_eleicao(2045202024, 2024, 'Municipal')
+    store.salvar_eleicao('2040602022', '2022', 'federal')
+
+    assert store.consultar_id_eleicao('2024', 'municipal') == '2045202024'
+    assert store.consultar_id_eleicao(2022, 'FEDERAL ') == '2040602022'
+    assert store.consultar_id_eleicao('2020', 'municipal') is None
+
+
+def test_consulta_filtrada_pela_eleicao(store, candidato):
+    de_2024 = candidato(1)
+    de_2020 = candidato(2, id_eleicao='2030402020')
+    store.salvar_candidatos([de_2024], 'SUL', 'SC', 'Sombrio')
+    store.salvar_candidatos([de_2020], 'SUL', 'SC', 'Sombrio')
+
+    assert store.consultar_candidatos(uf='SC', municipio='sombrio', id_eleicao='2045202024') == [de_2024]
+    assert len(store.consultar_candidatos(uf='SC', municipio='Sombrio')) == 2
+
+
+def test_salvar_sem_regiao_mantem_a_registrada(store, candidato):
+    store.salvar_candidatos([candidato(1)], 'SUL', 'SC', 'Sombrio')
+    store.salvar_candidatos([candidato(1), candidato(2)], None, 'SC', 'Sombrio')
+
+    linhas = store.conn.execute("SELECT id_candidato, regiao FROM candidatos ORDER BY id_candidato").fetchall()
+
+    assert linhas == [('1', 'SUL'), ('2', 'SUL')]
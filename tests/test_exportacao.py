@@ -0,0 +1,57 @@
+import json
+import os
+
+import pytest
+
+import eleitos_download
+from candidato import Candidato
+
+
+@pytest.fixture
+def pasta(tmp_path, monkeypatch):
+    def criar_estrutura_diretorios(regiao, uf, municipio, pasta_dados=None):
+        caminho = tmp_path / regiao / uf / municipio.strip().upper()
+        caminho.mkdir(parents=True, exist_ok=True)
+        return str(caminho)
+    monkeypatch.setattr(eleitos_download, 'criar_estrutura_diretorios', criar_estrutura_diretorios)
+    return tmp_path
+
+
+@pytest.fixture
+def candidatos(candidato):
+    return [candidato(i, numero=10 + i, codigo_municipio='80047') for i in range(3)]
+
+
+def exportados(pasta):
+    with open(pasta / 'SUL' / 'SC' / 'SOMBRIO' / 'candidatos_eleitos_SC_SOMBRIO.json', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_exporta_a_partir_da_base(pasta, store, candidatos):
+    eleitos_download.exportar_para_csv_json(candidatos, 'SC', 'Sombrio', 'SUL', store)
+
+    assert [r['ID do Candidato'] for r in exportados(pasta)] == ['0', '1', '2']
+    assert len(store.consultar_candidatos(uf='SC', municipio='Sombrio')) == 3
+
+
+def test_lista_vazia_nao_exporta(pasta, store):
+    eleitos_download.exportar_para_csv_json([], 'SC', 'Sombrio', 'SUL', store)
+
+    assert not os.path.exists(pasta / 'SUL' / 'SC' / 'SOMBRIO' / 'candidatos_eleitos_SC_SOMBRIO.json')
+
+
+def test_falha_da_base_nao_interrompe_a_exportacao(pasta, store, candidatos):
+    store.close()
+
+    eleitos_download.exportar_para_csv_json(candidatos, 'SC', 'Sombrio', 'SUL', store)
+
+    assert len(exportados(pasta)) == 3
+
+
+def test_exporta_na_pasta_de_dados_informada(tmp_path, store, candidatos):
+    pasta_dados = tmp_path / 'outra'
+
+    eleitos_download.exportar_para_csv_json(candidatos, 'SC', 'Sombrio', 'SUL', store, pasta_dados=str(pasta_dados))
+
+    assert len(exportados(pasta_dados)) == 3
+    assert (pasta_dados / 'SUL' / 'SC' / 'SOMBRIO' / 'candidatos_eleitos_SC_SOMBRIO.csv').exists()
@@ -0,0 +1,171 @@
+import os
+import re
+from io import BytesIO
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('PIL')
+pytest.importorskip('svgwrite')
+
+from PIL import Image
+
+from folhas import FolhaCompositor
+from geradortarget import TarjetaGenerator
+
+
+@pytest.fixture
+def generator(tmp_path, candidato):
+    fotos_dir = tmp_path / 'fotos'
+    generator = TarjetaGenerator(str(tmp_path / 'tarjetas'), str(fotos_dir))
+    generator.candidatos = [candidato(i) for i in range(1, 4)]
+    # Fotos no caminho em que o download as deixaria, na proporção das fotos do TSE
+    for indice, eleito in enumerate(generator.candidatos):
+        caminho = eleito.caminho_original(str(fotos_dir))
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        Image.new('RGB', (161, 225), (40 * indice, 90, 160)).save(caminho)
+    return generator
+
+
+def test_tarjeta_desenhada_no_tamanho_pedido(generator):
+    candidato = generator.candidatos[0]
+
+    normal = generator.renderizar_png(candidato)
+    dobrada = generator.renderizar_png(candidato, (1200, 800))
+
+    assert normal.size == (600, 400)
+    assert dobrada.size == (1200, 800)
+    assert generator.font_size * 2 in generator._fontes
+    # A foto ocupa o dobro da área: o centro da foto tem o mesmo conteúdo nas duas escalas
+    assert dobrada.getpixel((600, 240)) != (255, 255, 255)
+
+
+def test_folha_nao_amplia_tarjeta_pronta(generator, monkeypatch):
+    tamanhos = []
+    original = generator.renderizar_png
+
+    def renderizar_png(candidato, tamanho=None):
+        tamanhos.append(tamanho)
+        return original(candidato, tamanho)
+    monkeypatch.setattr(generator, 'renderizar_png', renderizar_png)
+    compositor = FolhaCompositor(generator, pagina='A4', dpi=300)
+
+    paginas = list(compositor.paginas(generator.candidatos))
+
+    largura, altura = compositor._px(compositor.tarjeta_mm[0]), compositor._px(compositor.tarjeta_mm[1])
+    assert tamanhos == [(largura, altura)] * 3
+    assert len(paginas) == 1
+
+
+def test_tarjeta_usa_foto_processada_registrada(generator):
+    candidato = generator.candidatos[0]
+    pasta = os.path.join(generator.fotos_dir, 'imagens_processadas', candidato.cargo)
+    os.makedirs(pasta)
+    # Foto sem fundo totalmente transparente: composta sobre branco
+    processada = os.path.join(pasta, f"{candidato.nome_arquivo}_processed_no_bg.png")
+    Image.new('RGBA', (644, 900), (0, 0, 0, 0)).save(processada)
+    generator.fotos = {candidato.id: processada}
+
+    assert generator._foto_local(candidato) == processada
+    foto = generator._carregar_foto(candidato, 200)
+    assert foto.mode == 'RGB'
+    assert foto.height == 200 and foto.width < 200
+    assert foto.getpixel((foto.width // 2, 100)) == (255, 255, 255)
+
+
+def test_foto_processada_sem_registro_e_ignorada(generator):
+    candidato = generator.candidatos[0]
+    pasta = os.path.join(generator.fotos_dir, 'imagens_processadas', candidato.cargo)
+    os.makedirs(pasta)
+    # Sobra de um processamento com outras opções: não está registrada na base
+    Image.new('RGB', (10, 10)).save(os.path.join(pasta, f"{candidato.nome_arquivo}_processed.jpg"))
+
+    assert generator._foto_local(candidato) == candidato.caminho_original(generator.fotos_dir)
+
+
+def test_carregar_foto_injetado(tmp_path, candidato):
+    chamadas = []
+
+    def carregar_foto(eleito, lado):
+        chamadas.append((eleito, lado))
+        return Image.new('RGB', (lado * 3 // 4, lado), (10, 20, 30))
+
+    generator = TarjetaGenerator(str(tmp_path / 'tarjetas'), carregar_foto=carregar_foto)
+    eleito = candidato(1)
+
+    tarjeta = generator.renderizar_png(eleito, (1200, 800))
+
+    assert chamadas == [(eleito, 400)]
+    assert tarjeta.getpixel((600, 240)) == (10, 20, 30)
+
+
+def test_tarjeta_padrao_cabe_oito_por_pagina_a4(generator):
+    compositor = FolhaCompositor(generator, pagina='A4')
+
+    assert (compositor.colunas, compositor.linhas) == (2, 4)
+
+
+def test_folhas_png_passam_pelo_codificador(generator, tmp_path):
+    pasta = tmp_path / 'folhas'
+
+    caminhos = FolhaCompositor(generator, pagina='A4', dpi=50).gerar_png(generator.candidatos, str(pasta))
+
+    assert caminhos == [str(pasta / 'folha_001.png')]
+    with Image.open(caminhos[0]) as folha:
+        assert round(folha.info['dpi'][0]) == 50
+    assert sorted(os.listdir(pasta)) == ['folha_001.png']
+
+
+def paginas_pdf(caminho):
+    # Cada página acrescentada atualiza a árvore de páginas: vale a última contagem
+    with open(caminho, 'rb') as f:
+        return int(re.findall(rb'/Count\s+(\d+)', f.read())[-1])
+
+
+def test_pdf_com_uma_pagina_por_lote_de_tarjetas(generator, tmp_path):
+    saida = tmp_path / 'folhas' / 'tarjetas.pdf'
+    compositor = FolhaCompositor(generator, pagina='A4', dpi=50)
+    candidatos = generator.candidatos * 3
+
+    assert compositor.gerar_pdf(candidatos, str(saida)) == 2
+    assert paginas_pdf(saida) == 2
+    assert os.listdir(saida.parent) == ['tarjetas.pdf']
+
+
+def test_pdf_interrompido_preserva_o_anterior(generator, tmp_path, monkeypatch):
+    saida = tmp_path / 'saida' / 'tarjetas.pdf'
+    saida.parent.mkdir()
+    saida.write_bytes(b'anterior')
+    compositor = FolhaCompositor(generator, pagina='A4', dpi=50)
+
+    def paginas(candidatos):
+        yield Image.new('RGB', (100, 100), 'white')
+        raise OSError('foto ilegível')
+    monkeypatch.setattr(compositor, 'paginas', paginas)
+
+    with pytest.raises(OSError):
+        compositor.gerar_pdf(generator.candidatos, str(saida))
+    assert saida.read_bytes() == b'anterior'
+    assert os.listdir(saida.parent) == ['tarjetas.pdf']
+
+
+def test_foto_baixada_do_tse_usa_a_sessao_com_timeout(tmp_path, monkeypatch, candidato):
+    import eleitos_download
+    import geradortarget
+
+    buffer = BytesIO()
+    Image.new('RGB', (300, 400), (10, 20, 30)).save(buffer, 'JPEG')
+    chamadas = []
+
+    class Sessao:
+        def get(self, url, **kwargs):
+            chamadas.append((url, kwargs))
+            return SimpleNamespace(content=buffer.getvalue(), raise_for_status=lambda: None)
+
+    monkeypatch.setattr(geradortarget, 'obter_sessao', Sessao)
+    eleito = candidato(1)
+
+    foto = TarjetaGenerator(str(tmp_path / 'tarjetas'))._carregar_foto(eleito, 200)
+
+    assert chamadas == [(eleito.imagem_oficial, {'timeout': eleitos_download.TIMEOUT_TSE})]
+    assert foto.size == (150, 200)
@@ -0,0 +1,134 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('requests')
+
+import hedging
+from hedging import PoliticaHedge
+
+
+class RespostaFalsa:
+    def __init__(self, blocos, antes_do_corpo=None):
+        self.blocos = blocos
+        self.antes_do_corpo = antes_do_corpo
+        self.status_code = 200
+        self.fechada = False
+
+    def iter_content(self, chunk_size):
+        if self.antes_do_corpo:
+            self.antes_do_corpo()
+        yield from self.blocos
+
+    def close(self):
+        self.fechada = True
+
+
+class SessaoFalsa:
+    def __init__(self, respostas):
+        self.respostas = list(respostas)
+        self.kwargs = []
+
+    def get(self, url, **kwargs):
+        self.kwargs.append(kwargs)
+        resposta = self.respostas.pop(0)
+        return resposta() if callable(resposta) else resposta
+
+
+@pytest.fixture
+def politica():
+    politicas = []
+
+    def criar(sessao, **opcoes):
+        politicas.append(PoliticaHedge(sessao, **opcoes))
+        return politicas[-1]
+
+    yield criar
+    for politica in politicas:
+        politica.close()
+
+
+def test_atraso_inicial_ate_ter_amostras(politica):
+    hedge = politica(SessaoFalsa([]), amostras_minimas=3, atraso_inicial=2.0)
+    hedge._latencias.extend([0.1, 0.2])
+
+    assert hedge.atraso_hedge() == 2.0
+
+
+def test_atraso_e_o_percentil_das_latencias(politica):
+    hedge = politica(SessaoFalsa([]), amostras_minimas=3, percentil=0.9)
+    hedge._latencias.extend(i / 100 for i in range(1, 101))
+
+    assert hedge.atraso_hedge() == pytest.approx(0.91)
+
+
+def test_atraso_minimo(politica):
+    hedge = politica(SessaoFalsa([]), amostras_minimas=1, atraso_minimo=0.05)
+    hedge._latencias.extend([0.001] * 10)
+
+    assert hedge.atraso_hedge() == 0.05
+
+
+def test_latencia_inclui_o_primeiro_bloco_do_corpo(politica, monkeypatch):
+    agora = [0.0]
+    monkeypatch.setattr(hedging, 'time', SimpleNamespace(monotonic=lambda: agora[0]))
+
+    def corpo_lento():
+        agora[0] += 1.5
+
+    resposta = RespostaFalsa([b'abc', b'def'], antes_do_corpo=corpo_lento)
+    sessao = SessaoFalsa([resposta])
+    hedge = politica(sessao, atraso_inicial=10)
+
+    with hedge.get('http://tse/foto.jpg', headers={'X': '1'}) as recebida:
+        assert recebida.status_code == 200
+        assert list(recebida.iter_content(chunk_size=1024)) == [b'abc', b'def']
+
+    assert list(hedge._latencias) == [1.5]
+    assert sessao.kwargs[0]['stream'] is True and sessao.kwargs[0]['headers'] == {'X': '1'}
+    assert resposta.fechada
+
+
+def test_hedge_vence_quando_o_primario_demora_no_corpo(politica):
+    liberar = threading.Event()
+    lenta = RespostaFalsa([b'lenta'], antes_do_corpo=lambda: liberar.wait(5))
+    rapida = RespostaFalsa([b'rapida'])
+    hedge = politica(SessaoFalsa([lenta, rapida]), atraso_inicial=0.05)
+
+    try:
+        with hedge.get('http://tse/foto.jpg') as recebida:
+            assert recebida.content == b'rapida'
+    finally:
+        liberar.set()
+
+    assert hedge.estatisticas == {'requisicoes': 1, 'hedges': 1, 'hedges_vencedores': 1}
+
+
+def test_cada_thread_usa_a_propria_sessao(politica, monkeypatch):
+    liberar = threading.Event()
+    respostas = [RespostaFalsa([b'lenta'], antes_do_corpo=lambda: liberar.wait(5)), RespostaFalsa([b'rapida'])]
+    sessoes = []
+
+    class SessaoPorThread(SessaoFalsa):
+        def __init__(self):
+            super().__init__([respostas.pop(0)])
+            self.fechada = False
+            sessoes.append(self)
+
+        def close(self):
+            self.fechada = True
+
+    monkeypatch.setattr(hedging.requests, 'Session', SessaoPorThread)
+    hedge = politica(None, atraso_inicial=0.05)
+
+    try:
+        with hedge.get('http://tse/foto.jpg') as recebida:
+            assert recebida.content == b'rapida'
+    finally:
+        liberar.set()
+
+    # Primário e hedge correm em threads diferentes do executor, cada uma com a sua sessão
+    assert len(sessoes) == 2
+    hedge.close()
+    assert all(sessao.fechada for sessao in sessoes)
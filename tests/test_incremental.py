@@ -0,0 +1,147 @@
+import os
+
+import pytest
+
+from datastore import EleitosDatastore
+from eleitos_download import filtrar_pendentes, fotos_registradas, opcoes_processamento
+
+PARAMS_IA = {'baixar_imagens': True, 'usar_ia': True, 'scale_iterations': 1, 'remove_background': False,
+             'make_id_photo': False}
+PARAMS_DOWNLOAD = dict(PARAMS_IA, usar_ia=False, scale_iterations=0)
+
+
+def estado(tmp_path, id_candidato, params, tipos=('original', 'processada')):
+    registros = {}
+    for tipo in tipos:
+        caminho = tmp_path / f"{id_candidato}_{tipo}"
+        caminho.write_bytes(b'foto')
+        registros[tipo] = {'caminho': str(caminho), 'sha256': 'h', 'opcoes': {}, 'etag': None, 'last_modified': None}
+    if 'processada' in registros:
+        registros['processada']['opcoes'] = opcoes_processamento(params)
+    return registros
+
+
+class ProcessorFalso:
+    def __init__(self, alteradas=()):
+        self.alteradas = set(alteradas)
+        self.verificadas = []
+
+    def image_changed(self, url, record):
+        self.verificadas.append(url)
+        return any(url.endswith(f"/{id_candidato}/80000") for id_candidato in self.alteradas)
+
+
+def ids(candidatos):
+    return [c.id for c in candidatos]
+
+
+def test_inalterados_com_processamento_concluido_sao_ignorados(tmp_path, candidato):
+    atuais = [candidato(1), candidato(2, nome_urna='NOVO NOME'), candidato(3)]
+    anteriores = [candidato(1), candidato(2)]
+    estados = {'1': estado(tmp_path, '1', PARAMS_IA), '2': estado(tmp_path, '2', PARAMS_IA)}
+
+    assert ids(filtrar_pendentes(atuais, anteriores, estados, PARAMS_IA)) == ['2', '3']
+
+
+def test_processamento_que_falhou_conta_como_alterado(tmp_path, candidato):
+    atuais = [candidato(1), candidato(2)]
+    # O candidato 2 só tem a foto original: o PicWish falhou na execução anterior
+    estados = {'1': estado(tmp_path, '1', PARAMS_IA), '2': estado(tmp_path, '2', PARAMS_IA, tipos=('original',))}
+
+    assert ids(filtrar_pendentes(atuais, list(atuais), estados, PARAMS_IA)) == ['2']
+
+
+def test_ativar_ia_reprocessa_municipio_ja_baixado(tmp_path, candidato):
+    atuais = [candidato(1), candidato(2)]
+    estados = {i: estado(tmp_path, i, PARAMS_DOWNLOAD, tipos=('original',)) for i in ('1', '2')}
+
+    assert ids(filtrar_pendentes(atuais, list(atuais), estados, PARAMS_DOWNLOAD)) == []
+    assert ids(filtrar_pendentes(atuais, list(atuais), estados, PARAMS_IA)) == ['1', '2']
+
+
+def test_mudanca_nas_opcoes_picwish_reprocessa(tmp_path, candidato):
+    atuais = [candidato(1)]
+    estados = {'1': estado(tmp_path, '1', PARAMS_IA)}
+
+    assert ids(filtrar_pendentes(atuais, list(atuais), estados, dict(PARAMS_IA, remove_background=True))) == ['1']
+
+
+def test_foto_registrada_apagada_do_disco_conta_como_alterada(tmp_path, candidato):
+    atuais = [candidato(1)]
+    estados = {'1': estado(tmp_path, '1', PARAMS_IA)}
+    (tmp_path / '1_processada').unlink()
+
+    assert ids(filtrar_pendentes(atuais, list(atuais), estados, PARAMS_IA)) == ['1']
+
+
+def test_foto_alterada_no_tse_so_e_conferida_para_processados(tmp_path, candidato):
+    atuais = [candidato(1), candidato(2), candidato(3)]
+    estados = {i: estado(tmp_path, i, PARAMS_IA) for i in ('1', '2')}
+    processor = ProcessorFalso(alteradas={'2'})
+
+    assert ids(filtrar_pendentes(atuais, list(atuais), estados, PARAMS_IA, processor)) == ['2', '3']
+    assert len(processor.verificadas) == 2
+
+
+def test_falha_na_listagem_preserva_o_que_ja_foi_baixado(tmp_path, monkeypatch, candidato):
+    pytest.importorskip('requests')
+    import datastore
+    import eleitos_download
+    import picwish
+
+    baixados = []
+
+    class ProcessorFalso(picwish.PicWishProcessor):
+        def download_image(self, url, save_path, max_bytes=None, validators=None):
+            baixados.append(url)
+            os.makedirs(os.path.dirname(save_path), exist_ok=True)
+            with open(save_path, 'wb') as f:
+                f.write(b'foto')
+            return 'hash'
+
+    def criar_estrutura_diretorios(regiao, uf, municipio, pasta_dados=None):
+        caminho = tmp_path / regiao / uf / municipio.strip().upper()
+        caminho.mkdir(parents=True, exist_ok=True)
+        return str(caminho)
+
+    listagens = {11: [candidato(1)], 12: [candidato(2)], 13: [candidato(3)]}
+    falhar = {13}
+
+    def obter_candidatos_eleitos(id_eleicao, codigo_municipio, codigo_cargo):
+        if codigo_cargo in falhar:
+            raise RuntimeError("TSE fora do ar")
+        return listagens[codigo_cargo]
+
+    caminho_base = str(tmp_path / 'eleitos.db')
+    monkeypatch.setattr(datastore, 'EleitosDatastore', lambda: EleitosDatastore(caminho_base))
+    monkeypatch.setattr(picwish, 'PicWishProcessor', ProcessorFalso)
+    monkeypatch.setattr(eleitos_download, 'criar_estrutura_diretorios', criar_estrutura_diretorios)
+    monkeypatch.setattr(eleitos_download, 'resolver_municipio', lambda params: ('2045202024', '80000'))
+    monkeypatch.setattr(eleitos_download, 'obter_candidatos_eleitos', obter_candidatos_eleitos)
+    params = dict(PARAMS_DOWNLOAD, ano='2024', tipo='municipal', regiao='SUL', uf='SC', municipio='Sombrio',
+                  incremental=True, api_key=None, gerar_tarjetas=False)
+
+    with pytest.raises(RuntimeError):
+        eleitos_download.executar(params)
+    assert len(baixados) == 2
+
+    falhar.clear()
+    eleitos_download.executar(params)
+
+    assert len(baixados) == 3
+    assert baixados[-1].endswith('/3/80000')
+
+
+def test_fotos_das_tarjetas_vem_dos_registros_da_base(store, candidato, tmp_path):
+    com_processada, so_original, sem_foto = candidato(1), candidato(2), candidato(3)
+    store.salvar_candidatos([com_processada, so_original, sem_foto], 'SUL', 'SC', 'Sombrio')
+    store.salvar_fotos([
+        {'candidato': com_processada, 'tipo': 'original', 'caminho': str(tmp_path / '1.jpg')},
+        {'candidato': com_processada, 'tipo': 'processada', 'caminho': str(tmp_path / '1_processed_no_bg.webp')},
+        {'candidato': so_original, 'tipo': 'original', 'caminho': str(tmp_path / '2.jpg')}
+    ])
+
+    assert fotos_registradas(store, '2045202024', '80000') == {
+        '1': str(tmp_path / '1_processed_no_bg.webp'),
+        '2': str(tmp_path / '2.jpg')
+    }
@@ -0,0 +1,92 @@
+import json
+
+import pytest
+
+from leitorjson import LeitorJson, decodificar_utf8
+
+LISTAGEM = {
+    'unidadeEleitoral': {'codigo': '80047', 'nome': 'SOMBRIO'},
+    'cargo': None,
+    'candidatos': [
+        {'id': 240002012345, 'nomeUrna': 'PROFESSORA MARIA', 'numero': 55123, 'partido': {'sigla': 'PSD'},
+         'descricaoTotalizacao': 'Eleito por QP', 'percentual': -1.5e-3},
+        {'id': 240002012346, 'nomeUrna': 'ZÉ DO GÁS', 'numero': 15, 'partido': None,
+         'descricaoTotalizacao': None, 'ativo': True},
+        {'id': 12345678901234567890, 'nomeUrna': 'JOÃO "DA PRAÇA"', 'numero': 0, 'vices': [], 'extra': {}}
+    ],
+    'total': 3
+}
+
+
+def pedacos(texto, tamanho):
+    return [texto[i:i + tamanho] for i in range(0, len(texto), tamanho)]
+
+
+def itens(texto_ou_pedacos, chave='candidatos', **opcoes):
+    if isinstance(texto_ou_pedacos, str):
+        texto_ou_pedacos = [texto_ou_pedacos]
+    return list(LeitorJson(texto_ou_pedacos, **opcoes).iterar_array(chave))
+
+
+@pytest.mark.parametrize('tamanho', [1, 2, 3, 7, 64, 10_000])
+def test_fronteiras_de_trecho(tamanho):
+    texto = json.dumps(LISTAGEM, ensure_ascii=False, indent=1)
+
+    assert itens(pedacos(texto, tamanho)) == LISTAGEM['candidatos']
+
+
+def test_numeros_divididos_entre_trechos():
+    assert itens(['{"candidatos": [12', '34, -5', '.2', '5e', '1, 7', ']}']) == [1234, -52.5, 7]
+    # O número termina exatamente no fim do trecho e continua no seguinte
+    assert itens(['{"candidatos": [1', '0', '0]}']) == [100]
+
+
+def test_literais_e_strings_divididos_entre_trechos():
+    assert itens(['{"candidatos": [tr', 'ue, nu', 'll, "a\\', '"b", fal', 'se]}']) == [True, None, 'a"b', False]
+
+
+def test_chave_nula_ausente_ou_vazia():
+    assert itens('{"candidatos": null}') == []
+    assert itens('{"outros": [1, 2], "total": 0}') == []
+    assert itens('{}') == []
+    assert itens('{"candidatos": []}') == []
+    assert itens('{"antes": {"candidatos": [9]}, "candidatos": [1]}') == [1]
+
+
+@pytest.mark.parametrize('texto', [
+    '',
+    '{"candidatos": [{"id": 1}',
+    '{"candidatos": [{"id": 1}, {"id"',
+    '{"candidatos": [{"id": 1}, ',
+    '{"candidatos": ["sem fim',
+    '{"candidatos"'
+])
+def test_entrada_truncada_levanta_erro(texto):
+    with pytest.raises(ValueError):
+        itens(pedacos(texto, 4))
+
+
+def test_json_invalido_nao_carrega_o_restante_da_entrada():
+    carregados = []
+
+    def trechos():
+        yield '{"candidatos": [{"id": 1}, {"id": @}, '
+        for i in range(1000):
+            carregados.append(i)
+            yield '{"id": %d}, ' % i
+
+    with pytest.raises(ValueError):
+        itens(trechos(), max_valor=100)
+    assert len(carregados) < 20
+
+
+def test_esperado_virgula_entre_itens():
+    with pytest.raises(ValueError):
+        itens('{"candidatos": [1 2]}')
+
+
+def test_utf8_multibyte_dividido_entre_trechos():
+    dados = json.dumps({'candidatos': ['ÇÃÉ', '€', '😀']}, ensure_ascii=False).encode('utf-8')
+    trechos = decodificar_utf8([dados[i:i + 1] for i in range(len(dados))])
+
+    assert itens(trechos) == ['ÇÃÉ', '€', '😀']
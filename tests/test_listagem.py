@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+pytest.importorskip('requests')
+
+import eleitos_download
+
+ITENS = [
+    {'id': 1, 'nomeUrna': 'A', 'numero': 55, 'partido': {'sigla': 'PSD'}, 'descricaoTotalizacao': 'Eleito'},
+    {'id': 2, 'nomeUrna': 'B', 'numero': 15, 'partido': {'sigla': 'MDB'}, 'descricaoTotalizacao': 'Não eleito'},
+    {'id': 3, 'nomeUrna': 'C', 'numero': 11, 'partido': {'sigla': 'PP'}, 'descricaoTotalizacao': 'Eleito por média'}
+]
+
+
+class RespostaFalsa:
+    def __init__(self, corpo, aberta):
+        self.corpo = corpo
+        self.aberta = aberta
+
+    def __enter__(self):
+        self.aberta.append(True)
+        return self
+
+    def __exit__(self, *exc):
+        self.aberta.pop()
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.corpo), 5):
+            yield self.corpo[i:i + 5]
+
+
+class SessaoFalsa:
+    def __init__(self, corpo):
+        self.corpo = corpo
+        self.aberta = []
+        self.kwargs = None
+
+    def get(self, url, **kwargs):
+        self.kwargs = kwargs
+        return RespostaFalsa(self.corpo, self.aberta)
+
+
+def test_listagem_lida_ate_o_fim_antes_do_primeiro_eleito(monkeypatch):
+    sessao = SessaoFalsa(json.dumps({'candidatos': ITENS}).encode())
+    monkeypatch.setattr(eleitos_download, 'obter_sessao', lambda: sessao)
+
+    candidatos = eleitos_download.iterar_candidatos_eleitos('2045202024', '80047', 13)
+    primeiro = next(candidatos)
+
+    assert primeiro.id == '1'
+    assert sessao.aberta == []
+    assert [c.id for c in candidatos] == ['3']
+    assert sessao.kwargs['timeout'] == eleitos_download.TIMEOUT_TSE
+
+
+def test_listagem_truncada_levanta_erro(monkeypatch):
+    corpo = json.dumps({'candidatos': ITENS}).encode()
+    sessao = SessaoFalsa(corpo[:len(corpo) // 2])
+    monkeypatch.setattr(eleitos_download, 'obter_sessao', lambda: sessao)
+
+    with pytest.raises(ValueError):
+        eleitos_download.obter_candidatos_eleitos('2045202024', '80047', 13)
+
+
+def test_uma_sessao_por_thread():
+    import threading
+
+    sessoes = []
+    thread = threading.Thread(target=lambda: sessoes.append(eleitos_download.obter_sessao()))
+    thread.start()
+    thread.join()
+
+    assert eleitos_download.obter_sessao() is eleitos_download.obter_sessao()
+    assert sessoes[0] is not eleitos_download.obter_sessao()
@@ -0,0 +1,42 @@
+import os
+
+import pytest
+
+pytest.importorskip('PIL')
+
+from PIL import Image
+
+from miniaturas import abrir_miniatura, caminho_miniatura, obter_miniatura
+
+
+def foto(caminho, tamanho, modo='RGB', cor=(200, 30, 30)):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    imagem = Image.new(modo, tamanho, cor)
+    imagem.save(caminho)
+    return caminho
+
+
+def test_miniatura_mantem_proporcao(tmp_path):
+    caminho = foto(str(tmp_path / 'imagens' / 'retrato.jpg'), (161, 225))
+
+    miniatura = abrir_miniatura(caminho, 200)
+
+    # 161x225 contida em 200x200: altura inteira, largura proporcional
+    assert miniatura.size == (round(161 * 200 / 225), 200)
+
+
+def test_miniatura_em_caixa_retangular(tmp_path):
+    caminho = foto(str(tmp_path / 'imagens' / 'paisagem.jpg'), (800, 400))
+
+    assert abrir_miniatura(caminho, 100, 100).size == (100, 50)
+
+
+def test_piramide_de_foto_processada_com_alfa(tmp_path):
+    caminho = foto(str(tmp_path / 'imagens_processadas' / 'Prefeito' / 'JOAO_processed_no_bg.png'),
+                   (644, 900), 'RGBA', (0, 0, 0, 0))
+
+    nivel = obter_miniatura(caminho, 200)
+
+    assert nivel == caminho_miniatura(caminho, 200, com_alfa=True)
+    assert os.path.exists(nivel)
+    assert abrir_miniatura(caminho, 200).mode == 'RGBA'
@@ -0,0 +1,108 @@
+import threading
+import time
+import tracemalloc
+
+import pytest
+
+import perfilamento
+from perfilamento import Perfilador
+
+
+def ocupar_cpu(segundos):
+    fim = time.perf_counter() + segundos
+    while time.perf_counter() < fim:
+        pass
+
+
+def ocupar_cpu_ate(parar):
+    while not parar.is_set():
+        ocupar_cpu(0.01)
+
+
+def test_modo_invalido():
+    with pytest.raises(ValueError):
+        Perfilador('detalhado')
+
+
+def test_desligado_nao_registra():
+    perfilador = Perfilador()
+    with perfilador.etapa('download'):
+        pass
+
+    assert perfilador.relatorio()['etapas'] == {}
+
+
+def test_cpu_e_da_thread_da_etapa():
+    perfilador = Perfilador('amostragem', intervalo=0.01)
+    parar = threading.Event()
+    outra = threading.Thread(target=ocupar_cpu_ate, args=(parar,))
+    outra.start()
+    try:
+        with perfilador.etapa('espera'):
+            time.sleep(0.2)
+    finally:
+        parar.set()
+        outra.join()
+        perfilador.close()
+
+    etapa = perfilador.relatorio()['etapas']['espera']
+    assert etapa['chamadas'] == 1
+    assert etapa['parede_s'] >= 0.2
+    # A CPU gasta pela outra thread não entra na etapa que só esperou
+    assert etapa['cpu_s'] < 0.05
+
+
+def test_etapas_aninhadas_e_decorador(monkeypatch):
+    perfilador = Perfilador('amostragem', intervalo=1)
+    monkeypatch.setattr(perfilamento, '_perfilador', perfilador)
+
+    @perfilamento.perfilar('interna')
+    def interna():
+        ocupar_cpu(0.02)
+
+    with perfilamento.etapa('externa'):
+        interna()
+        interna()
+    perfilador.close()
+
+    etapas = perfilador.relatorio()['etapas']
+    assert etapas['interna']['chamadas'] == 2
+    assert etapas['externa']['parede_s'] >= etapas['interna']['parede_s']
+    assert list(etapas) == ['externa', 'interna']
+
+
+def test_completo_nao_para_tracemalloc_de_terceiros():
+    tracemalloc.start()
+    try:
+        perfilador = Perfilador('completo')
+        with perfilador.etapa('alocacao'):
+            dados = [bytes(1024) for _ in range(100)]
+        perfilador.close()
+
+        assert tracemalloc.is_tracing()
+        assert perfilador.relatorio()['etapas']['alocacao']['pico_memoria_bytes'] >= 100 * 1024
+        del dados
+    finally:
+        tracemalloc.stop()
+
+
+def test_completo_para_o_tracemalloc_que_iniciou():
+    assert not tracemalloc.is_tracing()
+    perfilador = Perfilador('completo')
+    assert tracemalloc.is_tracing()
+
+    perfilador.close()
+
+    assert not tracemalloc.is_tracing()
+
+
+def test_salvar_relatorio(tmp_path):
+    perfilador = Perfilador('amostragem', intervalo=1)
+    with perfilador.etapa('exportacao'):
+        pass
+    perfilador.close()
+
+    caminho = perfilador.salvar('teste', str(tmp_path))
+
+    assert caminho == str(tmp_path / 'teste.json')
+    assert 'exportacao' in (tmp_path / 'teste.json').read_text(encoding='utf-8')
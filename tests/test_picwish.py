@@ -0,0 +1,152 @@
+import hashlib
+
+import pytest
+
+pytest.importorskip('requests')
+
+import picwish
+from picwish import PicWishProcessor
+
+
+class RespostaFalsa:
+    def __init__(self, status_code, corpo=b'', headers=None):
+        self.status_code = status_code
+        # Uma lista de bytes é entregue bloco a bloco, como em streaming
+        self.blocos = corpo if isinstance(corpo, list) else [corpo]
+        self.headers = headers or {}
+        self.lidos = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+    def iter_content(self, chunk_size):
+        for bloco in self.blocos:
+            self.lidos += 1
+            yield bloco
+
+
+@pytest.fixture
+def processor_falso(monkeypatch):
+    """Cria um PicWishProcessor cujos GETs devolvem `resposta` e registram os cabeçalhos enviados"""
+    def criar(resposta):
+        processor = PicWishProcessor(api_key='teste')
+        processor.cabecalhos = []
+
+        def get(url, **kwargs):
+            processor.cabecalhos.append(kwargs.get('headers'))
+            return resposta
+        monkeypatch.setattr(picwish.requests, 'get', get)
+        return processor
+    return criar
+
+
+@pytest.fixture
+def registro(tmp_path):
+    caminho = tmp_path / 'foto.jpg'
+    caminho.write_bytes(b'foto')
+    return {'caminho': str(caminho), 'sha256': hashlib.sha256(b'foto').hexdigest(), 'opcoes': {},
+            'etag': '"v1"', 'last_modified': 'Mon, 07 Oct 2024 10:00:00 GMT'}
+
+
+def test_verificacao_condicional_com_304(registro, processor_falso):
+    processor = processor_falso(RespostaFalsa(304))
+
+    assert processor.image_changed('http://tse/foto', registro) is False
+    assert processor.cabecalhos == [{'If-None-Match': '"v1"', 'If-Modified-Since': 'Mon, 07 Oct 2024 10:00:00 GMT'}]
+
+
+def test_sem_validadores_compara_com_hash_registrado(registro, processor_falso):
+    registro.update(etag=None, last_modified=None)
+
+    assert processor_falso(RespostaFalsa(200, b'foto')).image_changed('http://tse/foto', registro) is False
+    assert processor_falso(RespostaFalsa(200, b'outra')).image_changed('http://tse/foto', registro) is True
+
+
+def test_sem_registro_ou_arquivo_conta_como_alterada(registro, tmp_path, processor_falso):
+    processor = processor_falso(RespostaFalsa(304))
+
+    assert processor.image_changed('http://tse/foto', None) is True
+    assert processor.image_changed('http://tse/foto', dict(registro, caminho=str(tmp_path / 'nao_existe'))) is True
+    assert processor.cabecalhos == []
+
+
+def test_imagem_bruta_removida_quando_a_codificacao_falha(tmp_path):
+    processor = PicWishProcessor(api_key='teste')
+    bruta = tmp_path / '.bruto_foto'
+    bruta.write_bytes(b'picwish')
+    result = {'processada': None, '_raw_path': str(bruta)}
+
+    def falhar():
+        raise OSError('processo encerrado')
+    processor._finish_encoding(result, 'codificacao', falhar)
+
+    assert not bruta.exists()
+    assert result == {'processada': None}
+
+
+def test_download_sem_hedge_usa_timeout(monkeypatch):
+    chamadas = []
+
+    def get(url, **kwargs):
+        chamadas.append(kwargs)
+        return RespostaFalsa(200)
+
+    monkeypatch.setattr(picwish.requests, 'get', get)
+    PicWishProcessor(api_key='teste')._get_stream('http://tse/foto.jpg', headers={'X': '1'})
+
+    assert chamadas == [{'stream': True, 'timeout': picwish.TIMEOUT, 'headers': {'X': '1'}}]
+
+
+def arquivos(pasta):
+    return sorted(caminho.name for caminho in pasta.iterdir())
+
+
+def test_download_retorna_o_hash_do_conteudo_gravado(tmp_path, processor_falso):
+    destino = tmp_path / 'fotos' / 'foto.jpg'
+    validators = {}
+    processor = processor_falso(RespostaFalsa(200, [b'par', b'tes'], headers={'ETag': '"v2"', 'Content-Length': '6'}))
+
+    sha256 = processor.download_image('http://tse/foto', str(destino), validators=validators)
+
+    assert destino.read_bytes() == b'partes'
+    assert sha256 == hashlib.sha256(destino.read_bytes()).hexdigest()
+    assert validators == {'etag': '"v2"', 'last_modified': None}
+    assert arquivos(destino.parent) == ['foto.jpg']
+
+
+def test_download_acima_do_limite_pelo_content_length_preserva_o_arquivo(tmp_path, processor_falso):
+    destino = tmp_path / 'foto.jpg'
+    destino.write_bytes(b'anterior')
+    resposta = RespostaFalsa(200, [b'x' * 10], headers={'Content-Length': '10'})
+
+    assert processor_falso(resposta).download_image('http://tse/foto', str(destino), max_bytes=5) is None
+    assert resposta.lidos == 0
+    assert destino.read_bytes() == b'anterior'
+    assert arquivos(tmp_path) == ['foto.jpg']
+
+
+def test_download_acima_do_limite_no_meio_do_corpo_preserva_o_arquivo(tmp_path, processor_falso):
+    destino = tmp_path / 'foto.jpg'
+    destino.write_bytes(b'anterior')
+    # Sem Content-Length, o limite só é percebido durante a leitura
+    resposta = RespostaFalsa(200, [b'xxx', b'xxx', b'xxx'])
+
+    assert processor_falso(resposta).download_image('http://tse/foto', str(destino), max_bytes=5) is None
+    assert resposta.lidos == 2
+    assert destino.read_bytes() == b'anterior'
+    assert arquivos(tmp_path) == ['foto.jpg']
+
+
+@pytest.mark.parametrize('resposta', [RespostaFalsa(200, b''), RespostaFalsa(404, b'nao encontrada')])
+def test_download_vazio_ou_com_erro_retorna_none(tmp_path, resposta, processor_falso):
+    destino = tmp_path / 'foto.jpg'
+
+    assert processor_falso(resposta).download_image('http://tse/foto', str(destino)) is None
+    assert arquivos(tmp_path) == []
@@ -0,0 +1,164 @@
+import os
+
+import pytest
+
+from datastore import EleitosDatastore
+from planejador import CREDITOS_PICWISH, LATENCIAS_PADRAO, Planejador
+
+
+def parametros(**campos):
+    params = {'ano': '2024', 'tipo': 'municipal', 'regiao': 'SUL', 'uf': 'SC', 'municipio': 'Sombrio',
+              'incremental': False, 'usar_ia': True, 'baixar_imagens': True, 'scale_iterations': 1,
+              'remove_background': False, 'make_id_photo': False, 'gerar_tarjetas': False,
+              'backend_tarjeta': 'imagem', 'orcamento': {}}
+    params.update(campos)
+    return params
+
+
+def planejador(store):
+    planejador = Planejador(store)
+    # Independente de um config.json local
+    planejador.creditos = dict(CREDITOS_PICWISH)
+    return planejador
+
+
+def test_custo_por_candidato_com_latencias_padrao(store):
+    creditos, segundos = planejador(store).custo_candidato(parametros(scale_iterations=2, remove_background=True))
+
+    assert creditos == 3
+    assert segundos == pytest.approx(2 * LATENCIAS_PADRAO['download'] + 2 * LATENCIAS_PADRAO['picwish_scale']
+                                     + LATENCIAS_PADRAO['picwish_segmentation'])
+
+
+def test_latencia_usa_o_historico_da_base(store):
+    store.registrar_latencias([('download', 1.0), ('download', 3.0), ('tarjeta_imagem', 0.2)])
+    plano = planejador(store)
+
+    assert plano.latencia('download') == (2.0, "histórico (2)")
+    assert plano.latencia('tarjeta_imagem') == (0.2, "histórico (1)")
+    assert plano.latencia('tarjeta_corel') == (LATENCIAS_PADRAO['tarjeta'], "padrão")
+
+
+def test_orcamento_de_creditos_prioriza_prefeitos(store, candidato):
+    pendentes = [candidato(1, 13), candidato(2, 13), candidato(3, 11), candidato(4, 12)]
+
+    selecionados, adiados = planejador(store).aplicar_orcamento(
+        pendentes, parametros(orcamento={'creditos': 3}))
+
+    assert [c.id for c in selecionados] == ['3', '4', '1']
+    assert [c.id for c in adiados] == ['2']
+
+
+def test_orcamento_de_tempo_adia_todos_depois_do_primeiro_que_nao_cabe(store, candidato):
+    plano = planejador(store)
+    segundos = plano.custo_candidato(parametros())[1]
+    pendentes = [candidato(1, 11), candidato(2, 13), candidato(3, 13)]
+
+    selecionados, adiados = plano.aplicar_orcamento(pendentes, parametros(orcamento={'minutos': 2.5 * segundos / 60}))
+
+    assert [c.id for c in selecionados] == ['1', '2']
+    assert [c.id for c in adiados] == ['3']
+
+
+def test_sem_orcamento_nada_e_adiado(store, candidato):
+    pendentes = [candidato(1, 13), candidato(2, 11)]
+
+    selecionados, adiados = planejador(store).aplicar_orcamento(pendentes, parametros())
+
+    assert selecionados == pendentes and adiados == []
+
+
+def test_orcamento_zero_e_um_limite(store, candidato):
+    pendentes = [candidato(1, 11), candidato(2, 13)]
+
+    assert Planejador.limites(parametros(orcamento={'creditos': 0, 'minutos': None})) == (0, None)
+    assert Planejador.limites(parametros(orcamento={'minutos': 0})) == (None, 0)
+    selecionados, adiados = planejador(store).aplicar_orcamento(pendentes, parametros(orcamento={'creditos': 0}))
+    assert selecionados == [] and adiados == pendentes
+
+
+def test_execucao_e_plano_descontam_o_mesmo_tempo_fixo(store, candidato):
+    anteriores = [candidato(1, 11), candidato(2, 13)]
+    store.salvar_candidatos(anteriores, 'SUL', 'SC', 'Sombrio')
+    params = parametros(gerar_tarjetas=True)
+    plano = planejador(store)
+
+    esperado = (LATENCIAS_PADRAO['tse_municipio'] + 3 * LATENCIAS_PADRAO['tse_listagem']
+                + 2 * LATENCIAS_PADRAO['tarjeta'])
+    assert plano.segundos_fixos(params, 2, 0) == pytest.approx(esperado)
+    assert plano.segundos_fixos_execucao(params, anteriores) == pytest.approx(esperado)
+
+
+def test_selecao_consome_os_pendentes_aos_poucos(store, candidato):
+    consumidos = []
+
+    def listagem():
+        for id_candidato, codigo_cargo in ((1, 11), (2, 12), (3, 13)):
+            consumidos.append(id_candidato)
+            yield candidato(id_candidato, codigo_cargo)
+
+    adiados = []
+    selecao = planejador(store).selecionar_no_orcamento(listagem(), parametros(orcamento={'creditos': 1}), adiados)
+
+    assert next(selecao).id == '1'
+    assert consumidos == [1]
+    assert list(selecao) == []
+    assert [c.id for c in adiados] == ['2', '3']
+
+
+def test_plano_estima_operacoes_e_creditos(store, monkeypatch, candidato):
+    plano = planejador(store)
+    candidatos = [candidato(1, 11), candidato(2, 12), candidato(3, 13), candidato(4, 13)]
+    monkeypatch.setattr(plano, 'resolver_candidatos', lambda params: (candidatos, "base local"))
+
+    resultado = plano.planejar(parametros(make_id_photo=True, gerar_tarjetas=True, orcamento={'creditos': 6}))
+
+    assert resultado['pendentes'] == 4
+    assert [c.id for c in resultado['selecionados']] == ['1', '2', '3']
+    assert [c.id for c in resultado['adiados']] == ['4']
+    assert resultado['creditos'] == 6
+    operacoes = resultado['operacoes']
+    assert operacoes['download']['quantidade'] == 6
+    assert operacoes['picwish_scale']['quantidade'] == 3
+    assert operacoes['picwish_idphoto']['quantidade'] == 3
+    assert operacoes['tarjeta_imagem']['quantidade'] == 4
+    assert resultado['segundos'] == pytest.approx(sum(o['segundos'] for o in operacoes.values()))
+
+
+def test_execucao_marca_adiados_como_pendentes(store, tmp_path, monkeypatch, candidato):
+    pytest.importorskip('requests')
+    import datastore
+    import eleitos_download
+    import picwish
+
+    class ProcessorFalso(picwish.PicWishProcessor):
+        def download_image(self, url, save_path, max_bytes=None, validators=None):
+            os.makedirs(os.path.dirname(save_path), exist_ok=True)
+            with open(save_path, 'wb') as f:
+                f.write(b'foto')
+            return 'hash'
+
+    def criar_estrutura_diretorios(regiao, uf, municipio, pasta_dados=None):
+        caminho = tmp_path / regiao / uf / municipio.strip().upper()
+        caminho.mkdir(parents=True, exist_ok=True)
+        return str(caminho)
+
+    listagens = {11: [candidato(1, 11)], 12: [candidato(2, 12)], 13: [candidato(3, 13)]}
+    # A execução abre (e fecha) a própria conexão com a base do teste
+    monkeypatch.setattr(datastore, 'EleitosDatastore', lambda: EleitosDatastore(str(tmp_path / 'eleitos.db')))
+    monkeypatch.setattr(picwish, 'PicWishProcessor', ProcessorFalso)
+    monkeypatch.setattr(eleitos_download, 'criar_estrutura_diretorios', criar_estrutura_diretorios)
+    monkeypatch.setattr(eleitos_download, 'resolver_municipio', lambda params: ('2045202024', '80000'))
+    monkeypatch.setattr(eleitos_download, 'obter_candidatos_eleitos',
+                        lambda id_eleicao, codigo_municipio, codigo_cargo: listagens[codigo_cargo])
+    # Os adiados já tinham sido processados em uma execução anterior
+    store.salvar_fotos([{'candidato': c, 'tipo': 'original', 'caminho': str(tmp_path / f'{c.id}.jpg'), 'sha256': 'h'}
+                        for c in (listagens[12][0], listagens[13][0])])
+
+    # O orçamento desconta as consultas ao TSE, como no plano, e comporta um único download
+    segundos_tse = LATENCIAS_PADRAO['tse_municipio'] + LATENCIAS_PADRAO['tse_listagem'] * 3
+    eleitos_download.executar(parametros(usar_ia=False, scale_iterations=0, api_key=None,
+                                         orcamento={'minutos': (segundos_tse + 1.5 * LATENCIAS_PADRAO['download']) / 60}))
+
+    estados = store.consultar_fotos_municipio('2045202024', '80000')
+    assert set(estados) == {'1'}
@@ -0,0 +1,123 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from types import SimpleNamespace
+
+import pytest
+
+import servico
+from servico import CacheCoalescente, ErroOrigem, ServicoEleitos, criar_servidor
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    agora = [1000.0]
+    monkeypatch.setattr(servico, 'time', SimpleNamespace(monotonic=lambda: agora[0]))
+    return agora
+
+
+def test_cache_expira_apos_ttl(relogio):
+    cache = CacheCoalescente(ttl=60)
+    cargas = []
+
+    def carregar():
+        cargas.append(relogio[0])
+        return len(cargas)
+
+    assert cache.obter('a', carregar) == 1
+    relogio[0] += 59
+    assert cache.obter('a', carregar) == 1
+    relogio[0] += 2
+    assert cache.obter('a', carregar) == 2
+
+
+def test_cache_limitado_por_bytes():
+    cache = CacheCoalescente(max_bytes=10)
+
+    cache.obter('a', lambda: b'12345')
+    cache.obter('b', lambda: b'12345')
+    cache.obter('a', lambda: b'xxxxx')
+    cache.obter('c', lambda: b'123')
+
+    # 'b' era o menos usado; um valor maior que o limite não é armazenado
+    assert list(cache._itens) == ['a', 'c']
+    assert cache.bytes == 8
+    assert cache.obter('d', lambda: b'0' * 11) == b'0' * 11
+    assert 'd' not in cache._itens and cache.bytes == 8
+
+
+def test_erro_nao_fica_no_cache():
+    cache = CacheCoalescente()
+
+    def falhar():
+        raise ErroOrigem("TSE fora do ar")
+
+    with pytest.raises(ErroOrigem):
+        cache.obter('a', falhar)
+    assert cache.obter('a', lambda: 'ok') == 'ok'
+
+
+@pytest.fixture
+def tse(monkeypatch, candidato):
+    """TSE falso: `falhar` faz a listagem do segundo cargo cair no meio"""
+    estado = {'falhar': True, 'listagens': 0}
+    monkeypatch.setattr(servico, 'obter_id_eleicao', lambda ano, tipo: '2045202024')
+    monkeypatch.setattr(servico, 'buscar_codigo_municipio', lambda uf, id_eleicao, municipio: '80000')
+
+    def iterar_candidatos_eleitos(id_eleicao, codigo_municipio, codigo_cargo):
+        estado['listagens'] += 1
+        if codigo_cargo == 12 and estado['falhar']:
+            raise OSError("conexão interrompida")
+        return [candidato(codigo_cargo)]
+
+    monkeypatch.setattr(servico, 'iterar_candidatos_eleitos', iterar_candidatos_eleitos)
+    return estado
+
+
+def test_listagem_interrompida_nao_fica_no_cache(store, tse):
+    servico_eleitos = ServicoEleitos(store)
+
+    with pytest.raises(ErroOrigem):
+        servico_eleitos.eleitos('2024', 'municipal', 'SC', 'Sombrio')
+    tse['falhar'] = False
+    candidatos = servico_eleitos.eleitos('2024', 'municipal', 'SC', 'Sombrio')
+
+    assert [c.id for c in candidatos] == ['11', '12', '13']
+    assert store.consultar_candidatos(uf='SC', municipio='Sombrio')
+
+
+def test_handler_responde_502_em_falha_do_tse(store, tse):
+    servidor = criar_servidor('127.0.0.1', 0, ServicoEleitos(store))
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = f"http://127.0.0.1:{servidor.server_address[1]}/eleitos?uf=SC&municipio=Sombrio"
+        with pytest.raises(urllib.error.HTTPError) as erro:
+            urllib.request.urlopen(url, timeout=5)
+        assert erro.value.code == 502
+        assert 'Falha ao listar' in json.loads(erro.value.read())['erro']
+
+        tse['falhar'] = False
+        with urllib.request.urlopen(url, timeout=5) as resposta:
+            assert len(json.loads(resposta.read())) == 3
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+
+def test_foto_da_tarjeta_carregada_fora_do_lock_de_renderizacao(store, candidato):
+    Image = pytest.importorskip('PIL.Image')
+    pytest.importorskip('svgwrite')
+    servico_eleitos = ServicoEleitos(store)
+    travado = []
+
+    def foto_decodificada(candidato, lado=200):
+        travado.append(servico_eleitos._lock_render.locked())
+        return Image.new('RGB', (lado, lado), 'red')
+
+    servico_eleitos._foto_decodificada = foto_decodificada
+    png = servico_eleitos.tarjeta(candidato(1))
+
+    assert travado == [False]
+    assert png.startswith(b'\x89PNG')